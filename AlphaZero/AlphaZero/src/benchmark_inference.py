@@ -0,0 +1,120 @@
+import argparse
+import multiprocessing as mp
+import time
+from threading import Lock, Thread
+
+import numpy as np
+
+from chess_zero.agent.api_chess import ChessModelAPI, SharedMemoryModelAPI
+from chess_zero.config import Config
+
+
+class SlowRandomModel:
+    # random outputs that take as long as a network call: a fixed cost
+    # per call plus a small cost per position; one device, so calls run
+    # one after another
+    def __init__(self, n_labels, call_latency, row_latency):
+        self.n_labels = n_labels
+        self.call_latency = call_latency
+        self.row_latency = row_latency
+        self.lock = Lock()
+    
+    def predict_on_batch(self, data):
+        num = len(data)
+        with self.lock:
+            time.sleep(self.call_latency + self.row_latency * num)
+        policy = np.full((num, self.n_labels), 1.0 / self.n_labels,
+                         dtype=np.float32)
+        return policy, np.zeros((num, 1), dtype=np.float32)
+
+
+class FakeChessModel:
+    def __init__(self, model):
+        self.model = model
+
+
+def client_thread(pipe, num_requests, latencies):
+    planes = np.random.rand(18, 8, 8).astype(np.float32)
+    for _ in range(num_requests):
+        start = time.time()
+        pipe.send(planes)
+        policy, value = pipe.recv()
+        latencies.append(time.time() - start)
+
+
+def client_process(pipes, num_requests, results):
+    # one self-play process: a search thread per pipe
+    latencies = []
+    threads = [Thread(target=client_thread,
+                      args=(pipe, num_requests, latencies))
+               for pipe in pipes]
+    # timed from here, leaving out the start of the process
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((latencies, start, time.time()))
+
+
+def run(api, args):
+    api.start()
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    processes = [ctx.Process(target=client_process,
+                             args=(api.get_pipes(args.threads),
+                                   args.requests, results))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    latencies, starts, ends = [], [], []
+    for _ in processes:
+        process_latencies, start, end = results.get()
+        latencies += process_latencies
+        starts.append(start)
+        ends.append(end)
+    for process in processes:
+        process.join()
+    elapsed = max(ends) - min(starts)
+    return len(latencies) / elapsed, np.percentile(latencies, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16,
+                        help="search threads per process")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="requests per thread")
+    parser.add_argument("--call-latency", type=float, default=0.004,
+                        help="simulated seconds per predict call")
+    parser.add_argument("--row-latency", type=float, default=0.00002,
+                        help="simulated seconds per position")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-batch-wait", type=float, default=0.002)
+    args = parser.parse_args()
+
+    config = Config("mini")
+    config.play.max_batch_size = args.max_batch_size
+    config.play.max_batch_wait = args.max_batch_wait
+    model = FakeChessModel(SlowRandomModel(config.n_labels,
+                                           args.call_latency,
+                                           args.row_latency))
+
+    print(f"{'server':14} {'requests/sec':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, api_class in (("pipe", ChessModelAPI),
+                            ("shared_memory", SharedMemoryModelAPI)):
+        api = api_class(config, model)
+        requests_per_sec, (p50, p99) = run(api, args)
+        print(f"{name:14} {requests_per_sec:12.0f} {p50 * 1000:8.2f} "
+              f"{p99 * 1000:8.2f}")
+        if hasattr(api, "stats"):
+            stats = api.stats()
+            print(f"  mean batch size {stats['mean_batch_size']:.1f}")
+            print(f"  batch sizes {stats['batch_size_histogram']}")
+            print(f"  queue wait ms {stats['queue_wait_ms_histogram']}")
+            api.close()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from chess_zero.agent.player_chess import create_player
+from chess_zero.config import Config
+from chess_zero.env.chess_env import ChessEnv
+
+
+class RandomModelPipe:
+    # stands in for a pipe to the model process: random priors and
+    # values, answered at once, so the timings are the search's own
+    def __init__(self, n_labels, seed):
+        self.n_labels = n_labels
+        self.rng = np.random.RandomState(seed)
+        self.num_requests = 0
+
+    def send(self, state_planes):
+        assert state_planes.shape == (18, 8, 8)
+        self.num_requests += 1
+
+    def recv(self):
+        policy = self.rng.random_sample(self.n_labels)
+        policy /= policy.sum()
+        return policy, float(self.rng.uniform(-1, 1))
+
+
+def play(config, search_tree, args, trace=False):
+    # one player makes every move of a game, so the zobrist tree is
+    # reused from move to move, as in a real game against itself
+    config.play.search_tree = search_tree
+    pipes = [RandomModelPipe(config.n_labels, seed)
+             for seed in range(config.play.search_threads)]
+    player = create_player(config, pipes=pipes)
+    env = ChessEnv().reset()
+    np.random.seed(args.seed)
+    if trace:
+        tracemalloc.start()
+    start = time.time()
+    tree_bytes = []
+    for _ in range(args.moves):
+        if trace:
+            before = tracemalloc.get_traced_memory()[0]
+        action = player.action(env, can_stop=False)
+        if trace:
+            tree_bytes.append(tracemalloc.get_traced_memory()[0] - before)
+        env.step(action, check_over=False)
+    elapsed = time.time() - start
+    if trace:
+        tracemalloc.stop()
+    sims = args.moves * config.play.simulation_num_per_move
+    return sims / elapsed, len(player.tree), tree_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=10)
+    parser.add_argument("--sims", type=int, default=200,
+                        help="simulations per move")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 16],
+                        help="search_threads values to compare")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = Config("mini")
+    config.play.simulation_num_per_move = args.sims
+
+    print(f"{'tree':10} {'threads':>8} {'sims/sec':>10} {'nodes':>8} "
+          f"{'KB/move':>10}")
+    for threads in args.threads:
+        config.play.search_threads = threads
+        for search_tree in ("fen", "zobrist"):
+            sims_per_sec, _, _ = play(config, search_tree, args)
+            _, nodes, tree_bytes = play(config, search_tree, args,
+                                        trace=True)
+            # memory the search of one move left allocated, the tree
+            # mostly
+            print(f"{search_tree:10} {threads:8d} {sims_per_sec:10.0f} "
+                  f"{nodes:8d} {np.mean(tree_bytes) / 1024:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import random
+import time
+
+import chess
+import numpy as np
+
+from chess_zero.env.chess_env import canon_input_planes
+from chess_zero.env.planes import batch_input_planes, board_input_planes
+
+
+def random_positions(num_positions, seed):
+    # positions from random games, of every game length
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < num_positions:
+        board = chess.Board()
+        for _ in range(rng.randint(0, 150)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+
+def per_board(encode, boards, repeats):
+    start = time.time()
+    for _ in range(repeats):
+        for board in boards:
+            encode(board)
+    return (time.time() - start) / (repeats * len(boards))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    boards = random_positions(args.positions, args.seed)
+    for board in boards:
+        assert np.array_equal(
+            canon_input_planes(board.fen()),
+            board_input_planes(board),
+        )
+
+    out = np.empty((args.batch_size, 18, 8, 8), dtype=np.float32)
+    batches = [
+        boards[k:k + args.batch_size]
+        for k in range(0, len(boards), args.batch_size)
+    ]
+    start = time.time()
+    for _ in range(args.repeats):
+        for batch in batches:
+            batch_input_planes(batch, out)
+    batched = (time.time() - start) / (args.repeats * len(boards))
+
+    results = [
+        ("canon_input_planes(fen)",
+         per_board(lambda b: canon_input_planes(b.fen()), boards, args.repeats)),
+        ("board_input_planes",
+         per_board(board_input_planes, boards, args.repeats)),
+        (f"batch_input_planes ({args.batch_size})", batched),
+    ]
+    base = results[0][1]
+    print(f"{'encoder':32} {'us/board':>10} {'speedup':>8}")
+    for name, seconds in results:
+        print(f"{name:32} {seconds * 1e6:10.1f} {base / seconds:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import chess
+import numpy as np
+
+from chess_zero.config import Config
+from chess_zero.env.chess_env import is_black_turn, testeval
+from chess_zero.env.planes import batch_input_planes
+from chess_zero.lib.play_data import PlayDataFile, write_play_data
+
+
+def random_games(num_games, sims, seed):
+    # [fen, policy, value] entries as self-play makes them: random games,
+    # each position with a policy of visit fractions over its legal moves
+    rng = random.Random(seed)
+    move_lookup = {chess.Move.from_uci(move): i
+                   for i, move in enumerate(Config.labels)}
+    data = []
+    for _ in range(num_games):
+        board = chess.Board()
+        game = []
+        while not board.is_game_over() and len(game) < 200:
+            moves = list(board.legal_moves)
+            policy = [0.0] * Config.n_labels
+            for _ in range(sims):
+                policy[move_lookup[rng.choice(moves)]] += 1.0 / sims
+            game.append([board.fen(), policy])
+            board.push(rng.choice(moves))
+        z = rng.choice([-1, 0, 1])
+        for i, move in enumerate(game):
+            move.append(z if i % 2 == 0 else -z)
+        data += game
+    return data
+
+
+def json_training_data(path):
+    # optimize.load_data_from_file for a JSON file (optimize itself
+    # needs keras)
+    with open(path, "rt") as f:
+        data = json.load(f)
+    boards, policy_list, value_list = [], [], []
+    for state_fen, policy, value in data:
+        boards.append(chess.Board(state_fen))
+        if is_black_turn(state_fen):
+            policy = Config.flip_policy(policy)
+        move_number = int(state_fen.split(' ')[5])
+        value_certainty = min(5, move_number) / 5
+        value_list.append(value * value_certainty
+                          + testeval(state_fen, False) * (1 - value_certainty))
+        policy_list.append(policy)
+    return batch_input_planes(boards), \
+        np.asarray(policy_list, dtype=np.float32), \
+        np.asarray(value_list, np.float32)
+
+
+def timed(f, *args, **kwargs):
+    start = time.time()
+    ret = f(*args, **kwargs)
+    return ret, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=50,
+                        help="games per file, as nb_game_in_file")
+    parser.add_argument("--sims", type=int, default=200,
+                        help="simulations per move")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = random_games(args.games, args.sims, args.seed)
+    print(f"{len(data)} positions")
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "play.json")
+        with open(json_path, "wt") as f:
+            _, json_write = timed(json.dump, data, f)
+        expected, json_load = timed(json_training_data, json_path)
+
+        print(f"{'format':14} {'MB':>7} {'write s':>8} {'load s':>8}")
+        print(f"{'json':14} {os.path.getsize(json_path) / 1e6:7.2f} "
+              f"{json_write:8.3f} {json_load:8.3f}")
+        for name, compress in (("binary zlib", True), ("binary raw", False)):
+            path = os.path.join(tmp, f"play_{compress}.czpd")
+            _, write = timed(write_play_data, path, data, compress=compress)
+            arrays, load = timed(lambda: PlayDataFile(path).training_data())
+            print(f"{name:14} {os.path.getsize(path) / 1e6:7.2f} "
+                  f"{write:8.3f} {load:8.3f}")
+
+            planes, policy, values = arrays
+            assert np.array_equal(planes, expected[0])
+            # float16 weights and values
+            assert np.allclose(policy, expected[1], atol=1e-3)
+            assert np.allclose(values, expected[2], atol=1e-3)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
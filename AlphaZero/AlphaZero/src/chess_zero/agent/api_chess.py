@@ -1,6 +1,8 @@
-from multiprocessing import connection, Pipe
+import itertools
+import os
+from multiprocessing import connection, shared_memory, Pipe
 import time
-from threading import Thread
+from threading import Lock, Thread
 
 import numpy as np
 
@@ -12,31 +14,277 @@ class ChessModelAPI:
     def __init__(self, config: Config, agent_model):    # ChessModel
         self.agent_model = agent_model
         self.pipes = []
+        self.prediction_worker = None
+        self.closed = False
     
     def start(self):
-        prediction_worker = Thread(target=self.predict_batch_worker, 
-                                   name="prediction_worker")
-        prediction_worker.daemon = True
-        prediction_worker.start()
+        self.prediction_worker = Thread(target=self.predict_batch_worker, 
+                                        name="prediction_worker")
+        self.prediction_worker.daemon = True
+        self.prediction_worker.start()
     
     def get_pipe(self):
         me, you = Pipe()
         self.pipes.append(me)
         return you
     
+    def get_pipes(self, num=1):
+        return [self.get_pipe() for _ in range(num)]
+    
     def predict_batch_worker(self):
-        while True:
+        while not self.closed:
             ready = connection.wait(self.pipes, timeout=0.001)
             if not ready:
                 continue
             data, result_pipes = [], []
             for pipe in ready:
-                while pipe.poll():
-                    data.append(pipe.recv())
-                    result_pipes.append(pipe)
+                try:
+                    while pipe.poll():
+                        data.append(pipe.recv())
+                        result_pipes.append(pipe)
+                except EOFError:
+                    # the client process is gone
+                    self.pipes.remove(pipe)
+            if not data:
+                continue
             # print(f"predicting {len(result_pipes)} items")
             data = np.asarray(data, dtype=np.float32)
             policy_ary, value_ary = self.agent_model.model.\
                                         predict_on_batch(data)
             for pipe, p, v in zip(result_pipes, policy_ary, value_ary):
-                pipe.send((p, float(v)))
\ No newline at end of file
+                pipe.send((p, float(v[0])))
+    
+    def close(self):
+        # stops the server thread and closes the server ends
+        self.closed = True
+        if self.prediction_worker is not None:
+            self.prediction_worker.join()
+        for pipe in self.pipes:
+            pipe.close()
+        self.pipes = []
+
+
+# slot states of SharedMemoryModelAPI
+SLOT_FREE = 0
+SLOT_REQUEST = 1
+SLOT_RESULT = 2
+
+# numbers the shared memory blocks of all the servers of a process, as
+# the evaluator runs two at once
+group_numbers = itertools.count()
+
+
+class SlotGroup:
+    # input and output slots of num clients in one shared memory block:
+    # planes (num, 18, 8, 8), policy (num, n_labels), the time each
+    # request was made (num,), value (num,) and a state flag per slot
+    def __init__(self, name, num, n_labels, create=False):
+        self.name = name
+        self.num = num
+        self.n_labels = n_labels
+        sizes = [num * 18 * 8 * 8 * 4, num * n_labels * 4, num * 8,
+                 num * 4, num]
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=sum(sizes))
+        offsets = np.cumsum([0] + sizes)
+        buf = self.shm.buf
+        self.planes = np.ndarray((num, 18, 8, 8), np.float32, buf,
+                                 offsets[0])
+        self.policy = np.ndarray((num, n_labels), np.float32, buf,
+                                 offsets[1])
+        self.sent_at = np.ndarray((num,), np.float64, buf, offsets[2])
+        self.value = np.ndarray((num,), np.float32, buf, offsets[3])
+        self.state = np.ndarray((num,), np.uint8, buf, offsets[4])
+        if create:
+            self.state[:] = SLOT_FREE
+    
+    def close(self, unlink=False):
+        # the arrays must go before the buffer they view
+        self.planes = self.policy = self.value = None
+        self.sent_at = self.state = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class SharedMemoryPipe:
+    # Client end of SharedMemoryModelAPI, used like the Pipe ends of
+    # ChessModelAPI: send(planes) then recv() -> (policy, value). The
+    # planes and results go through the client's own slot in shared
+    # memory; the connection only carries an empty message each way to
+    # wake the other side, so nothing is pickled.
+    def __init__(self, group_name, num, n_labels, slot, connection):
+        self.group_name = group_name
+        self.num = num
+        self.n_labels = n_labels
+        self.slot = slot
+        self.connection = connection
+        self.group = None
+    
+    def __getstate__(self):
+        # sent to the self-play processes without the mapped memory
+        state = self.__dict__.copy()
+        state['group'] = None
+        return state
+    
+    def send(self, state_planes):
+        if self.group is None:
+            self.group = SlotGroup(self.group_name, self.num,
+                                   self.n_labels)
+        group, slot = self.group, self.slot
+        group.planes[slot] = state_planes
+        group.sent_at[slot] = time.time()
+        group.state[slot] = SLOT_REQUEST
+        self.connection.send_bytes(b'')
+    
+    def recv(self):
+        self.connection.recv_bytes()
+        group, slot = self.group, self.slot
+        assert group.state[slot] == SLOT_RESULT
+        ret = group.policy[slot].copy(), float(group.value[slot])
+        group.state[slot] = SLOT_FREE
+        return ret
+
+
+class SharedMemoryModelAPI:
+    # Serves the model to many self-play processes through shared memory.
+    # Each get_pipe() client owns a slot; the server thread waits (without
+    # polling) until some client has a request, then keeps collecting
+    # requests until it has max_batch_size of them, every client has
+    # one, or the first one has waited max_wait seconds, and evaluates
+    # them as one batch. stats() has histograms of batch sizes and of
+    # the time requests waited before their batch started. close() frees
+    # the shared memory; the clients must be done with it.
+    # noinspection PyUnusedLocal
+    def __init__(self, config: Config, agent_model):    # ChessModel
+        self.agent_model = agent_model
+        self.n_labels = config.n_labels
+        self.max_batch_size = config.play.max_batch_size
+        self.max_wait = config.play.max_batch_wait
+        self.groups = []
+        self.conns = {}     # server end -> (group, slot)
+        self.lock = Lock()
+        # get_pipes writes here to have the server listen to new clients
+        self.wakeup, self.wakeup_sender = Pipe(duplex=False)
+        self.batch_sizes = np.zeros(self.max_batch_size + 1, dtype=np.int64)
+        # queue wait buckets: < 0.1ms, < 0.2ms, ... doubling, up to 1.6s
+        self.wait_edges = 1e-4 * 2.0 ** np.arange(15)
+        self.waits = np.zeros(len(self.wait_edges) + 1, dtype=np.int64)
+        self.prediction_worker = None
+        self.closed = False
+    
+    def start(self):
+        self.prediction_worker = Thread(target=self.predict_batch_worker,
+                                        name="prediction_worker")
+        self.prediction_worker.daemon = True
+        self.prediction_worker.start()
+    
+    def get_pipes(self, num=1):
+        # num clients in one shared memory block
+        name = f"chess_zero_{os.getpid()}_{next(group_numbers)}"
+        group = SlotGroup(name, num, self.n_labels, create=True)
+        pipes = []
+        with self.lock:
+            self.groups.append(group)
+            for slot in range(num):
+                me, you = Pipe()
+                self.conns[me] = (group, slot)
+                pipes.append(SharedMemoryPipe(name, num, self.n_labels,
+                                              slot, you))
+        self.wakeup_sender.send_bytes(b'')
+        return pipes
+    
+    def get_pipe(self):
+        return self.get_pipes(1)[0]
+    
+    def wait_requests(self, timeout):
+        # slots with a new request, waiting up to timeout seconds (for
+        # ever if None) for the first
+        with self.lock:
+            conns = list(self.conns)
+        requests = []
+        for conn in connection.wait(conns + [self.wakeup], timeout=timeout):
+            if conn is self.wakeup:
+                # new clients, listened to from the next call
+                conn.recv_bytes()
+                continue
+            try:
+                while conn.poll():
+                    conn.recv_bytes()
+                    requests.append((conn,) + self.conns[conn])
+            except (EOFError, OSError):
+                # the client process is gone
+                with self.lock:
+                    del self.conns[conn]
+        return requests
+    
+    def predict_batch_worker(self):
+        while not self.closed:
+            # sleeps until the first request
+            batch = self.wait_requests(timeout=None)
+            if not batch:
+                continue
+            deadline = time.time() + self.max_wait
+            # once every client has sent a request no more can come
+            while len(batch) < min(self.max_batch_size, len(self.conns)):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                batch += self.wait_requests(timeout=remaining)
+            for start in range(0, len(batch), self.max_batch_size):
+                self.predict_batch(batch[start:start + self.max_batch_size])
+    
+    def predict_batch(self, batch):
+        now = time.time()
+        data = np.empty((len(batch), 18, 8, 8), dtype=np.float32)
+        for i, (_, group, slot) in enumerate(batch):
+            data[i] = group.planes[slot]
+            wait = now - group.sent_at[slot]
+            self.waits[np.searchsorted(self.wait_edges, wait)] += 1
+        self.batch_sizes[len(batch)] += 1
+        policy_ary, value_ary = self.agent_model.model.\
+                                    predict_on_batch(data)
+        value_ary = np.reshape(value_ary, -1)
+        for (conn, group, slot), p, v in zip(batch, policy_ary, value_ary):
+            group.policy[slot] = p
+            group.value[slot] = v
+            group.state[slot] = SLOT_RESULT
+            conn.send_bytes(b'')
+    
+    def stats(self):
+        # histograms: batch size -> number of batches, and queue wait
+        # bucket upper bound in ms -> number of requests
+        num_batches = self.batch_sizes.sum()
+        sizes = np.arange(len(self.batch_sizes))
+        return {
+            'batches': int(num_batches),
+            'requests': int(self.waits.sum()),
+            'mean_batch_size': float((sizes * self.batch_sizes).sum()
+                                     / max(num_batches, 1)),
+            'batch_size_histogram': {
+                int(size): int(count)
+                for size, count in zip(sizes, self.batch_sizes) if count
+            },
+            'queue_wait_ms_histogram': {
+                (float(edge * 1000) if i < len(self.wait_edges)
+                 else float('inf')): int(count)
+                for i, (edge, count) in enumerate(
+                    zip(np.append(self.wait_edges, np.inf), self.waits))
+                if count
+            },
+        }
+    
+    def close(self):
+        # stops the server thread, then unlinks the shared memory blocks
+        # so they do not outlive the process in /dev/shm
+        self.closed = True
+        if self.prediction_worker is not None:
+            self.wakeup_sender.send_bytes(b'')
+            self.prediction_worker.join()
+        with self.lock:
+            for conn in self.conns:
+                conn.close()
+            self.conns = {}
+        for group in self.groups:
+            group.close(unlink=True)
+        self.groups = []
\ No newline at end of file
@@ -0,0 +1,246 @@
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from threading import Lock
+from typing import Union
+
+import chess
+import chess.polyglot
+import numpy as np
+
+from chess_zero.agent.player_chess import ChessPlayer
+from chess_zero.config import Config
+from chess_zero.env.planes import board_input_planes
+
+logger = getLogger(__name__)
+
+unflipped_index = np.asarray(Config.unflipped_index)
+
+
+def board_key(board: chess.Board) -> tuple:
+    # 64 bit polyglot zobrist hash and halfmove clock; unlike state_key
+    # it does not format a FEN string. As in state_key the halfmove
+    # clock is kept, since it is an input plane of the network and
+    # decides the fifty move rule, and the fullmove number left out.
+    return chess.polyglot.zobrist_hash(board), board.halfmove_clock
+
+
+def is_rule_draw(board: chess.Board) -> bool:
+    # fifty moves or threefold repetition, which depend on the moves
+    # played to reach the position and not only on its key. A position
+    # can only come up a third time after 8 reversible plies.
+    return board.is_fifty_moves() or \
+        (board.halfmove_clock >= 8 and board.is_repetition(3))
+
+
+# One position of the search tree. The statistics of its legal moves
+# sit side by side in arrays: edge i is moves[i], labels[i] its index
+# among the 1968 move labels, p[i] its prior, n[i] / w[i] / q[i] its
+# visit count, total and mean value. The position an edge leads to is
+# found in the tree by child_keys[i], hashed the first time the edge is
+# taken. Draws by the fifty move rule or repetition are not stored on
+# nodes, as games with different histories reach the same key.
+class Node:
+    __slots__ = ('moves', 'labels', 'p', 'n', 'w', 'q', 'sum_n',
+                 'child_keys', 'terminal_value', 'root_p')
+    
+    def __init__(self, moves, labels, p, terminal_value=None):
+        self.moves = moves
+        self.labels = labels
+        self.p = p
+        self.n = np.zeros(len(moves), dtype=np.float32)
+        self.w = np.zeros(len(moves), dtype=np.float32)
+        self.q = np.zeros(len(moves), dtype=np.float32)
+        self.sum_n = 0
+        self.child_keys = [None] * len(moves)
+        # value for the side to move of a finished game, else None
+        self.terminal_value = terminal_value
+        # priors with dirichlet noise, while the node is the root
+        self.root_p = None
+
+
+# ChessPlayer with the tree keyed by zobrist hash and halfmove clock
+# (board_key). Each search thread plays its simulations on its own copy
+# of the board with push / pop, instead of on an env copy per
+# simulation. The tree is kept from one move to the next: the next
+# search starts at the new position and drops the nodes that cannot be
+# reached from it.
+class ZobristChessPlayer(ChessPlayer):
+    def __init__(
+            self,
+            config: Config,
+            pipes = None,
+            play_config = None,
+            dummy = False):
+        
+        super().__init__(config, pipes, play_config, dummy)
+        self.tree = {}
+        self.node_lock = defaultdict(Lock)
+    
+    def reset(self):
+        # called before every move; the tree is pruned in search_moves
+        pass
+    
+    def deboog(self, env):
+        print(env.testeval())
+
+        node = self.tree[board_key(env.board)]
+        for i in np.argsort(-node.n):
+            print(f'{node.moves[i].uci():5}: '
+                  f'n: {node.n[i]:3.0f} '
+                  f'w: {node.w[i]:7.3f} '
+                  f'q: {node.q[i]:7.3f} '
+                  f'p: {node.p[i]:7.5f} ')
+    
+    def prune(self, root_key):
+        # keep the nodes reachable from root_key
+        if root_key not in self.tree:
+            self.tree = {}
+            self.node_lock = defaultdict(Lock)
+            return
+        kept = {}
+        queue = deque([root_key])
+        while queue:
+            key = queue.popleft()
+            if key in kept or key not in self.tree:
+                continue
+            node = self.tree[key]
+            kept[key] = node
+            queue.extend(k for k in node.child_keys if k is not None)
+        self.tree = kept
+        self.node_lock = defaultdict(Lock)
+    
+    def search_moves(self, env) -> Union[float, float]:
+        root_key = board_key(env.board)
+        self.prune(root_key)
+        if root_key in self.tree:
+            # new noise for each move searched from this root
+            self.add_root_noise(self.tree[root_key])
+
+        num_threads = self.play_config.search_threads
+        num_sims = self.play_config.simulation_num_per_move
+        counts = [num_sims // num_threads + (i < num_sims % num_threads)
+                  for i in range(num_threads)]
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = [executor.submit(self.search_thread,
+                                       env.board, root_key, count)
+                       for count in counts if count > 0]
+        vals = [v for f in futures for v in f.result()]
+
+        return np.max(vals), vals[0]
+    
+    def search_thread(self, board, root_key, num_sims):
+        # one board per thread, copied once; every simulation pushes its
+        # moves on it and pops them on the way back
+        board = board.copy()
+        return [self.search_my_move(board, root_key, is_root_node=True)
+                for _ in range(num_sims)]
+    
+    def search_my_move(self, board, key, is_root_node=False) -> float:
+        """
+        Q, V is value for this Player(always white).
+        P is value for the player of next_player (black or white)
+
+        Return:
+            leaf value
+        """
+        # the game the search is run for is not over at the root
+        if not is_root_node and is_rule_draw(board):
+            return 0
+        with self.node_lock[key]:
+            node = self.tree.get(key)
+            if node is None:
+                node, leaf_v = self.expand_and_evaluate(board)
+                if is_root_node:
+                    self.add_root_noise(node)
+                self.tree[key] = node
+                return leaf_v
+        if node.terminal_value is not None:
+            return node.terminal_value
+
+        virtual_loss = self.play_config.virtual_loss
+        with self.node_lock[key]:
+            # SELECT STEP
+            i = self.select_action_q_and_u(node, is_root_node)
+            node.sum_n += virtual_loss
+            node.n[i] += virtual_loss
+            node.w[i] -= virtual_loss
+            node.q[i] = node.w[i] / node.n[i]
+
+        board.push(node.moves[i])
+        child_key = node.child_keys[i]
+        if child_key is None:
+            child_key = node.child_keys[i] = board_key(board)
+        leaf_v = -self.search_my_move(board, child_key)
+        board.pop()
+
+        # BACKUP STEP
+        with self.node_lock[key]:
+            node.sum_n += -virtual_loss + 1
+            node.n[i] += -virtual_loss + 1
+            node.w[i] += virtual_loss + leaf_v
+            node.q[i] = node.w[i] / node.n[i]
+
+        return leaf_v
+    
+    def expand_and_evaluate(self, board) -> Union[Node, float]:
+        """Expand new leaf, this is called only once per state
+        this is called with state locked
+        return the node and leaf_v
+        """
+        moves = list(board.legal_moves)
+        if not moves:
+            # checkmate loses, stalemate draws
+            value = -1 if board.is_check() else 0
+            return Node(moves, np.zeros(0, dtype=np.int32),
+                        np.zeros(0, dtype=np.float32), value), value
+        labels = np.asarray([self.move_lookup[mov] for mov in moves],
+                            dtype=np.int32)
+        # a draw by the pieces alone holds for every path to the node;
+        # fifty moves and repetitions are checked by search_my_move
+        if board.is_insufficient_material():
+            return Node(moves, labels,
+                        np.zeros(len(moves), dtype=np.float32), 0), 0
+
+        leaf_p, leaf_v = self.predict(board_input_planes(board))
+        # these are canonical policy and value (i.e. side to move is
+        # "white"); index them back to python-chess moves
+        leaf_p = np.asarray(leaf_p)
+        if board.turn == chess.WHITE:
+            p = leaf_p[labels]
+        else:
+            p = leaf_p[unflipped_index[labels]]
+        p = np.asarray(p, dtype=np.float32)
+        p /= p.sum() + 1e-8
+        return Node(moves, labels, p), leaf_v
+    
+    def add_root_noise(self, node):
+        # one dirichlet draw over all legal moves, mixed into the priors
+        # the root is searched with. (ChessPlayer draws Dirichlet([alpha])
+        # per edge, which is always 1, so its "noise" only scales p.)
+        e = self.play_config.noise_eps
+        if e <= 0 or len(node.moves) == 0:
+            node.root_p = None
+            return
+        noise = np.random.dirichlet(
+            np.full(len(node.moves), self.play_config.dirichlet_alpha))
+        node.root_p = ((1 - e) * node.p + e * noise).astype(np.float32)
+    
+    def select_action_q_and_u(self, node, is_root_node) -> int:
+        # this method is called with state locked
+        # argmax of Q + U over all edges at once;
+        # U = c_puct * P * sqrt(sum(N(s, b); for all b)) / (1 + N)
+        p = node.root_p if is_root_node and node.root_p is not None \
+            else node.p
+        u = (self.play_config.c_puct * np.sqrt(node.sum_n + 1)) * p \
+            / (1 + node.n)
+        return int(np.argmax(node.q + u))
+    
+    def calc_policy(self, env):
+        """calc π(a|s0)"""
+        node = self.tree[board_key(env.board)]
+        policy = np.zeros(self.labels_n)
+        policy[node.labels] = node.n
+
+        policy /= np.sum(policy)
+        return policy
\ No newline at end of file
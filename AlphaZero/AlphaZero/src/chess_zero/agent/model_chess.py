@@ -12,7 +12,7 @@ from keras.layers.merge import Add
 from keras.layers.normalization import BatchNormalization
 from keras.regularizers import l2
 
-from chess_zero.agent.api_chess import ChessModelAPI
+from chess_zero.agent.api_chess import ChessModelAPI, SharedMemoryModelAPI
 from chess_zero.config import Config
 
 # noinspection PyPep8Naming
@@ -30,9 +30,18 @@ class ChessModel:
     
     def get_pipes(self, num=1):
         if self.api is None:
-            self.api = ChessModelAPI(self.config, self)
+            if self.config.play.model_server == "shared_memory":
+                self.api = SharedMemoryModelAPI(self.config, self)
+            else:
+                self.api = ChessModelAPI(self.config, self)
             self.api.start()
-        return [self.api.get_pipe() for _ in range(num)]
+        return self.api.get_pipes(num)
+    
+    def close_api(self):
+        # stops the model server of get_pipes; its pipes stop working
+        if self.api is not None:
+            self.api.close()
+            self.api = None
     
     def build(self):
         mc = self.config.model
@@ -156,8 +165,8 @@ class ChessModel:
             # print(self.model.summary)
             return True
         else:
-            logger.debug(f"model files does not exist at {config_path} and 
-                         {weight_path}")
+            logger.debug(f"model files does not exist at {config_path} and "
+                         f"{weight_path}")
             return False
     
     def save(self, config_path, weight_path):
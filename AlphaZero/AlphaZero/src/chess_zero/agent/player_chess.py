@@ -108,7 +108,7 @@ class ChessPlayer:
         with ThreadPoolExecutor(max_workers=self.play_config.search_threads) \
             as executor:
                 for _ in range(self.play_config.simulation_num_per_move):
-                    futures.append(executor.submit(self.search_moves, 
+                    futures.append(executor.submit(self.search_my_move, 
                                                    env=env.copy(), 
                                                    is_root_node=True))
         
@@ -131,6 +131,7 @@ class ChessPlayer:
                 return 0
             # assert env.whiteon != env.white_to_move
             # side to move can't be winner!
+            return -1
         
         state = state_key(env)
 
@@ -280,6 +281,21 @@ class ChessPlayer:
             move += [z]
 
 
-def state_key(env, ChessEnv)-> str:
+def create_player(
+        config: Config,
+        pipes = None,
+        play_config = None,
+        dummy = False) -> ChessPlayer:
+    
+    # ChessPlayer, or ZobristChessPlayer when play_config.search_tree is
+    # "zobrist"
+    play_config = play_config or config.play
+    if getattr(play_config, "search_tree", "fen") == "zobrist":
+        from chess_zero.agent.mcts_chess import ZobristChessPlayer
+        return ZobristChessPlayer(config, pipes, play_config, dummy)
+    return ChessPlayer(config, pipes, play_config, dummy)
+
+
+def state_key(env: ChessEnv)-> str:
     fen = env.board.fen().rsplit(' ', 1)    # drop the move clock
     return fen[0]
\ No newline at end of file
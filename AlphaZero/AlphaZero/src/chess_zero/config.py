@@ -52,7 +52,9 @@ class ResourceConfig:
         self.next_generation_model_weight_filename = "model_weight.h5"
 
         self.play_data_dir = os.path.join(self.data_dir, "play_data")
-        self.play_data_filename_tmpl = "play_%s.json"
+        # binary play data (lib.play_data); older JSON files are read too
+        self.play_data_filename_tmpl = "play_%s.czpd"
+        self.play_data_json_filename_tmpl = "play_%s.json"
 
         self.log_dir = os.path.join(self.project_dir, "logs")
         self.main_log_path = os.path.join(self.log_dir, "main.log")
@@ -160,7 +162,7 @@ Config.unflipped_index = [Config.labels.index(x)
 
 
 def _project_dir():
-    d = os.path.dirname()
+    d = os.path.dirname
     return d(d(d(os.path.abspath(__file__))))
 
 
@@ -36,6 +36,12 @@ class PlayConfig:
         self.resign_threshold = -0.8
         self.min_resign_turn = 5
         self.average_chess_movements = 50
+        # "zobrist": agent.mcts_chess tree, "fen": dict of VisitStats
+        self.search_tree = "zobrist"
+        # "shared_memory": SharedMemoryModelAPI, "pipe": ChessModelAPI
+        self.model_server = "shared_memory"
+        self.max_batch_size = 256
+        self.max_batch_wait = 0.002    # seconds
 
 
 
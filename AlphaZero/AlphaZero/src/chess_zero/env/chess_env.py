@@ -5,6 +5,8 @@ import copy
 
 from logging import getLogger
 
+from chess_zero.env.planes import board_input_planes
+
 logger = getLogger(__name__)
 
 # noinspection PyArgumentList
@@ -61,7 +63,7 @@ class ChessEnv:
 
         self.num_halfmoves += 1
 
-        if check_over and self.board.result(calim_draw=True) != "*":
+        if check_over and self.board.result(claim_draw=True) != "*":
             self._game_over()
     
     def _game_over(self):
@@ -128,7 +130,8 @@ class ChessEnv:
         return replace_tags_board(self.board.fen())
     
     def canonical_input_planes(self):
-        return canon_input_planes(self.board.fen())
+        # same as canon_input_planes(self.board.fen()), from the bitboards
+        return board_input_planes(self.board)
     
     def testeval(self, absolute=False)-> float:
         return testeval(self.board.fen(), absolute)
@@ -136,7 +139,7 @@ class ChessEnv:
 
 def testeval(fen, absolute=False)-> float:
     # somehow it doesn't know how to keep its queen
-    piece_vals = {'k': 3, 'Q': 14, 'R': 5, 'B': 3.25, 'N': 3, 'P': 1}
+    piece_vals = {'K': 3, 'Q': 14, 'R': 5, 'B': 3.25, 'N': 3, 'P': 1}
     ans = 0.0
     tot = 0
     for c in fen.split(' ')[0]:
@@ -273,13 +276,13 @@ def alg_to_coord(alg):
     return rank, file
 
 def coord_to_alg(coord):
-    letter = chr(ord('a' + coord[1]))
+    letter = chr(ord('a') + coord[1])
     number = str(8 - coord[0])
     return letter + number
 
 def to_planes(fen):
     board_state = replace_tags_board(fen)
-    pieces_both = np.zeros(np.shape - (12, 8, 8), dtype=np.float32)
+    pieces_both = np.zeros(shape=(12, 8, 8), dtype=np.float32)
     for rank in range(8):
         for file in range(8):
             v = board_state[rank * 8 + file]
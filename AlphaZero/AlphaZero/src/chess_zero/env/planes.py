@@ -0,0 +1,134 @@
+import chess
+import numpy as np
+
+# Input planes straight from python-chess bitboards, the same as
+# canon_input_planes(board.fen()) without going through the FEN string.
+#
+# A bitboard has bit 8 * rank + file set for each square, so its 8 bytes
+# (little endian) are the ranks 1..8 and the bits of each byte files
+# a..h. The planes put rank 8 on row 0, which is the bytes in reverse
+# order: a byte swap. With black to move the board is seen flipped,
+# rank 1 on row 0, which is the bytes as they are.
+
+# piece types in the order of chess_env.pieces_order, 'KQRBNP'
+piece_types = (
+    chess.KING,
+    chess.QUEEN,
+    chess.ROOK,
+    chess.BISHOP,
+    chess.KNIGHT,
+    chess.PAWN,
+)
+
+
+def piece_bitboards(board):
+    # the 6 piece bitboards of the side to move, then the other side's
+    us = board.turn
+    them = not us
+    return [board.pieces_mask(piece_type, us) for piece_type in piece_types] \
+        + [board.pieces_mask(piece_type, them) for piece_type in piece_types]
+
+
+def board_aux(board):
+    # castling rights K Q k q from the side to move, the halfmove clock,
+    # and the en passant square or -1
+    us = board.turn
+    them = not us
+    castling = (
+        board.has_kingside_castling_rights(us),
+        board.has_queenside_castling_rights(us),
+        board.has_kingside_castling_rights(them),
+        board.has_queenside_castling_rights(them),
+    )
+    # board.fen() only shows an en passant square that can be taken
+    ep = board.ep_square if board.has_legal_en_passant() else None
+    return castling, board.halfmove_clock, -1 if ep is None else ep
+
+
+def board_columns(boards):
+    # what the planes of a list of chess.Board are made from, one array
+    # per field: bitboards (N, 12) uint64 as piece_bitboards, castling
+    # (N, 4) bool as board_aux, halfmove clocks (N,), en passant squares
+    # (N,) or -1, and whether white is to move (N,)
+    n = len(boards)
+    bitboards = np.array(
+        [piece_bitboards(board) for board in boards],
+        dtype=np.uint64,
+    ).reshape(n, 12)
+    castling = np.empty((n, 4), dtype=bool)
+    clocks = np.empty(n, dtype=np.int64)
+    ep_squares = np.empty(n, dtype=np.int64)
+    white = np.empty(n, dtype=bool)
+    for i, board in enumerate(boards):
+        castling[i], clocks[i], ep_squares[i] = board_aux(board)
+        white[i] = board.turn == chess.WHITE
+    return bitboards, castling, clocks, ep_squares, white
+
+
+def columns_input_planes(
+        bitboards,
+        castling,
+        clocks,
+        ep_squares,
+        white,
+        out=None,
+        dtype=np.float32):
+    
+    # (N, 18, 8, 8) canonical input planes of the columns of
+    # board_columns, e.g. as stored in play data files
+    n = len(bitboards)
+    if out is None:
+        out = np.empty((n, 18, 8, 8), dtype=dtype)
+    else:
+        out = out[:n]
+    white = np.asarray(white, dtype=bool)
+    ep_squares = np.asarray(ep_squares, dtype=np.int64)
+    # white to move: rank 8 on top, byte swap; black to move: flipped,
+    # bytes as they are
+    bitboards = np.array(bitboards, dtype=np.uint64)
+    bitboards[white] = bitboards[white].byteswap()
+    bits = np.unpackbits(
+        bitboards.view(np.uint8).reshape(n, 12, 8),
+        axis=2,
+        bitorder='little',
+    )
+    out[:, :12] = bits.reshape(n, 12, 8, 8)
+    out[:, 12:16] = np.asarray(castling)[:, :, None, None]
+    out[:, 16] = np.asarray(clocks)[:, None, None]
+    out[:, 17] = 0
+    # the en passant plane is not flipped for black, as in
+    # canon_input_planes, which keeps the FEN's square when flipping
+    has_ep = np.flatnonzero(ep_squares >= 0)
+    ep = ep_squares[has_ep]
+    out[has_ep, 17, 7 - ep // 8, ep % 8] = 1
+    return out
+
+
+def batch_input_planes(boards, out=None, dtype=np.float32):
+    # (N, 18, 8, 8) canonical input planes of a list of chess.Board;
+    # out, a preallocated array of at least N rows, is filled and
+    # returned, so a search can reuse one buffer for every batch
+    return columns_input_planes(*board_columns(boards), out=out, dtype=dtype)
+
+
+def board_input_planes(board, out=None, dtype=np.float32):
+    # (18, 8, 8) canonical input planes of one chess.Board, as in
+    # batch_input_planes without the indexing over a batch, which costs
+    # more than the work itself for one board
+    if out is None:
+        out = np.empty((18, 8, 8), dtype=dtype)
+    bitboards = np.array(piece_bitboards(board), dtype=np.uint64)
+    if board.turn == chess.WHITE:
+        bitboards = bitboards.byteswap()
+    out[:12] = np.unpackbits(
+        bitboards.view(np.uint8).reshape(12, 8),
+        axis=1,
+        bitorder='little',
+    ).reshape(12, 8, 8)
+    castling, clock, ep = board_aux(board)
+    out[12:16] = np.array(castling, dtype=out.dtype)[:, None, None]
+    out[16] = clock
+    out[17] = 0
+    if ep >= 0:
+        out[17, 7 - ep // 8, ep % 8] = 1
+    return out
\ No newline at end of file
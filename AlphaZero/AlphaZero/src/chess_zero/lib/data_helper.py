@@ -3,10 +3,13 @@ import ujson
 from datetime import datetime
 from glob import glob
 from logging import getLogger
+from queue import Queue
+from threading import Thread
 
 import chess.pgn
 import pyperclip
 from chess_zero.config import ResourceConfig
+from chess_zero.lib.play_data import write_play_data
 
 logger = getLogger(__name__)
 
@@ -29,9 +32,10 @@ def find_pgn_files(directory, pattern='*.pgn'):
 
 
 def get_game_data_filenames(rc: ResourceConfig):
-    pattern = os.path.join(rc.play_data_dir, rc.play_data_filename_tmpl % "*")
-    files = list(sorted(glob(pattern)))
-    return files
+    files = []
+    for tmpl in (rc.play_data_filename_tmpl, rc.play_data_json_filename_tmpl):
+        files += glob(os.path.join(rc.play_data_dir, tmpl % "*"))
+    return list(sorted(files))
 
 
 def get_next_generation_model_dirs(rc: ResourceConfig):
@@ -43,8 +47,11 @@ def get_next_generation_model_dirs(rc: ResourceConfig):
 
 def write_game_data_to_file(path, data):
     try:
-        with open(path, "wt") as f:
-            ujson.dump(data, f)
+        if path.endswith(".json"):
+            with open(path, "wt") as f:
+                ujson.dump(data, f)
+        else:
+            write_play_data(path, data)
     except Exception as e:
         print(e)
 
@@ -57,6 +64,32 @@ def read_game_data_from_file(path):
         print(e)
 
 
+class GameDataWriter:
+    # Writes play data files one after another on a background thread,
+    # so the games go on while the last ones are encoded and saved.
+    # close() waits for the files already queued.
+    def __init__(self):
+        self.queue = Queue()
+        self.thread = Thread(target=self.write_worker,
+                             name="game_data_writer")
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def write(self, path, data):
+        self.queue.put((path, data))
+    
+    def write_worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            write_game_data_to_file(*item)
+    
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
 # def conv_helper(path):
 #     with open(path, "rt") as f:
 #         data = json.load(f)
@@ -0,0 +1,207 @@
+import mmap
+import os
+import struct
+import zlib
+
+import chess
+import numpy as np
+
+from chess_zero.config import Config
+from chess_zero.env.planes import board_columns, columns_input_planes
+
+# Binary play data files, in place of JSON lists of
+# [fen, policy (1968 floats), value].
+#
+# A file is a header, chunks of up to chunk_size positions, an index of
+# the chunks and a footer pointing at the index. A chunk holds one
+# column after another (see chunk_columns): the 12 piece bitboards of
+# each position as in planes.board_columns, the castling rights and
+# side to move as bit flags, halfmove clock, fullmove number, en
+# passant square, the value as float16, and the policy as
+# (label index, weight) pairs of its nonzero labels, with
+# policy_start[i]:policy_start[i + 1] the pairs of position i. Chunks
+# are zlib compressed unless written with compress=False.
+#
+# PlayDataFile memory-maps a file and decodes a chunk at a time from the
+# map; the columns of uncompressed chunks are views of it.
+
+MAGIC = b"CZPD"
+VERSION = 1
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+header_format = "<4sI"
+footer_format = "<QI4s"
+chunk_dtype = np.dtype([
+    ("offset", "<u8"),
+    ("size", "<u8"),
+    ("positions", "<u4"),
+    ("pairs", "<u4"),
+    ("codec", "<u4"),
+])
+
+# K Q R B N P, in the order of planes.piece_types, as in testeval
+piece_values = np.array([3, 14, 5, 3.25, 3, 1])
+
+unflipped_index = np.asarray(Config.unflipped_index)
+
+
+def chunk_columns(n, m):
+    # name, dtype and shape of the columns of a chunk of n positions and
+    # m policy pairs, in the order they are stored
+    return (
+        ("bitboards", "<u8", (n, 12)),
+        ("policy_start", "<u4", (n + 1,)),
+        ("values", "<f2", (n,)),
+        ("policy_index", "<u2", (m,)),
+        ("policy_weight", "<f2", (m,)),
+        ("clocks", "<u2", (n,)),
+        ("fullmoves", "<u2", (n,)),
+        ("ep_squares", "i1", (n,)),
+        ("flags", "u1", (n,)),
+    )
+
+
+def encode_chunk(data):
+    # columns of [fen, policy, value] entries, as bytes
+    boards = [chess.Board(state_fen) for state_fen, _, _ in data]
+    bitboards, castling, clocks, ep_squares, white = board_columns(boards)
+    policy = np.asarray([policy for _, policy, _ in data], dtype=np.float32)
+    rows, policy_index = np.nonzero(policy)
+    columns = {
+        "bitboards": bitboards,
+        "policy_start": np.searchsorted(rows, np.arange(len(data) + 1)),
+        "values": [value for _, _, value in data],
+        "policy_index": policy_index,
+        "policy_weight": policy[rows, policy_index],
+        "clocks": clocks,
+        "fullmoves": [board.fullmove_number for board in boards],
+        "ep_squares": ep_squares,
+        "flags": castling @ np.array([1, 2, 4, 8]) + 16 * white,
+    }
+    return len(rows), b"".join(
+        np.ascontiguousarray(columns[name], dtype=dtype).tobytes()
+        for name, dtype, _ in chunk_columns(len(data), len(rows)))
+
+
+def decode_chunk(buf, n, m):
+    # dict of the column arrays of a chunk, viewing buf
+    columns = {}
+    offset = 0
+    for name, dtype, shape in chunk_columns(n, m):
+        count = int(np.prod(shape))
+        columns[name] = np.frombuffer(buf, dtype, count, offset)\
+                          .reshape(shape)
+        offset += count * np.dtype(dtype).itemsize
+    return columns
+
+
+def write_play_data(path, data, chunk_size=4096, compress=True):
+    # The file is written under a temporary name and renamed when
+    # complete, so a reader never sees half of one.
+    index = []
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack(header_format, MAGIC, VERSION))
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start:start + chunk_size]
+            pairs, body = encode_chunk(chunk)
+            codec = CODEC_RAW
+            if compress:
+                body = zlib.compress(body)
+                codec = CODEC_ZLIB
+            index.append((f.tell(), len(body), len(chunk), pairs, codec))
+            f.write(body)
+        index_offset = f.tell()
+        f.write(np.array(index, dtype=chunk_dtype).tobytes())
+        f.write(struct.pack(footer_format, index_offset, len(index), MAGIC))
+    os.replace(tmp_path, path)
+
+
+def material_eval(bitboards):
+    # testeval(fen) of the positions of (N, 12) bitboards of the side to
+    # move and the other side
+    n = len(bitboards)
+    counts = np.unpackbits(
+        np.ascontiguousarray(bitboards, dtype=np.uint64)
+          .view(np.uint8).reshape(n, 12, 8),
+        axis=2,
+    ).sum(axis=2)
+    material = counts * np.tile(piece_values, 2)
+    v = (material[:, :6].sum(axis=1) - material[:, 6:].sum(axis=1)) \
+        / material.sum(axis=1)
+    return np.tanh(v * 3)
+
+
+class PlayDataFile:
+    # A play data file written by write_play_data, memory-mapped.
+    # len() is its number of positions; read_chunk(i) decodes the
+    # columns of chunk i, and training_data() gives the arrays the
+    # optimizer trains on.
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = struct.unpack_from(header_format, self.map)
+        footer_size = struct.calcsize(footer_format)
+        index_offset, num_chunks, end_magic = struct.unpack_from(
+            footer_format, self.map, len(self.map) - footer_size)
+        if magic != MAGIC or end_magic != MAGIC:
+            raise ValueError(f"{path} is not a play data file")
+        if version != VERSION:
+            raise ValueError(f"{path}: unknown play data version {version}")
+        self.index = np.frombuffer(self.map, chunk_dtype, num_chunks,
+                                   index_offset)
+    
+    def __len__(self):
+        return int(self.index["positions"].sum())
+    
+    def read_chunk(self, i):
+        offset, size, n, m, codec = self.index[i].tolist()
+        buf = memoryview(self.map)[offset:offset + size]
+        if codec == CODEC_ZLIB:
+            buf = zlib.decompress(buf)
+        elif codec != CODEC_RAW:
+            raise ValueError(f"{self.path}: unknown codec {codec}")
+        return decode_chunk(buf, n, m)
+    
+    def training_data(self):
+        # planes, policy and value arrays as convert_to_cheating_data
+        # makes them from a JSON file: canonical planes and policies, and
+        # the value blended with testeval over the first 5 moves
+        chunks = [training_arrays(self.read_chunk(i))
+                  for i in range(len(self.index))]
+        if not chunks:
+            return np.zeros((0, 18, 8, 8), dtype=np.float32), \
+                   np.zeros((0, Config.n_labels), dtype=np.float32), \
+                   np.zeros(0, dtype=np.float32)
+        return tuple(np.concatenate(arrays) for arrays in zip(*chunks))
+
+
+def training_arrays(columns):
+    flags = columns["flags"]
+    white = (flags & 16) != 0
+    bitboards = columns["bitboards"]
+    planes = columns_input_planes(
+        bitboards,
+        (flags[:, None] >> np.arange(4)) & 1,
+        columns["clocks"],
+        columns["ep_squares"],
+        white,
+    )
+
+    n = len(flags)
+    policy = np.zeros((n, Config.n_labels), dtype=np.float32)
+    rows = np.repeat(np.arange(n), np.diff(columns["policy_start"]))
+    index = columns["policy_index"].astype(np.intp)
+    # policies are stored as played; flip_policy for black to move
+    black = ~white[rows]
+    index[black] = unflipped_index[index[black]]
+    policy[rows, index] = columns["policy_weight"]
+
+    # reduces the noise of the opening, as in convert_to_cheating_data
+    value_certainty = np.minimum(5, columns["fullmoves"]) / 5
+    values = columns["values"] * value_certainty \
+        + material_eval(bitboards) * (1 - value_certainty)
+    return planes, policy, values.astype(np.float32)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import sys
 from logging import getLogger
 
-from chess_zero.agent.player_chess import ChessPlayer
+from chess_zero.agent.player_chess import create_player
 from config import Config, PlayWithHumanConfig
 from chess_zero.env.chess_env import ChessEnv
 
@@ -70,7 +70,7 @@ def get_player(config):
     
     if not load_best_model_weight(model):
         raise RuntimeError("Best model not found!")
-    return ChessPlayer(config, model.get_pipes(config.play.search_threads))
+    return create_player(config, model.get_pipes(config.play.search_threads))
 
 
 def info(depth, move, score):
@@ -6,7 +6,7 @@ from multiprocessing import Manager
 from time import sleep
 
 from chess_zero.agent.model_chess import ChessModel
-from chess_zero.agent.player_chess import ChessPlayer
+from chess_zero.agent.player_chess import create_player
 from config import Config
 from chess_zero.env.chess_env import ChessEnv, Winner
 from chess_zero.lib.data_helper import (get_next_generation_model_dirs,
@@ -19,7 +19,11 @@ logger = getLogger(__name__)
 
 def start(config: Config):
     # tf_util.set_session_config(config.play.vram_frac)
-    return EvaluateWorker(config).start()
+    worker = EvaluateWorker(config)
+    try:
+        return worker.start()
+    finally:
+        worker.current_model.close_api()
 
 
 class EvaluateWorker:
@@ -28,28 +32,31 @@ class EvaluateWorker:
         self.play_config = config.eval.play_config
         self.current_model = self.load_current_model()
         self.m = Manager()
-        self.cur_pipes = self.m.list([
-                            self.current_model.\
-                                get_pipes(self.play_config.search_threads) \
-                                    for _ in range(\
-                                        self.play_config.max_processes)])
+        self.cur_pipes = self.get_pipes(self.current_model)
     
     def start(self):
         while True:
             ng_model, model_dir = self.load_next_generation_model()
             logger.debug(f"start evaluate model {model_dir}")
-            ng_is_great = self.evaluate_model(ng_model)
+            ng_pipes = self.get_pipes(ng_model)
+            ng_is_great = self.evaluate_model(ng_pipes)
             if ng_is_great:
                 logger.debug(f"New Model become best model: {model_dir}")
                 save_as_best_model(ng_model)
+                # the games are over, so nothing uses the old server
+                self.current_model.close_api()
                 self.current_model = ng_model
+                self.cur_pipes = ng_pipes
+            else:
+                ng_model.close_api()
             self.move_model(model_dir)
     
-    def evaluate_model(self, ng_model):
-        ng_pipes = self.m.list([
-            ng_model.get_pipes(self.play_config.search_threads) \
+    def get_pipes(self, model):
+        return self.m.list([
+            model.get_pipes(self.play_config.search_threads) \
             for _ in range(self.play_config.max_processes)])
-        
+    
+    def evaluate_model(self, ng_pipes):
         futures = []
         with ProcessPoolExecutor(max_workers=self.play_config.max_processes) \
             as executor:
@@ -59,6 +66,7 @@ class EvaluateWorker:
                                       cur=self.cur_pipes, 
                                       ng=ng_pipes, 
                                       current_white=(game_idx % 2 == 0))
+                futures.append(fut)
             
             results = []
             for fut in as_completed(futures):
@@ -68,8 +76,8 @@ class EvaluateWorker:
                 win_rate = sum(results) / len(results)
                 game_idx = len(results)
                 logger.debug(
-                    f"game {game_idx:3}: ng_score={ng_score:.1f} as 
-                    {'block' if current_white else 'white'} "
+                    f"game {game_idx:3}: ng_score={ng_score:.1f} as "
+                    f"{'black' if current_white else 'white'} "
                     f"{'by resign ' if env.resigned else '          '}"
                     f"win_rate={win_rate * 100:5.1f}% "
                     f"{env.board.fen().split(' ')[0]}")
@@ -81,14 +89,14 @@ class EvaluateWorker:
 
                 if len(results) - sum(results) >= self.config.eval.game_num \
                     * (1 - self.config.eval.replace_rate):
-                    logger.debug(f"lose count reach {results.count(0)} so give
-                                  up challenge")
+                    logger.debug(f"lose count reach {results.count(0)} so "
+                                 f"give up challenge")
                     return False
                 
                 if sum(results) >= self.config.eval.game_num \
                     * self.config.eval.replace_rate:
-                    logger.debug(f"win count reach {results.count(1)} so 
-                                 change best model")
+                    logger.debug(f"win count reach {results.count(1)} so "
+                                 f"change best model")
                     return True
         
         win_rate = sum(results) / len(results)
@@ -138,10 +146,10 @@ def play_game(config, cur,
     ng_pipes = ng.pop()
     env = ChessEnv().reset()
 
-    current_player = ChessPlayer(config, pipes=cur_pipes, 
-                                 play_config=config.eval.play_config)
-    ng_player = ChessPlayer(config, pipes=ng_pipes, 
-                            play_config=config.eval.play_config)
+    current_player = create_player(config, pipes=cur_pipes, 
+                                   play_config=config.eval.play_config)
+    ng_player = create_player(config, pipes=ng_pipes, 
+                              play_config=config.eval.play_config)
 
     if current_white:
         white, black = current_player, ng_player
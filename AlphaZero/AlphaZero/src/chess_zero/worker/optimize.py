@@ -6,17 +6,18 @@ from logging import getLogger
 from time import sleep
 from random import shuffle
 
+import chess
 import numpy as np
 
 from chess_zero.agent.model_chess import ChessModel
 from config import Config
-from chess_zero.env.chess_env import (canon_input_planes, 
-                                      is_black_turn, 
-                                      testeval)
+from chess_zero.env.chess_env import is_black_turn, testeval
+from chess_zero.env.planes import batch_input_planes
 from chess_zero.lib.data_helper import (get_game_data_filenames, 
                                         read_game_data_from_file, 
                                         get_next_generation_model_dirs)
 from chess_zero.lib.model_helper import load_best_model_weight
+from chess_zero.lib.play_data import PlayDataFile
 
 from keras.optimizers import Adam
 from keras.callbacks import TensorBoard
@@ -38,7 +39,7 @@ class OptimizeWorker:
         # this should just be a ring buffer i.e. queue of length 500,000 in AZ
         self.loaded_data = deque(maxlen=self.config.trainer.dataset_size)
         self.dataset = deque(), deque(), deque()
-        self.executor = ProcessLookupError(max_workers=\
+        self.executor = ProcessPoolExecutor(max_workers=\
                                            config.trainer.cleaning_processes)
     
     def start(self):
@@ -136,7 +137,7 @@ class OptimizeWorker:
                 if len(self.filenames) > 0:
                     filename = self.filenames.popleft()
                     logger.debug(f"loading data from {filename}")
-                    futures.append(executor.submit(load_data_from_file(), 
+                    futures.append(executor.submit(load_data_from_file, 
                                                    filename))
     
     def collect_all_loaded_data(self):
@@ -173,18 +174,20 @@ class OptimizeWorker:
     #           del self.loaded_data[filename]
 
 def load_data_from_file(filename):
+    if not filename.endswith(".json"):
+        # planes, policies and values straight from the binary columns
+        return PlayDataFile(filename).training_data()
     data = read_game_data_from_file(filename)
     return convert_to_cheating_data(data)
 
 
 def convert_to_cheating_data(data):
-    state_list = []
+    boards = []
     policy_list = []
     value_list = []
     for state_fen, policy, value in data:
 
-        state_planes = canon_input_planes(state_fen)
-        # assert check_current_planes(state_fen, state_planes)
+        boards.append(chess.Board(state_fen))
 
         if is_black_turn(state_fen):
             policy = Config.flip_policy(policy)
@@ -201,10 +204,10 @@ def convert_to_cheating_data(data):
                     + testeval(state_fen, False) \
                     * (1 - value_certainty)
 
-        state_list.append(state_planes)
         policy_list.append(policy)
         value_list.append(sl_value)
     
-    return np.asarray(state_list, dtype=np.float32), \
+    # all positions' planes in one pass over their bitboards
+    return batch_input_planes(boards), \
             np.asarray(policy_list, dtype=np.float32), \
             np.asarray(value_list, np.float32)
\ No newline at end of file
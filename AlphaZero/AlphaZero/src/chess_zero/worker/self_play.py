@@ -5,15 +5,14 @@ from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from logging import getLogger
 from multiprocessing import Manager
-from threading import Thread
 from time import time
 
 from chess_zero.agent.model_chess import ChessModel
-from chess_zero.agent.player_chess import ChessPlayer
+from chess_zero.agent.player_chess import create_player
 from config import Config
 from chess_zero.env.chess_env import ChessEnv, Winner
 from chess_zero.lib.data_helper import (get_game_data_filenames, 
-                                        write_game_data_to_file, 
+                                        GameDataWriter, 
                                         pretty_print)
 from chess_zero.lib.model_helper import (load_best_model_weight, 
                                          save_as_best_model, 
@@ -22,7 +21,11 @@ from chess_zero.lib.model_helper import (load_best_model_weight,
 logger = getLogger(__name__)
 
 def start(config: Config):
-    return SelfPlayWorker(config).start()
+    worker = SelfPlayWorker(config)
+    try:
+        return worker.start()
+    finally:
+        worker.current_model.close_api()
 
 
 # noinspection PyAttributeOutsideInit
@@ -30,12 +33,13 @@ class SelfPlayWorker:
     def __init__(self, config: Config):
         self.config = config
         self.current_model = self.load_model()
+        self.writer = GameDataWriter()
         self.m = Manager()
         self.cur_pipes = self.m.list(
                         [self.current_model.get_pipes(self.config.play.\
                                                       search_threads) 
                         for _ in range(self.config.play.max_processes)])
-
+    
     def start(self):
         self.buffer = []
 
@@ -43,7 +47,7 @@ class SelfPlayWorker:
         with ProcessPoolExecutor(max_workers=self.config.play.max_processes) \
             as executor:
             for game_idx in range(self.config.play.max_processes):
-                futures.append(executor.submit(self_play_buffer(), 
+                futures.append(executor.submit(self_play_buffer, 
                                                self.config, 
                                                cur=self.cur_pipes))
             game_idx = 0
@@ -61,12 +65,13 @@ class SelfPlayWorker:
                     self.flush_buffer()
                     reload_best_model_weight_if_changed(self.current_model)
                 # Keep it going
-                futures.append(executor.submit(self_play_buffer(), 
+                futures.append(executor.submit(self_play_buffer, 
                                                self.config, 
                                                cur=self.cur_pipes))  
         
         if len(data) > 0:
             self.flush_buffer()
+        self.writer.close()
     
     def load_model(self):
         model = ChessModel(self.config)
@@ -81,9 +86,7 @@ class SelfPlayWorker:
         path = os.path.join(rc.play_data_dir, 
                             rc.play_data_filename_tmpl % game_id)
         logger.info(f"save play data to {path}")
-        thread = Thread(target = write_game_data_to_file(), 
-                        args = (path, self.buffer))
-        thread.start()
+        self.writer.write(path, self.buffer)
         self.buffer = []
     
     def remove_play_data(self):
@@ -99,8 +102,8 @@ def self_play_buffer(config, cur) -> Union[ChessEnv, list]:
     pipes = cur.pop()   # borrow
     env = ChessEnv().reset()
 
-    white = ChessPlayer(config, pipes=pipes)
-    black = ChessPlayer(config, pipes=pipes)
+    white = create_player(config, pipes=pipes)
+    black = create_player(config, pipes=pipes)
 
     while not env.done:
         if env.white_to_move:
@@ -3,7 +3,6 @@ import re
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from logging import getLogger
-from threading import Thread
 from time import time
 from typing import Union
 
@@ -12,7 +11,7 @@ import chess.pgn
 from chess_zero.agent.player_chess import ChessPlayer
 from config import Config
 from chess_zero.env.chess_env import ChessEnv, Winner
-from chess_zero.lib.data_helper import write_game_data_to_file, find_pgn_files
+from chess_zero.lib.data_helper import GameDataWriter, find_pgn_files
 
 logger = getLogger(__name__)
 
@@ -25,10 +24,11 @@ def start(config: Config):
 
 
 class SupervisedLearningWorker:
-    def __init__(self):
-        self.config = Config
+    def __init__(self, config: Config):
+        self.config = config
         self.buffer = []
-
+        self.writer = GameDataWriter()
+    
     def start(self):
         self.buffer = []
         # noinspection PyAttributeOutsideInit
@@ -44,17 +44,17 @@ class SupervisedLearningWorker:
                 env, data = res.result()
                 self.save_data(data)
                 end_time = time()
-                logger.debug(f"game {self.idx:4} 
-                             time={(end_time - start_time):.3f}s "
-                             f"halfmoves={env.num_halfmoves:3} 
-                             {env.winner:12}"
-                             f"{' by resign ' if env.resigned 
-                                else '            '}"
-                             f"{env.observation.split(' ')[0]}")
+                logger.debug(
+                    f"game {self.idx:4} "
+                    f"time={(end_time - start_time):.3f}s "
+                    f"halfmoves={env.num_halfmoves:3} {env.winner:12}"
+                    f"{' by resign ' if env.resigned else '            '}"
+                    f"{env.observation.split(' ')[0]}")
                 start_time = end_time
             
         if len(self.buffer) > 0:
             self.flush_buffer()
+        self.writer.close()
     
     def get_games_from_all_files(self):
         files = find_pgn_files(self.config.resource.play_data_dir)
@@ -76,21 +76,19 @@ class SupervisedLearningWorker:
         path = os.path.join(rc.play_data_dir, 
                             rc.play_data_filename_tmpl % game_id)
         logger.info(f"save play data to {path}")
-        thread = Thread(target=write_game_data_to_file(), 
-                        args=(path, self.buffer))
-        thread.start()
+        self.writer.write(path, self.buffer)
         self.buffer = []
 
 
 def get_games_from_file(filename):
     pgn = open(filename, errors='ignore')
-    offsets = list(chess.pgn.scan_offsets(pgn))
-    n = len(offsets)
-    print(f"found {n} games")
     games = []
-    for offset in offsets:
-        pgn.seek(offset)
-        games.append(chess.pgn.read_game(pgn))
+    while True:
+        game = chess.pgn.read_game(pgn)
+        if game is None:
+            break
+        games.append(game)
+    print(f"found {len(games)} games")
     return games
 
 
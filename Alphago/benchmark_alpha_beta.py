@@ -0,0 +1,96 @@
+import argparse
+import random
+import time
+
+from dlgo import goboard_fast as goboard
+from dlgo import gotypes
+from dlgo import minmax
+from dlgo import ttt
+from dlgo.agent.naive import RandomBot
+
+
+def capture_diff(game_state):
+    black_stones = 0
+    white_stones = 0
+    for r in range(1, game_state.board.num_rows + 1):
+        for c in range(1, game_state.board.num_cols + 1):
+            color = game_state.board.get(gotypes.Point(r, c))
+            if color == gotypes.Player.black:
+                black_stones += 1
+            elif color == gotypes.Player.white:
+                white_stones += 1
+    diff = black_stones - white_stones
+    if game_state.next_player == gotypes.Player.black:
+        return diff
+    return -1 * diff
+
+
+def go_positions(args):
+    random.seed(args.seed)
+    bot = RandomBot()
+    positions = []
+    while len(positions) < args.positions:
+        game = goboard.GameState.new_game(args.board_size)
+        for _ in range(args.opening_moves):
+            game = game.apply_move(bot.select_move(game))
+        if not game.is_over():
+            positions.append(game)
+    return positions
+
+
+def time_agent(agent, positions):
+    start = time.time()
+    nodes = 0
+    for game_state in positions:
+        agent.select_move(game_state)
+        nodes += getattr(agent, 'nodes', 0)
+    return (time.time() - start) / len(positions), nodes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', '-b', type=int, default=5)
+    parser.add_argument('--positions', type=int, default=5)
+    parser.add_argument('--opening-moves', type=int, default=6)
+    parser.add_argument(
+        '--depth', type=int, default=4,
+        help='Deepest search, in moves.'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    positions = go_positions(args)
+
+    # AlphaBetaAgent(n) searches n moves below each root move
+    print('%-24s %6s %12s %12s' % ('go agent', 'depth', 'sec/move', 'nodes/sec'))
+    for depth in range(2, args.depth + 1):
+        seconds, _ = time_agent(
+            minmax.AlphaBetaAgent(depth - 1, capture_diff),
+            positions,
+        )
+        print('%-24s %6d %12.3f %12s' % ('AlphaBetaAgent', depth, seconds, '-'))
+        seconds, nodes = time_agent(
+            minmax.IterativeDeepeningAgent(depth, capture_diff),
+            positions,
+        )
+        print('%-24s %6d %12.3f %12.0f' % (
+            'IterativeDeepeningAgent',
+            depth,
+            seconds,
+            nodes / (seconds * len(positions)),
+        ))
+
+    print('%-24s %12s %12s' % ('tic-tac-toe agent', 'sec/move', 'nodes/sec'))
+    empty_board = [ttt.GameState.new_game()]
+    seconds, _ = time_agent(minmax.MinmaxAgent(), empty_board)
+    print('%-24s %12.3f %12s' % ('MinmaxAgent', seconds, '-'))
+    seconds, nodes = time_agent(minmax.IterativeDeepeningAgent(9), empty_board)
+    print('%-24s %12.3f %12.0f' % (
+        'IterativeDeepeningAgent',
+        seconds,
+        nodes / seconds,
+    ))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
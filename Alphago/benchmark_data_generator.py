@@ -0,0 +1,86 @@
+import argparse
+import os
+import time
+
+from dlgo.data.generator import DataGenerator
+from dlgo.data.parallel_processor import GoDataProcessor
+from dlgo.data.prefetch import PrefetchDataGenerator
+from dlgo.data.shards import index_path
+
+
+def run(generator, args):
+    # batches/sec, and the share of the time a training loop taking
+    # step_time per batch would spend waiting for input
+    batches = generator.generate(args.batch_size)
+    next(batches)
+    waited = 0.0
+    start = time.time()
+    for _ in range(args.batches):
+        wait_start = time.time()
+        next(batches)
+        waited += time.time() - wait_start
+        if args.step_time > 0:
+            time.sleep(args.step_time)
+    elapsed = time.time() - start
+    return args.batches / elapsed, waited / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-directory', default='data')
+    parser.add_argument('--data-type', default='train')
+    parser.add_argument('--encoder', default='simple')
+    parser.add_argument(
+        '--num-games', type=int, default=100,
+        help='Games to sample if the shards do not exist yet.'
+    )
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--batches', type=int, default=500)
+    parser.add_argument(
+        '--step-time', type=float, default=0.0,
+        help='Seconds of simulated training per batch.'
+    )
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--augment', action='store_true')
+
+    args = parser.parse_args()
+    if not os.path.isfile(index_path(args.data_directory, args.data_type)):
+        processor = GoDataProcessor(
+            encoder=args.encoder,
+            data_directory=args.data_directory,
+        )
+        processor.load_go_data(
+            args.data_type,
+            args.num_games,
+            use_generator=True,
+        )
+
+    print('%-22s %12s %10s' % ('generator', 'batches/sec', 'waiting'))
+    generator = DataGenerator(
+        args.data_directory,
+        [],
+        args.augment,
+        args.data_type,
+    )
+    print('%-22s %12.1f %9.1f%%' % (
+        ('DataGenerator',) + _percent(run(generator, args))
+    ))
+    generator = PrefetchDataGenerator(
+        args.data_directory,
+        args.data_type,
+        args.augment,
+        num_workers=args.workers,
+    )
+    print('%-22s %12.1f %9.1f%%' % (
+        ('PrefetchDataGenerator',) + _percent(run(generator, args))
+    ))
+    generator.close()
+
+
+def _percent(result):
+    batches_per_sec, waiting = result
+    return batches_per_sec, 100 * waiting
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
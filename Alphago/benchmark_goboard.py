@@ -0,0 +1,145 @@
+import argparse
+import random
+import time
+
+from dlgo.goboards import GOBOARD_NAMES, get_goboard_by_name
+
+
+def record_games(
+        board_size,
+        num_games,
+        max_moves,
+        seed):
+    
+    # play random legal games once with the array backend, then replay
+    # the same move lists on every backend
+    random.seed(seed)
+    goboard = get_goboard_by_name('array')
+    games = []
+    for _ in range(num_games):
+        game = goboard.GameState.new_game(board_size)
+        moves = []
+        while not game.is_over() and len(moves) < max_moves:
+            candidates = [
+                move for move in game.legal_moves() if move.is_play
+            ]
+            if candidates:
+                move = random.choice(candidates)
+            else:
+                move = goboard.Move.pass_turn()
+            moves.append(move)
+            game = game.apply_move(move)
+        games.append(moves)
+    return games
+
+
+def time_apply_move(goboard, board_size, games):
+    num_moves = 0
+    start = time.time()
+    for moves in games:
+        game = goboard.GameState.new_game(board_size)
+        for move in moves:
+            game = game.apply_move(move)
+        num_moves += len(moves)
+    return num_moves / (time.time() - start)
+
+
+def time_push_pop(goboard, board_size, games):
+    # plays each game forward with push() and takes it all back again,
+    # only for backends with undo support
+    num_moves = 0
+    start = time.time()
+    for moves in games:
+        game = goboard.GameState.new_game(board_size)
+        for move in moves:
+            game.push(move)
+        while game.depth > 0:
+            game.pop()
+        num_moves += len(moves)
+    return num_moves / (time.time() - start)
+
+
+def time_legal_moves(
+        goboard,
+        board_size,
+        games,
+        sample_every):
+    
+    num_calls = 0
+    elapsed = 0.0
+    for moves in games:
+        game = goboard.GameState.new_game(board_size)
+        for i, move in enumerate(moves):
+            if i % sample_every == 0:
+                start = time.time()
+                game.legal_moves()
+                elapsed += time.time() - start
+                num_calls += 1
+            game = game.apply_move(move)
+    return num_calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', '-b', type=int, default=19)
+    parser.add_argument('--num-games', '-n', type=int, default=10)
+    parser.add_argument(
+        '--max-moves', '-m', type=int, default=300,
+        help='max moves per game.'
+    )
+    parser.add_argument(
+        '--legal-every', type=int, default=10,
+        help='time legal_moves() on every n-th position.'
+    )
+    parser.add_argument(
+        '--backends', nargs='+', default=list(GOBOARD_NAMES),
+        choices=GOBOARD_NAMES,
+    )
+    parser.add_argument('--seed', type=int, default=1337)
+
+    args = parser.parse_args()
+    games = record_games(
+        args.board_size,
+        args.num_games,
+        args.max_moves,
+        args.seed,
+    )
+    print('%d games, %d moves on %dx%d' % (
+        len(games),
+        sum(len(moves) for moves in games),
+        args.board_size,
+        args.board_size,
+    ))
+    print('%-8s %16s %16s %18s' % (
+        'backend',
+        'apply_move/sec',
+        'push_pop/sec',
+        'legal_moves/sec',
+    ))
+    for name in args.backends:
+        goboard = get_goboard_by_name(name)
+        moves_per_sec = time_apply_move(goboard, args.board_size, games)
+        if hasattr(goboard.GameState, 'push'):
+            push_pop = '%16.1f' % time_push_pop(
+                goboard,
+                args.board_size,
+                games,
+            )
+        else:
+            push_pop = '%16s' % '-'
+        legal_per_sec = time_legal_moves(
+            goboard,
+            args.board_size,
+            games,
+            args.legal_every,
+        )
+        print('%-8s %16.1f %s %18.2f' % (
+            name,
+            moves_per_sec,
+            push_pop,
+            legal_per_sec,
+        ))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
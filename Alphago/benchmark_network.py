@@ -0,0 +1,105 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from dlgo.nn import network
+from dlgo.nn.layers import ActivationLayer, DenseLayer
+
+
+def synthetic_data(num_samples, seed):
+    # MNIST shaped: 784 pixels in [0, 1] and one-hot labels of 10 digits
+    rng = np.random.RandomState(seed)
+    data = []
+    for _ in range(num_samples):
+        x = rng.uniform(0, 1, size=(784, 1))
+        y = np.zeros((10, 1))
+        y[rng.randint(10)] = 1.0
+        data.append((x, y))
+    return data
+
+
+def load(args):
+    if os.path.exists(args.mnist):
+        from dlgo.nn import load_mnist
+        training_data, test_data = load_mnist.load_data(args.mnist)
+        print('MNIST from %s' % args.mnist)
+    else:
+        training_data = synthetic_data(args.samples, args.seed)
+        test_data = synthetic_data(args.samples // 5, args.seed + 1)
+        print('%s not found, using random data of the same shape' % (
+            args.mnist,
+        ))
+    return training_data[:args.samples], test_data[:args.samples // 5]
+
+
+def build(batched, dtype, seed):
+    # same initial weights for every mode
+    np.random.seed(seed)
+    net = network.SequentialNetwork(batched=batched, dtype=dtype)
+    net.add(DenseLayer(784, 392))
+    net.add(ActivationLayer(392))
+    net.add(DenseLayer(392, 196))
+    net.add(ActivationLayer(196))
+    net.add(DenseLayer(196, 10))
+    net.add(ActivationLayer(10))
+    return net
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--mnist', default='mnist.pkl.gz',
+        help='Path of mnist.pkl.gz; random data is used if it is missing.'
+    )
+    parser.add_argument('--samples', type=int, default=10000)
+    parser.add_argument('--mini-batch-size', type=int, default=10)
+    parser.add_argument('--learning-rate', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    training_data, test_data = load(args)
+    modes = (
+        ('per sample', False, None),
+        ('batched float64', True, None),
+        ('batched float32', True, np.float32),
+    )
+    results = []
+    for name, batched, dtype in modes:
+        net = build(batched, dtype, args.seed)
+        start = time.time()
+        net.train(
+            list(training_data),
+            epochs=1,
+            mini_batch_size=args.mini_batch_size,
+            learning_rate=args.learning_rate,
+        )
+        train_seconds = time.time() - start
+        start = time.time()
+        correct = net.evaluate(test_data)
+        results.append((
+            name,
+            len(training_data) / train_seconds,
+            time.time() - start,
+            correct,
+        ))
+
+    print('%-16s %16s %14s %10s' % (
+        'mode',
+        'samples/sec',
+        'evaluate sec',
+        'correct',
+    ))
+    for name, samples_per_sec, evaluate_seconds, correct in results:
+        print('%-16s %16.0f %14.3f %6d/%d' % (
+            name,
+            samples_per_sec,
+            evaluate_seconds,
+            correct,
+            len(test_data),
+        ))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
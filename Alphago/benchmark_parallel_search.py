@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import time
+
+from dlgo import mcts
+from dlgo.goboards import get_goboard_by_name
+from dlgo.gotypes import Player
+from dlgo.scoring import compute_game_result
+
+
+def play_game(
+        goboard,
+        board_size,
+        black,
+        white,
+        max_moves):
+    
+    # returns the winner and the seconds each player spent per move
+    agents = {Player.black: black, Player.white: white}
+    elapsed = {Player.black: 0.0, Player.white: 0.0}
+    num_moves = {Player.black: 0, Player.white: 0}
+    game = goboard.GameState.new_game(board_size)
+    while not game.is_over() and sum(num_moves.values()) < max_moves:
+        player = game.next_player
+        start = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            move = agents[player].select_move(game)
+        elapsed[player] += time.time() - start
+        num_moves[player] += 1
+        game = game.apply_move(move)
+    winner = game.winner()
+    if winner is None:
+        # stopped at max_moves, count the board as it stands
+        winner = compute_game_result(game).winner
+    return winner, {
+        player: elapsed[player] / max(num_moves[player], 1)
+        for player in elapsed
+    }
+
+
+def compare(
+        goboard,
+        board_size,
+        candidate,
+        baseline,
+        num_games,
+        max_moves):
+    
+    wins = 0
+    candidate_time = 0.0
+    baseline_time = 0.0
+    for i in range(num_games):
+        candidate_color = Player.black if i % 2 == 0 else Player.white
+        if candidate_color == Player.black:
+            black, white = candidate, baseline
+        else:
+            black, white = baseline, candidate
+        winner, times = play_game(
+            goboard,
+            board_size,
+            black,
+            white,
+            max_moves,
+        )
+        wins += winner == candidate_color
+        candidate_time += times[candidate_color]
+        baseline_time += times[candidate_color.other]
+    return (
+        float(wins) / num_games,
+        candidate_time / num_games,
+        baseline_time / num_games,
+    )
+
+
+def zero_agents(args):
+    # leaf parallel ZeroAgents sharing one network, needs keras
+    from keras.models import load_model
+    from dlgo import zero
+    model = load_model(args.zero_model)
+    encoder = zero.ZeroEncoder(args.board_size)
+
+    def make(batch_size):
+        return zero.ZeroAgent(
+            model,
+            encoder,
+            rounds_per_move=args.rounds,
+            leaf_batch_size=batch_size,
+            virtual_loss=args.virtual_loss,
+        )
+    return make
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', '-b', type=int, default=9)
+    parser.add_argument('--rounds', '-r', type=int, default=400)
+    parser.add_argument('--num-games', '-n', type=int, default=10)
+    parser.add_argument('--max-moves', type=int, default=200)
+    parser.add_argument(
+        '--workers', type=int, nargs='+', default=[2, 4],
+        help='root parallel MCTSAgent worker counts to compare.'
+    )
+    parser.add_argument(
+        '--zero-model',
+        help='keras model for ZeroAgent, enables the leaf parallel runs.'
+    )
+    parser.add_argument(
+        '--leaf-batches', type=int, nargs='+', default=[8, 16],
+    )
+    parser.add_argument('--virtual-loss', type=float, default=1.0)
+    parser.add_argument('--goboard', default='fast')
+
+    args = parser.parse_args()
+    goboard = get_goboard_by_name(args.goboard)
+    print('%-24s %10s %14s %14s' % (
+        'candidate vs sequential',
+        'win rate',
+        'sec/move',
+        'seq sec/move',
+    ))
+
+    def sequential_mcts():
+        return mcts.MCTSAgent(
+            args.rounds,
+            1.4,
+            playout_engine=mcts.PlayoutEngine(),
+        )
+
+    for num_workers in args.workers:
+        candidate = mcts.MCTSAgent(
+            args.rounds,
+            1.4,
+            playout_engine=mcts.PlayoutEngine(),
+            num_workers=num_workers,
+        )
+        result = compare(
+            goboard,
+            args.board_size,
+            candidate,
+            sequential_mcts(),
+            args.num_games,
+            args.max_moves,
+        )
+        candidate.close()
+        print('%-24s %10.2f %14.3f %14.3f' % (
+            ('mcts root x%d' % num_workers,) + result
+        ))
+
+    if args.zero_model:
+        make_zero = zero_agents(args)
+        for batch_size in args.leaf_batches:
+            result = compare(
+                goboard,
+                args.board_size,
+                make_zero(batch_size),
+                make_zero(1),
+                args.num_games,
+                args.max_moves,
+            )
+            print('%-24s %10.2f %14.3f %14.3f' % (
+                ('zero leaf x%d' % batch_size,) + result
+            ))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
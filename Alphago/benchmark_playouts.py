@@ -0,0 +1,79 @@
+import argparse
+import time
+
+from dlgo.goboards import get_goboard_by_name
+from dlgo.mcts import MCTSAgent, PlayoutEngine
+
+
+def time_engine(game_state, num_playouts, settle_every=0):
+    engine = PlayoutEngine(settle_every=settle_every)
+    start = time.time()
+    engine.playouts(game_state, num_playouts)
+    return num_playouts / (time.time() - start)
+
+
+def time_random_bot(game_state, num_playouts, settle_every=0):
+    start = time.time()
+    for _ in range(num_playouts):
+        MCTSAgent.simulate_random_game(game_state, settle_every)
+    return num_playouts / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--board-sizes', type=int, nargs='+', default=[9, 19],
+    )
+    parser.add_argument(
+        '--num-playouts', '-n', type=int, default=500,
+        help='playouts per board size with the playout engine.'
+    )
+    parser.add_argument(
+        '--num-baseline', type=int, default=10,
+        help='playouts per board size with RandomBot, 0 to skip.'
+    )
+    parser.add_argument('--goboard', default='fast')
+    parser.add_argument(
+        '--settle-every', type=int, default=10,
+        help='Also time playouts that stop once Benson pass-alive '
+        'analysis decides them, checked every this many moves.'
+    )
+
+    args = parser.parse_args()
+    goboard = get_goboard_by_name(args.goboard)
+    print('%-6s %18s %18s %18s %18s' % (
+        'size',
+        'engine/sec',
+        'settled/sec',
+        'RandomBot/sec',
+        'settled/sec',
+    ))
+    for board_size in args.board_sizes:
+        game_state = goboard.GameState.new_game(board_size)
+        columns = [
+            '%18.2f' % time_engine(game_state, args.num_playouts),
+            '%18.2f' % time_engine(
+                game_state,
+                args.num_playouts,
+                args.settle_every,
+            ),
+        ]
+        if args.num_baseline:
+            columns += [
+                '%18.2f' % time_random_bot(game_state, args.num_baseline),
+                '%18.2f' % time_random_bot(
+                    game_state,
+                    args.num_baseline,
+                    args.settle_every,
+                ),
+            ]
+        else:
+            columns += ['%18s' % '-', '%18s' % '-']
+        print('%-6s %s' % (
+            '%dx%d' % (board_size, board_size),
+            ' '.join(columns),
+        ))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
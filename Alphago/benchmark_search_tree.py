@@ -0,0 +1,125 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from dlgo.goboards import get_goboard_by_name
+from dlgo.zero import ZeroAgent, ZeroEncoder
+
+
+class RandomModel():
+    # stands in for the network, so the timings are the tree's own
+    def __init__(self, num_moves, seed=0):
+        self._num_moves = num_moves
+        self._rng = np.random.RandomState(seed)
+    
+    def predict(self, model_input):
+        num_states = model_input.shape[0]
+        priors = self._rng.dirichlet(
+            np.ones(self._num_moves),
+            size=num_states,
+        )
+        values = self._rng.uniform(-1, 1, size=(num_states, 1))
+        return priors, values
+
+
+def count_nodes(root):
+    if hasattr(root, 'tree'):
+        return root.tree.num_nodes
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.extend(node.children.values())
+    return len(seen)
+
+
+def make_agent(args, array_tree):
+    encoder = ZeroEncoder(args.board_size)
+    return ZeroAgent(
+        RandomModel(encoder.num_moves()),
+        encoder,
+        rounds_per_move=args.rounds,
+        mutable_search=True,
+        leaf_batch_size=args.leaf_batch_size,
+        reuse_tree=True,
+        array_tree=array_tree,
+    )
+
+
+def run(args, goboard, array_tree):
+    game_state = goboard.GameState.new_game(args.board_size)
+
+    agent = make_agent(args, array_tree)
+    start = time.time()
+    agent.select_move(game_state)
+    elapsed = time.time() - start
+    root = agent._last_root
+    num_nodes = count_nodes(root)
+
+    # PUCT selections alone, over the root and its children
+    nodes = [root] + [
+        root.get_child(move) for move in root.moves()
+        if root.has_child(move)
+    ]
+    start = time.time()
+    num_selects = 0
+    while num_selects < args.selects:
+        for node in nodes:
+            if not node.is_terminal():
+                agent.select_branch(node)
+                num_selects += 1
+    select_elapsed = time.time() - start
+
+    # memory freed by dropping a tree of the same size, measured in a
+    # second search since tracing slows it down
+    del agent, root, nodes
+    tracemalloc.start()
+    agent = make_agent(args, array_tree)
+    agent.select_move(game_state)
+    with_tree, _ = tracemalloc.get_traced_memory()
+    agent._last_root = None
+    agent._tree = None
+    gc.collect()
+    without_tree, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    traced = with_tree - without_tree
+    return (
+        num_nodes / elapsed,
+        float(traced) / num_nodes,
+        num_selects / select_elapsed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', '-b', type=int, default=9)
+    parser.add_argument('--rounds', '-r', type=int, default=800)
+    parser.add_argument('--leaf-batch-size', type=int, default=8)
+    parser.add_argument(
+        '--selects', type=int, default=20000,
+        help='PUCT selections to time on the finished tree.'
+    )
+    parser.add_argument('--goboard', default='fast')
+
+    args = parser.parse_args()
+    goboard = get_goboard_by_name(args.goboard)
+    print('%-14s %12s %12s %14s' % (
+        'tree',
+        'nodes/sec',
+        'bytes/node',
+        'selects/sec',
+    ))
+    for name, array_tree in (('ZeroTreeNode', False), ('ArrayTree', True)):
+        print('%-14s %12.1f %12.1f %14.1f' % (
+            (name,) + run(args, goboard, array_tree)
+        ))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from dlgo.agent.naive import RandomBot
+from dlgo.goboard_fast import GameState
+from dlgo.serving import BotServer, ModelBatcher, encode_move
+from dlgo.zero import ZeroAgent, ZeroEncoder
+
+
+class SlowRandomModel():
+    # random priors and values that take as long as a network call: a
+    # fixed cost per call plus a small cost per position
+    def __init__(
+            self,
+            num_moves,
+            call_latency,
+            row_latency):
+        
+        self._num_moves = num_moves
+        self._call_latency = call_latency
+        self._row_latency = row_latency
+        self._rng = np.random.RandomState(0)
+        self._lock = threading.Lock()
+    
+    def predict(self, model_input):
+        num_states = model_input.shape[0]
+        # one device: calls from several threads run one after another
+        with self._lock:
+            time.sleep(self._call_latency + self._row_latency * num_states)
+            priors = self._rng.dirichlet(
+                np.ones(self._num_moves),
+                size=num_states,
+            )
+            values = self._rng.uniform(-1, 1, size=(num_states, 1))
+        return priors, values
+
+
+def play_user(
+        server,
+        user,
+        args):
+    
+    # one client: plays random moves against the bot, sending the whole
+    # move list each time like the web frontend does
+    opponent = RandomBot()
+    game_state = GameState.new_game(args.board_size)
+    moves = []
+    for _ in range(args.moves):
+        if game_state.is_over():
+            break
+        move = opponent.select_move(game_state)
+        game_state = game_state.apply_move(move)
+        moves.append(encode_move(move))
+        if game_state.is_over():
+            break
+        bot_move, _ = server.select_move(
+            'zero',
+            args.board_size,
+            moves,
+            game_id='user%d' % user,
+        )
+        game_state = game_state.apply_move(bot_move)
+        moves.append(encode_move(bot_move))
+
+
+def run(args, batched):
+    encoder = ZeroEncoder(args.board_size)
+    model = SlowRandomModel(
+        encoder.num_moves(),
+        args.call_latency,
+        args.row_latency,
+    )
+    if batched:
+        model = ModelBatcher(
+            model,
+            max_batch_size=args.max_batch_size,
+            max_wait=args.max_wait,
+        )
+    
+    def make_agent():
+        return ZeroAgent(model, encoder, rounds_per_move=args.rounds)
+
+    server = BotServer({'zero': make_agent}, max_workers=args.users)
+    start = time.time()
+    users = [
+        threading.Thread(target=play_user, args=(server, user, args))
+        for user in range(args.users)
+    ]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.time() - start
+    latency = server.stats()['latency_ms']['zero']
+    mean_batch = model.mean_batch_size() if batched else 1.0
+    return latency['count'] / elapsed, latency, mean_batch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', '-b', type=int, default=9)
+    parser.add_argument('--users', '-u', type=int, default=16)
+    parser.add_argument('--moves', type=int, default=10)
+    parser.add_argument('--rounds', '-r', type=int, default=20)
+    parser.add_argument(
+        '--call-latency', type=float, default=0.004,
+        help='Simulated seconds per predict call.'
+    )
+    parser.add_argument(
+        '--row-latency', type=float, default=0.0001,
+        help='Simulated seconds per position in a predict call.'
+    )
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait', type=float, default=0.002)
+
+    args = parser.parse_args()
+    print('%-10s %10s %10s %10s %10s %11s' % (
+        'model',
+        'moves/sec',
+        'p50 ms',
+        'p90 ms',
+        'p99 ms',
+        'mean batch',
+    ))
+    for name, batched in (('direct', False), ('batched', True)):
+        moves_per_sec, latency, mean_batch = run(args, batched)
+        print('%-10s %10.1f %10.1f %10.1f %10.1f %11.1f' % (
+            name,
+            moves_per_sec,
+            latency['p50'],
+            latency['p90'],
+            latency['p99'],
+            mean_batch,
+        ))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
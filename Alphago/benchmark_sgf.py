@@ -0,0 +1,96 @@
+import argparse
+import random
+import tarfile
+import time
+
+from dlgo.gosgf import Sgf_game, iter_main_line
+
+
+def kgs_like_game(rng, num_moves):
+    # what a KGS record looks like to a parser: a root with game info,
+    # then one move per node, some with comments
+    columns = 'abcdefghijklmnopqrs'
+    nodes = [
+        '(;GM[1]FF[4]CA[UTF-8]SZ[19]KM[0.50]TM[300]OT[5x30 byo-yomi]'
+        'PW[white%d]PB[black%d]WR[5d]BR[4d]DT[2009-01-01]PC[The KGS Go '
+        'Server at http://www.gokgs.com/]RE[W+Resign]RU[Japanese]' % (
+            rng.randint(0, 9999),
+            rng.randint(0, 9999),
+        )
+    ]
+    color = 'B'
+    for i in range(num_moves):
+        move = rng.choice(columns) + rng.choice(columns)
+        node = ';%s[%s]' % (color, move)
+        if rng.random() < 0.02:
+            node += 'C[white%d [4d\\]: hi (gg);]' % i
+        nodes.append(node)
+        color = 'W' if color == 'B' else 'B'
+    return (''.join(nodes) + ')').encode('ascii')
+
+
+def load_games(args):
+    if args.archive is None:
+        rng = random.Random(args.seed)
+        return [
+            kgs_like_game(rng, rng.randint(150, 300))
+            for _ in range(args.num_games)
+        ]
+    games = []
+    with tarfile.open(args.archive, 'r|*') as archive:
+        for member in archive:
+            if member.name.endswith('.sgf'):
+                games.append(archive.extractfile(member).read())
+                if len(games) == args.num_games:
+                    break
+    return games
+
+
+def tree_moves(sgf_content):
+    game = Sgf_game.from_string(sgf_content)
+    return [
+        node.get_move() for node in game.main_sequence_iter()
+        if node.get_move()[0] is not None
+    ]
+
+
+def fast_moves(sgf_content):
+    return list(iter_main_line(sgf_content))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--archive',
+        help='KGS .tar.gz to read games from; random KGS-like games '
+        'are generated without it.'
+    )
+    parser.add_argument('--num-games', '-n', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    games = load_games(args)
+    print('%d games, %.1f MB' % (
+        len(games),
+        sum(len(game) for game in games) / 1e6,
+    ))
+
+    results = {}
+    for name, parse in (
+            ('Sgf_game', tree_moves),
+            ('iter_main_line', fast_moves)):
+        
+        start = time.time()
+        results[name] = [parse(game) for game in games]
+        elapsed = time.time() - start
+        print('%-16s %10.1f games/sec %10.1f moves/sec' % (
+            name,
+            len(games) / elapsed,
+            sum(len(moves) for moves in results[name]) / elapsed,
+        ))
+    if results['Sgf_game'] != results['iter_main_line']:
+        print('main lines differ')
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -1,12 +1,36 @@
+import argparse
+import time
+
 from dlgo import agent 
 from dlgo import goboard_fast as goboard
 from dlgo import gotypes
+from dlgo.rl.simulate import simulate_games
 from dlgo.utils import print_board, print_move
-import time
 
 
 def main():
-    board_size = 9
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', type=int, default=9)
+    parser.add_argument(
+        '--num-games', '-n', type=int, default=0,
+        help='Play this many games on a process pool and report the '
+        'results instead of showing one game.'
+    )
+    parser.add_argument('--num-workers', '-w', type=int, default=None)
+
+    args = parser.parse_args()
+    board_size = args.board_size
+    if args.num_games:
+        result = simulate_games(
+            args.num_games,
+            agent.naive.RandomBot,
+            agent.naive.RandomBot,
+            board_size=board_size,
+            num_workers=args.num_workers,
+        )
+        print(result.report())
+        return
+
     game = goboard.GameState.new_game(board_size)
     bots = {
         gotypes.Player.black: agent.naive.RandomBot(),
@@ -1,4 +1,5 @@
 from .alphago import *
 from .naive import *
+from .naive_fast import *
 from .termination import *
 from .pg import *
\ No newline at end of file
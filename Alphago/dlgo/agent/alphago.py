@@ -3,7 +3,8 @@ import numpy as np
 from dlgo.agent.base import Agent
 from dlgo.goboard_fast import Move
 from dlgo import kerasutil
-import operator
+from dlgo import movemasks
+from dlgo.transposition import follow_moves, situation_key
 
 
 class AlphaGoNode:
@@ -22,9 +23,15 @@ class AlphaGoNode:
     def select_child(self):
         return max(
             self.children.items(),
-            key=lambda child: child[1].q_values + child[1].u_value,
+            key=lambda child: child[1].q_value + child[1].u_value,
         )
     
+    def has_child(self, move):
+        return move in self.children
+    
+    def get_child(self, move):
+        return self.children[move]
+    
     def expand_children(
             self,
             moves,
@@ -32,12 +39,16 @@ class AlphaGoNode:
         
         for move, prob in zip(moves, probabilities):
             if move not in self.children:
-                self.children[move] = AlphaGoNode(probability=prob)
+                self.children[move] = AlphaGoNode(
+                    parent=self,
+                    probability=prob,
+                )
     
     def update_values(self, leaf_value):
+        # leaf_value is seen by the player who moved into this node
         if self.parent is not None:
-            self.parent.update_values(leaf_value)
-        
+            self.parent.update_values(-1 * leaf_value)
+
         self.visit_count += 1
         self.q_value += leaf_value / self.visit_count
 
@@ -56,7 +67,9 @@ class AlphaGoMCTS(Agent):
             lambda_value=0.5,
             num_simulations=1000,
             depth=50,
-            rollout_limit=100):
+            rollout_limit=100,
+            reuse_tree=True,
+            transposition_table=None):
         
         self.policy = policy_agent
         self.rollout_policy = fast_policy_agent
@@ -66,8 +79,39 @@ class AlphaGoMCTS(Agent):
         self.depth = depth
         self.rollout_limit = rollout_limit
         self.root = AlphaGoNode()
+        # the chosen child becomes the root, and the next search starts
+        # from its child for the opponent's reply
+        self.reuse_tree = reuse_tree
+        self._root_key = None
+        # optional TranspositionTable of earlier roots by position
+        self.transpositions = transposition_table
+        self.reuse_lookups = 0
+        self.reuse_hits = 0
+    
+    def reuse_hit_rate(self):
+        if self.reuse_lookups == 0:
+            return 0.0
+        return float(self.reuse_hits) / self.reuse_lookups
+    
+    def reuse_root(self, game_state):
+        self.reuse_lookups += 1
+        key = situation_key(game_state)
+        root = None
+        if self.reuse_tree and self._root_key is not None:
+            root = follow_moves(self.root, self._root_key, game_state)
+        if root is None and self.transpositions is not None:
+            root = self.transpositions.get(key)
+        if root is None:
+            root = AlphaGoNode()
+        else:
+            self.reuse_hits += 1
+            root.parent = None
+        if self.transpositions is not None:
+            self.transpositions.put(key, root)
+        return root, key
     
     def select_move(self, game_state):
+        self.root, root_key = self.reuse_root(game_state)
         for simulation in range(self.num_simulations):
             current_state = game_state
             node = self.root
@@ -75,62 +119,58 @@ class AlphaGoMCTS(Agent):
                 if not node.children:
                     if current_state.is_over():
                         break
-                    moves, probabilities = self.policy_probabilities(current_state)
-                    nodes.expand_children(moves, probabilities)
-                move, node = current_state.apply_move(move)
+                    moves, probabilities = self.policy_probabilities(
+                        current_state
+                    )
+                    node.expand_children(moves, probabilities)
+                move, node = node.select_child()
+                current_state = current_state.apply_move(move)
+            # both are seen by the player to move at the leaf
             value = self.value.predict(current_state)
             rollout = self.policy_rollout(current_state)
             weighted_value = (1 - self.lambda_value) * value + \
                 self.lambda_value * rollout
-            node.update_values(weighted_value)
-        
+            node.update_values(-1 * weighted_value)
+
         move = max(
             self.root.children,
             key=lambda move: self.root.children.get(move).visit_count
         )
 
-        self.root = AlphaGoNode()
-        if move in self.root.children:
-            self.root = self.root.children[move]
-            self.root.parent = None
-        
+        self._root_key = root_key
         return move
     
     def policy_probabilities(self, game_state):
-        encoder = self.policy._encoder
+        encoder = self.policy.encoder
         outputs = self.policy.predict(game_state)
-        legal_moves = game_state.legal_moves()
-        if not legal_moves:
-            return [], []
+        legal_points = movemasks.legal_points(game_state)
+        if not legal_points:
+            return [Move.pass_turn()], [1.0]
         encoded_points = [
-            encoder.encode_point(move.point)
-            for move in legal_moves
-            if move.point
+            encoder.encode_point(point)
+            for point in legal_points
         ]
         legal_outputs = outputs[encoded_points]
         normalized_outputs = legal_outputs / np.sum(legal_outputs)
-        return legal_moves, normalized_outputs
+        return [Move.play(point) for point in legal_points], \
+            normalized_outputs
     
     def policy_rollout(self, game_state):
+        next_player = game_state.next_player
+        encoder = self.rollout_policy.encoder
         for step in range(self.rollout_limit):
             if game_state.is_over():
                 break
             move_probabilities = self.rollout_policy.predict(game_state)
-            encoder = self.rollout_policy._encoder
-            valid_moves = [
-                m for idx, m in enumerate(valid_moves)
-                if Move(encoder.decode_point_index(idx) in game_state.legal_moves())
-            ]
-            max_index, max_value = max(
-                enumerate(valid_moves),
-                key=operator.itemgetter(1),
-            )
-            max_point = encoder.decode_point_index(max_index)
-            greedy_move = Move(max_point)
-            if greedy_move in game_state.legal_moves():
-                game_state = game_state.apply_move(greedy_move)
-        
-        next_player = game_state.next_player
+            sensible = movemasks.sensible_play_mask(game_state)
+            greedy_move = Move.pass_turn()
+            for idx in np.argsort(move_probabilities)[::-1]:
+                point = encoder.decode_point_index(idx)
+                if sensible[point.row - 1, point.col - 1]:
+                    greedy_move = Move.play(point)
+                    break
+            game_state = game_state.apply_move(greedy_move)
+
         winner = game_state.winner()
         if winner is not None:
             return 1 if winner == next_player else -1
@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+
+from dlgo.agent.base import Agent
+from dlgo.goboard_slow import Move
+from dlgo.gotypes import Point
+from dlgo import movemasks
+
+__all__ = [
+    'FastRandomBot',
+]
+
+
+class FastRandomBot(Agent):
+    def __init__(self):
+        Agent.__init__(self)
+        self.point_cache = {}
+    
+    def _points(self, dim):
+        # Point objects by flat index, built once per board size
+        points = self.point_cache.get(dim)
+        if points is None:
+            rows, cols = dim
+            points = [
+                Point(row=r, col=c)
+                for r in range(1, rows + 1)
+                for c in range(1, cols + 1)
+            ]
+            self.point_cache[dim] = points
+        return points
+    
+    def select_move(self, game_state):
+        # draws straight from the flat mask without building a
+        # candidate list of points
+        mask = movemasks.sensible_play_mask(game_state)
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return Move.pass_turn()
+        points = self._points(mask.shape)
+        index = candidates[random.randrange(len(candidates))]
+        return Move.play(points[index])
\ No newline at end of file
@@ -2,10 +2,10 @@ import numpy as np
 from keras import optimizers    # import SGD
 
 from dlgo.agent.base import Agent
-from dlgo.agent.helpers import is_point_an_eye
 from dlgo import encoders
 from dlgo import goboard
 from dlgo import kerasutil
+from dlgo import movemasks
 
 
 def prepare_experience_data(
@@ -52,16 +52,10 @@ class PolicyAgent(Agent):
             replace=False,
             p=move_probs,
         )
+        sensible = movemasks.sensible_play_mask(game_state)
         for point_idx in ranked_moves:
             point = self._encoder.decode_point_index(point_idx)
-            move = goboard.Move.play(point)
-            is_valid = game_state.is_valid_move(move)
-            is_an_eye = is_point_an_eye(
-                game_state.board,
-                point,
-                game_state.next_player,
-            )
-            if is_valid and (not is_an_eye):
+            if sensible[point.row - 1, point.col - 1]:
                 if self._collector is not None:
                     self._collector.record_decision(
                         state=board_tensor,
@@ -93,6 +87,19 @@ class PolicyAgent(Agent):
             optimizer=optimizers.SGD(lr=lr, clipnorm=clipnorm),
         )
         
+        if hasattr(experience, 'batches'):
+            # an ExperienceReader: one pass over minibatches read from disk
+            for batch in experience.batches(batch_size):
+                self._model.train_on_batch(
+                    batch.states,
+                    prepare_experience_data(
+                        batch,
+                        self._encoder.board_width,
+                        self._encoder.board_height,
+                    ),
+                )
+            return
+
         # includes tensors with board state where the chosen move is the 
         # reward (1 / -1) and the rest is 0
         target_vectors = prepare_experience_data(
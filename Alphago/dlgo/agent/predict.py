@@ -1,10 +1,10 @@
 import numpy as np
 
 from dlgo.agent.base import Agent
-from dlgo.agent.helpers import is_point_an_eye
 from dlgo import encoders
 from dlgo import goboard
 from dlgo import kerasutil
+from dlgo import movemasks
 
 
 class DeepLearningAgent(Agent):
@@ -32,15 +32,10 @@ class DeepLearningAgent(Agent):
             replace=False,
             p=move_probs,
         )
+        sensible = movemasks.sensible_play_mask(game_state)
         for point_idx in ranked_moves:
             point = self.encoder.decode_point_index(point_idx)
-            if game_state.is_valid_move(
-                goboard.Move.play(point)
-            ) and not is_point_an_eye(
-                game_state.board,
-                point,
-                game_state.next_player
-            ):
+            if sensible[point.row - 1, point.col - 1]:
                 return goboard.Move.play(point)
         
         return goboard.Move.pass_turn()
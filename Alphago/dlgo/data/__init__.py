@@ -1,4 +1,5 @@
 from .generator import *
 from .index_processor import *
 from .parallel_processor import *
+from .prefetch import *
 from .sampling import *
\ No newline at end of file
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+
+__all__ = [
+    'ShardCache',
+    'file_checksum',
+]
+
+
+def file_checksum(path, block_size=1 << 20):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+class ShardCache():
+    # Encoded games of the KGS archives, addressed by content: the shards
+    # of an archive live under a key hashed from the archive's checksum
+    # and the encoder's name, board size and version, so they are reused
+    # by any sample that draws the same games with the same encoder, and
+    # a changed archive or encoder simply gets a new key.
+    #
+    # manifest.json holds the archive checksums (by size and mtime, so an
+    # archive is only hashed once) and, per key, the shard segments and
+    # where each encoded game sits in them. Every segment is written to
+    # a .part file first and the manifest is replaced atomically after
+    # each archive, so an interrupted run loses at most the archives in
+    # progress.
+    def __init__(
+            self,
+            data_directory,
+            encoder_name,
+            encoder):
+        
+        self.directory = data_directory + '/shard_cache'
+        self.manifest_path = self.directory + '/manifest.json'
+        _, rows, cols = encoder.shape()
+        self.encoder_key = '%s-%dx%d-v%d' % (
+            encoder_name,
+            rows,
+            cols,
+            encoder.version,
+        )
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'checksums': {}, 'archives': {}}
+    
+    def checksum(self, archive_path):
+        stat = os.stat(archive_path)
+        name = os.path.basename(archive_path)
+        known = self.manifest['checksums'].get(name)
+        if known is not None and \
+                known['size'] == stat.st_size and \
+                known['mtime'] == stat.st_mtime:
+            return known['sha1']
+        sha1 = file_checksum(archive_path)
+        self.manifest['checksums'][name] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha1': sha1,
+        }
+        return sha1
+    
+    def archive_key(self, archive_path):
+        key = self.checksum(archive_path) + ':' + self.encoder_key
+        return hashlib.sha1(key.encode('ascii')).hexdigest()[:24]
+    
+    def _entry(self, key):
+        return self.manifest['archives'].get(
+            key,
+            {'encoder': self.encoder_key, 'segments': [], 'games': {}},
+        )
+    
+    def missing_games(self, key, game_list):
+        games = self._entry(key)['games']
+        return sorted(set(
+            game for game in game_list if str(game) not in games
+        ))
+    
+    def new_segment_path(self, key):
+        segment = len(self._entry(key)['segments'])
+        return '%s/%s-%d.shard' % (self.directory, key, segment)
+    
+    def add_segment(
+            self,
+            key,
+            path,
+            games):
+        
+        # games: (game index, first record, number of records) of every
+        # game written to the segment at path
+        entry = self.manifest['archives'].setdefault(key, self._entry(key))
+        segment = len(entry['segments'])
+        entry['segments'].append(os.path.basename(path))
+        for game, offset, num_records in games:
+            entry['games'][str(game)] = [segment, offset, num_records]
+    
+    def shards(self, key, game_list):
+        # (path, first record, number of records) runs that hold the
+        # games of game_list, adjacent games merged into one run
+        entry = self._entry(key)
+        located = sorted(
+            entry['games'][str(game)] for game in set(game_list)
+            if str(game) in entry['games']
+        )
+        runs = []
+        for segment, offset, num_records in located:
+            path = self.directory + '/' + entry['segments'][segment]
+            if runs and runs[-1][0] == path and \
+                    runs[-1][1] + runs[-1][2] == offset:
+                runs[-1][2] += num_records
+            else:
+                runs.append([path, offset, num_records])
+        return [tuple(run) for run in runs]
+    
+    def save(self):
+        part_path = self.manifest_path + '.part'
+        with open(part_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(part_path, self.manifest_path)
\ No newline at end of file
@@ -1,19 +1,31 @@
-import glob
 import numpy as np
 from keras import utils # to_categorical
 
+from dlgo.data.shards import ShardDataset, ShardIndex, index_path
+from dlgo.encoders.symmetry import NUM_SYMMETRIES
+from dlgo.encoders.symmetry import augment as augment_symmetries
+
 
 class DataGenerator:
     def __init__(
             self,
             data_directory,
-            samples):
+            samples,
+            augment=False,
+            data_type='train'):
         
         self.data_directory = data_directory
         self.samples = samples
+        # yield all 8 rotations / reflections of every position
+        self.augment = augment
         self.files = set(
             file_name for file_name, index in samples
         )
+        # the shards GoDataProcessor wrote for data_type, memory mapped
+        self.dataset = ShardDataset(
+            ShardIndex.load(index_path(data_directory, data_type))
+        )
+        self.chunk_size = 1024
         self.num_samples = None
     
     def get_num_samples(
@@ -24,12 +36,15 @@ class DataGenerator:
         if self.num_samples is not None:
             return self.num_samples
         else:
+            # what _generate yields, counted from the shard index: every
+            # chunk drops the samples that do not fill a whole batch
+            multiple = NUM_SYMMETRIES if self.augment else 1
             self.num_samples = 0
-            for X, y in self._generate(
-                batch_size=batch_size,
-                num_classes=num_classes,
-            ):
-                self.num_samples += X.shape[0]
+            for records in self.dataset.shard_arrays():
+                for start in range(0, len(records), self.chunk_size):
+                    count = min(self.chunk_size, len(records) - start)
+                    count *= multiple
+                    self.num_samples += count - count % batch_size
             
             return self.num_samples
     
@@ -38,19 +53,15 @@ class DataGenerator:
             batch_size,
             num_classes):
         
-        for zip_file_name in self.files:
-            file_name = zip_file_name.replace('.tar.gz', '') + 'train'
-            base = self.data_directory + '/' + file_name + '_features_*.npy'
-            for feature_file in glob.glob(base):
-                label_file = feature_file.replace('features', 'labels')
-                x = np.load(feature_file)
-                y = np.load(label_file)
-                x = x.astype('float32')
-                y = utils.to_categorical(y.astype(int), num_classes)
-                while x.shape[0] >= batch_size:
-                    x_batch, x = x[:batch_size], x[batch_size:]
-                    y_batch, y = y[:batch_size], y[batch_size:]
-                    yield x_batch, y_batch
+        for x, y in self.dataset.iter_chunks(self.chunk_size):
+            if self.augment:
+                x, y = augment_symmetries(x, y)
+            x = x.astype('float32')
+            y = utils.to_categorical(y, num_classes)
+            while x.shape[0] >= batch_size:
+                x_batch, x = x[:batch_size], x[batch_size:]
+                y_batch, y = y[:batch_size], y[batch_size:]
+                yield x_batch, y_batch
     
     def generate(
             self,
@@ -3,19 +3,49 @@ from __future__ import absolute_import
 import os
 import sys
 import multiprocessing
+import shutil
 import six
 
 if sys.version_info[0] == 3:
-    from urllib.request import urlopen, urlretrieve
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen, urlretrieve
 else:
     from urllib import urlopen, urlretrieve
+    from urllib2 import HTTPError, Request
+
+
+def download(url, target_path):
+    # downloads to target_path + '.part' and renames it when complete, so
+    # an existing target is never truncated. The .part file of an
+    # interrupted download is continued where the server supports it.
+    part_path = target_path + '.part'
+    offset = 0
+    if os.path.isfile(part_path):
+        offset = os.path.getsize(part_path)
+    request = Request(url)
+    if offset > 0:
+        request.add_header('Range', 'bytes=%d-' % offset)
+    try:
+        response = urlopen(request)
+    except HTTPError as e:
+        if e.code != 416:
+            raise
+        # nothing left past offset: the .part file is complete
+        os.replace(part_path, target_path)
+        return
+    if offset > 0 and response.getcode() != 206:
+        offset = 0  # range ignored, start over
+    with open(part_path, 'ab' if offset > 0 else 'wb') as f:
+        shutil.copyfileobj(response, f)
+    response.close()
+    os.replace(part_path, target_path)
 
 
 def worker(url_and_target):     # parallelize data download via multiprocessing
     try:
         (url, target_path) = url_and_target
         print('>>> Downloading ' + target_path)
-        urlretrieve(url, target_path)
+        download(url, target_path)
     except (KeyboardInterrupt, SystemExit):
         print('>>> Exiting child process')
 
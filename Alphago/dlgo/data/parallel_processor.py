@@ -1,32 +1,43 @@
 from __future__ import print_function
 from __future__ import absolute_import
+import json
 import os
-import glob
-import tarfile
-import gzip
-import shutil
 import numpy as np
 import multiprocessing
-import os
 import sys
 
 from keras import utils     # to_categorical
 
-from dlgo.gosgf import Sgf_game
+from dlgo.gosgf import Main_line, iter_tar_main_lines, parse_main_line
 from dlgo.goboard_fast import Board, GameState, Move
 from dlgo.gotypes import Player, Point
 from dlgo.data.index_processor import KGSIndex
 from dlgo.data.sampling import Sampler
 from dlgo.data.generator import DataGenerator
+from dlgo.data.prefetch import PrefetchDataGenerator
+from dlgo.data.cache import ShardCache
+from dlgo.data.shards import ShardIndex, ShardDataset, ShardWriter, \
+    index_path
 from dlgo.encoders.base import get_encoder_by_name
+from dlgo.encoders.symmetry import augment as augment_symmetries
+
+
+def _read_json(path):
+    # the contents of a json file, None if it can't be read
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
 
 
 def worker(jobinfo):
     try:
-        clazz, encoder, zip_file, data_file_name, game_list = jobinfo
-        clazz(encoder=encoder).process_zip(
+        clazz, encoder, data_dir, zip_file, shard_path, game_list = \
+            jobinfo
+        return clazz(encoder=encoder, data_directory=data_dir).process_zip(
             zip_file,
-            data_file_name,
+            shard_path,
             game_list,
         )
     except (KeyboardInterrupt, SystemExit):
@@ -47,7 +58,9 @@ class GoDataProcessor:
             self,
             data_type='train',
             num_samples=1000,
-            use_generator=False):
+            use_generator=False,
+            augment=False,
+            prefetch=False):
         
         index = KGSIndex(data_directory=self.data_dir)
         index.download_files()
@@ -56,139 +69,174 @@ class GoDataProcessor:
         data = sampler.draw_data(data_type, num_samples)
 
         self.map_to_workers(data_type, data)
-        if use_generator:
-            generator = DataGenerator(self.data_dir, data)
+        if use_generator and prefetch:
+            # threaded, shuffled, sparse labels; see PrefetchDataGenerator
+            return PrefetchDataGenerator(
+                self.data_dir,
+                data_type,
+                augment,
+            )
+        elif use_generator:
+            generator = DataGenerator(
+                self.data_dir,
+                data,
+                augment,
+                data_type,
+            )
             return generator
         else:
-            features_and_labels = self.consolidate_games(data_type, data)
+            features_and_labels = self.consolidate_games(
+                data_type,
+                data,
+                augment,
+            )
             return features_and_labels
     
-    def unzip_data(self, zip_file_name):
-        this_gz = gzip.open(
-            self.data_dir + '/' + zip_file_name
-        )
-        tar_file = zip_file_name[0:-3]
-        this_tar = open(
-            self.data_dir + '/' + tar_file, 'wb'
-        )
-
-        shutil.copyfileobj(this_gz, this_tar)
-        this_tar.close()
-        return tar_file
-    
     def process_zip(
             self,
             zip_file_name,
-            data_file_name,
+            shard_path,
             game_list):
         
-        tar_file = self.unzip_data(zip_file_name)
-        zip_file = tarfile.open(self.data_dir + '/' + tar_file)
-        name_list = zip_file.getnames()
-        total_examples = self.num_total_examples(
-            zip_file, game_list, name_list
+        # streams the members of the .tar.gz and appends the positions of
+        # the listed games to the shard at shard_path, one game at a
+        # time. Returns the shard path and the (game index, first record,
+        # number of records) of every game written.
+        writer = ShardWriter(
+            shard_path,
+            self.encoder.shape(),
+            self.encoder.plane_dtype,
         )
-
-        shape = self.encoder.shape()
-        feature_shape = np.insert(
-            shape, 0, np.asarray([total_examples])
+        games = set(game_list)
+        written = []
+        try:
+            # main lines only, read straight from the sgf bytes
+            for game, main_line in iter_tar_main_lines(
+                    self.data_dir + '/' + zip_file_name,
+                    games):
+                
+                features, labels = self.encode_game(main_line)
+                written.append((game, writer.num_records, len(labels)))
+                writer.write(features, labels)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        # listed games the archive does not have are recorded as empty
+        found = set(game for game, _, _ in written)
+        for game in sorted(games - found):
+            written.append((game, writer.num_records, 0))
+        return shard_path, written
+    
+    def encode_game(self, main_line):
+        # main_line: a gosgf.Main_line, or the raw bytes of an sgf file
+        if not isinstance(main_line, Main_line):
+            main_line = parse_main_line(main_line)
+        game_state, first_move_done = self.get_handicap(main_line)
+        move_tuples = [move_tuple for color, move_tuple in main_line.moves]
+        features = np.zeros(
+            (len(move_tuples),) + tuple(self.encoder.shape()),
+            dtype=self.encoder.plane_dtype,
         )
-        features = np.zeros(feature_shape)
-        labels = np.zeros((total_examples,))
-
+        labels = np.zeros(len(move_tuples), dtype=np.int16)
         counter = 0
-        for index in game_list:
-            name = name_list[index + 1]
-            if not name.endswith('.sgf'):
-                raise ValueError(name + ' is not a valid sgf')
-            sgf_content = zip_file.extractfile(name).read()
-            sgf = Sgf_game.from_string(sgf_content)
-
-            game_state, first_move_done = self.get_handicap(sgf)
-
-            for item in sgf.main_sequence_iter():
-                color, move_tuple = item.get_move()
-                point = None
-                if color is not None:
-                    if move_tuple is not None:
-                        row, col = move_tuple
-                        point = Point(row + 1, col + 1)
-                        move = Move.play(point)
-                    else:
-                        move = Move.pass_turn()
-                    if first_move_done and point is not None:
-                        features[counter] = self.encoder.encode(game_state)
-                        labels[counter] = self.encoder.encode_point(point)
-                        counter += 1
-                    game_state = game_state.apply_move(move)
-                    first_move_done = True
-
-        feature_file_base = self.data_dir + '/' + data_file_name + '_features_%d'
-        label_file_base = self.data_dir + '/' + data_file_name + '_labels_%d'
-
-        chunk = 0
-        chunksize = 1024
-        while features.shape[0] >= chunksize:
-            feature_file = feature_file_base % chunk
-            label_file = label_file_base % chunk
-            chunk += 1
-            current_features, features = features[:chunksize], features[chunksize:]
-            current_labels, labels = labels[:chunksize], labels[chunksize:]
-            np.save(feature_file, current_features)
-            np.save(label_file, current_features)
+        for move_tuple in move_tuples:
+            point = None
+            if move_tuple is not None:
+                row, col = move_tuple
+                point = Point(row + 1, col + 1)
+                move = Move.play(point)
+            else:
+                move = Move.pass_turn()
+            if first_move_done and point is not None:
+                self.encoder.encode_into(game_state, features[counter])
+                labels[counter] = self.encoder.encode_point(point)
+                counter += 1
+            game_state = game_state.apply_move(move)
+            first_move_done = True
+        return features[:counter], labels[:counter]
     
     def consolidate_games(
             self,
             name,
-            samples):
-        
-        files_needed = set(
-            file_name for file_name, index in samples
-        )
-        file_names = []
-        for zip_file_name in files_needed:
-            file_name = zip_file_name.replace('.tar.gz', '') + name
-            file_names.append(file_name)
+            samples,
+            augment=False):
         
-        feature_list = []
-        label_list = []
-        for file_name in file_names:
-            file_prefix = file_name.replace('.tar.gz', '')
-            base = self.data_dir + '/' + file_prefix + '_features_*.npy'
-            for feature_file in glob.glob(base):
-                label_file = feature_file.replace('features', 'labels')
-                x = np.load(feature_file)
-                y = np.load(label_file)
-                x = x.astype('float32')
-                y = utils.to_categorical(y.astype(int), 19 * 19)
-                feature_list.append(x)
-                label_list.append(y)
-        
-        features = np.concatenate(feature_list, axis=0)
-        labels = np.concatenate(label_list, axis=0)
-
-        feature_file = self.data_dir + '/' + name
-        label_file = self.data_dir + '/' + name
+        # copies the shards into one features / labels pair of .npy files
+        # chunk by chunk and returns them memory mapped. The pair is
+        # reused while it was made from the same shards with the same
+        # encoder and augmentation.
+        index = ShardIndex.load(index_path(self.data_dir, name))
+        dataset = ShardDataset(index)
+        copies = 8 if augment else 1
+        num_samples = copies * dataset.num_samples
+        feature_file = self.data_dir + '/features_' + name + '.npy'
+        label_file = self.data_dir + '/labels_' + name + '.npy'
+        source_file = self.data_dir + '/consolidated_' + name + '.json'
+        source = index.to_dict()
+        source['augment'] = augment
+        # a shard path can be written again if the cache manifest is lost
+        source['shard_files'] = [
+            [os.path.getsize(path), os.path.getmtime(path)]
+            for path in sorted(set(
+                shard['path'] for shard in index.shards
+            ))
+        ]
+        if _read_json(source_file) == source and \
+                os.path.exists(feature_file) and os.path.exists(label_file):
+            return (
+                np.load(feature_file, mmap_mode='r'),
+                np.load(label_file, mmap_mode='r'),
+            )
+        if os.path.exists(source_file):
+            os.remove(source_file)
 
-        np.save(feature_file, features)
-        np.save(label_file, labels)
+        features = np.lib.format.open_memmap(
+            feature_file,
+            mode='w+',
+            dtype=self.encoder.plane_dtype,
+            shape=(num_samples,) + tuple(self.encoder.shape()),
+        )
+        labels = np.lib.format.open_memmap(
+            label_file,
+            mode='w+',
+            dtype=np.uint8,
+            shape=(num_samples, 19 * 19),
+        )
+        start = 0
+        for x, y in dataset.iter_chunks():
+            if augment:
+                # all 8 rotations / reflections of every position
+                x, y = augment_symmetries(x, y)
+            features[start:start + len(y)] = x
+            labels[start + np.arange(len(y)), y] = 1
+            start += len(y)
+        features.flush()
+        labels.flush()
+        del features, labels
+        part_file = source_file + '.part'
+        with open(part_file, 'w') as f:
+            json.dump(source, f)
+        os.replace(part_file, source_file)
 
-        return features, labels
+        return (
+            np.load(feature_file, mmap_mode='r'),
+            np.load(label_file, mmap_mode='r'),
+        )
     
     @staticmethod
-    def get_handicap(sgf):  # get handicap stones
+    def get_handicap(main_line):  # get handicap stones
         go_board = Board(19, 19)
         first_move_done = False
         move = None
         game_state = GameState.new_game(19)
-        if sgf.get_handicap() is not None and sgf.get_handicap() != 0:
-            for setup in sgf.get_root().get_setup_stones():
-                for move in setup:
-                    row, col = move
-                    go_board.place_stone(
-                        Player.black,
-                        Point(row + 1, col + 1),
-                    )   # black gets handicap
+        if main_line.handicap is not None and main_line.handicap != 0:
+            for move in main_line.black_stones:
+                row, col = move
+                go_board.place_stone(
+                    Player.black,
+                    Point(row + 1, col + 1),
+                )   # black gets handicap
             first_move_done = True
             game_state = GameState(go_board, Player.white, None, move)
         return game_state, first_move_done
@@ -206,57 +254,61 @@ class GoDataProcessor:
                 indices_by_zip_name[filename] = []
             indices_by_zip_name[filename].append(index)
         
+        # games already encoded with this encoder are read from the shard
+        # cache, the others are encoded by the workers and added to it
+        cache = ShardCache(self.data_dir, self.encoder_string, self.encoder)
+        keys = {}
         zips_to_process = []
-        for zip_name in zip_names:
-            base_name = zip_name.replace('.tar.gz', '')
-            data_file_name = base_name + data_type
-            if not os.path.isfile(
-                self.data_dir + '/' + data_file_name
-            ):
+        for zip_name in sorted(zip_names):
+            key = cache.archive_key(self.data_dir + '/' + zip_name)
+            keys[zip_name] = key
+            missing = cache.missing_games(key, indices_by_zip_name[zip_name])
+            if missing:
                 zips_to_process.append(
                     (
                         self.__class__,
                         self.encoder_string,
+                        self.data_dir,
                         zip_name,
-                        data_file_name,
-                        indices_by_zip_name[zip_name],
+                        cache.new_segment_path(key),
+                        missing,
                     )
                 )
+        cache.save()
         
-        cores = multiprocessing.cpu_count() # determine number of CPU cores and split work load among them
-        pool = multiprocessing.Pool(processes=cores)
-        p = pool.map_async(worker, zips_to_process)
-        try:
-            _ = p.get()
-        except KeyboardInterrupt:   # caught keyboard interrupt, terminating workers
-            pool.terminate()
+        if zips_to_process:
+            cores = multiprocessing.cpu_count() # determine number of CPU cores and split work load among them
+            pool = multiprocessing.Pool(processes=cores)
+            try:
+                # the manifest is saved after every archive, so an
+                # interrupted run resumes from the last completed one
+                zip_names_by_path = dict(
+                    (job[4], job[3]) for job in zips_to_process
+                )
+                for shard_path, games in pool.imap_unordered(
+                        worker,
+                        zips_to_process):
+                    
+                    zip_name = zip_names_by_path[shard_path]
+                    cache.add_segment(keys[zip_name], shard_path, games)
+                    cache.save()
+            except KeyboardInterrupt:   # caught keyboard interrupt, terminating workers
+                pool.terminate()
+                pool.join()
+                sys.exit()
+            pool.close()
             pool.join()
-            sys.exit()
-    
-    def num_total_examples(
-            self,
-            zip_file,
-            game_list,
-            name_list):
         
-        total_examples = 0
-        for index in game_list:
-            name = name_list[index + 1]
-            if name.endswith('.sgf'):
-                sgf_content = zip_file.extractfile(name).read()
-                sgf = Sgf_game.from_string(sgf_content)
-                game_state, first_move_done = self.get_handicap(sgf)
-
-                num_moves = 0
-                for item in sgf.main_sequence_iter():
-                    color, move = item.get_move()
-                    if color is not None:
-                        if first_move_done:
-                            num_moves += 1
-                        first_move_done = True
-                total_examples = total_examples + num_moves
-            else:
-                raise ValueError(
-                    name + ' is not a valid sgf'
-                )
-        return total_examples
\ No newline at end of file
+        index = ShardIndex(
+            self.encoder.shape(),
+            encoder=self.encoder_string,
+            dtype=np.dtype(self.encoder.plane_dtype).name,
+        )
+        for zip_name in sorted(zip_names):
+            for shard_path, offset, num_records in cache.shards(
+                    keys[zip_name],
+                    indices_by_zip_name[zip_name]):
+                
+                index.add(shard_path, num_records, offset)
+        index.save(index_path(self.data_dir, data_type))
+        return index
\ No newline at end of file
@@ -0,0 +1,199 @@
+import queue
+import threading
+
+import numpy as np
+
+from dlgo.data.shards import ShardDataset, ShardIndex, index_path
+from dlgo.encoders.symmetry import NUM_SYMMETRIES
+from dlgo.encoders.symmetry import augment as augment_symmetries
+
+__all__ = [
+    'PrefetchDataGenerator',
+    'ShuffleBuffer',
+]
+
+
+class ShuffleBuffer():
+    # Fixed capacity pool of samples from which batches are drawn at
+    # random. A drawn batch's slots are refilled from the end of the pool,
+    # so each draw costs O(batch_size) no matter how large the pool is.
+    def __init__(
+            self,
+            capacity,
+            shape,
+            dtype,
+            rng):
+        
+        self.features = np.empty((capacity,) + tuple(shape), dtype=dtype)
+        self.labels = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+        self._rng = rng
+    
+    def add(self, features, labels):
+        count = len(labels)
+        self.features[self.size:self.size + count] = features
+        self.labels[self.size:self.size + count] = labels
+        self.size += count
+    
+    def _pick(self, size, batch_size):
+        # batch_size distinct random slots; rng.choice without
+        # replacement would shuffle all size slots to get them
+        if size < 4 * batch_size:
+            return self._rng.choice(size, batch_size, replace=False)
+        picked = np.unique(self._rng.randint(size, size=batch_size))
+        while len(picked) < batch_size:
+            picked = np.unique(np.concatenate([
+                picked,
+                self._rng.randint(size, size=batch_size - len(picked)),
+            ]))
+        return picked
+    
+    def draw(self, batch_size):
+        size = self.size
+        picked = self._pick(size, batch_size)
+        features = self.features[picked]
+        labels = self.labels[picked]
+        # move the unpicked samples of the last batch_size slots into
+        # the picked slots below them
+        first_tail = size - batch_size
+        in_tail = np.zeros(batch_size, dtype=bool)
+        in_tail[picked[picked >= first_tail] - first_tail] = True
+        holes = picked[picked < first_tail]
+        movers = np.flatnonzero(~in_tail) + first_tail
+        self.features[holes] = self.features[movers]
+        self.labels[holes] = self.labels[movers]
+        self.size -= batch_size
+        return features, labels
+
+
+class PrefetchDataGenerator():
+    # Drop in replacement for DataGenerator. Worker threads read chunks
+    # of the shards in a new random order every epoch into a bounded
+    # queue, and batches are drawn from a shuffle buffer fed by that
+    # queue, so they mix positions from many games and archives. Labels
+    # are integer move indices (use sparse_categorical_crossentropy)
+    # unless one_hot is set.
+    def __init__(
+            self,
+            data_directory,
+            data_type='train',
+            augment=False,
+            num_workers=2,
+            queue_size=16,
+            shuffle_buffer=16384,
+            chunk_size=512,
+            one_hot=False,
+            seed=None):
+        
+        self.data_directory = data_directory
+        self.dataset = ShardDataset(
+            ShardIndex.load(index_path(data_directory, data_type))
+        )
+        self.augment = augment
+        self.num_workers = num_workers
+        self.queue_size = queue_size
+        self.shuffle_buffer = shuffle_buffer
+        self.chunk_size = chunk_size
+        self.one_hot = one_hot
+        self._rng = np.random.RandomState(seed)
+        self._queue = None
+        self._threads = []
+        self._stop = threading.Event()
+    
+    def get_num_samples(
+            self,
+            batch_size=128,
+            num_classes=19 * 19):
+        
+        # straight from the shard index, no pass over the data
+        num_samples = self.dataset.num_samples
+        if self.augment:
+            num_samples *= NUM_SYMMETRIES
+        return num_samples
+    
+    def _chunks(self):
+        chunks = []
+        for shard, records in enumerate(self.dataset.shard_arrays()):
+            for start in range(0, len(records), self.chunk_size):
+                chunks.append((shard, start, start + self.chunk_size))
+        return chunks
+    
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def _work(self, worker_id, seed):
+        # every worker draws the same chunk order for each epoch and
+        # reads every num_workers-th chunk of it
+        chunks = self._chunks()
+        rng = np.random.RandomState(seed)
+        while True:
+            order = rng.permutation(len(chunks))
+            for position in range(worker_id, len(order), self.num_workers):
+                x, y = self.dataset.read(*chunks[order[position]])
+                if self.augment:
+                    x, y = augment_symmetries(x, y)
+                if not self._put((x, y)):
+                    return
+    
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._queue = queue.Queue(self.queue_size)
+        seed = self._rng.randint(2 ** 31)
+        for worker_id in range(self.num_workers):
+            thread = threading.Thread(
+                target=self._work,
+                args=(worker_id, seed),
+            )
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+    
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+    
+    def generate(
+            self,
+            batch_size=128,
+            num_classes=19 * 19,
+            dtype='float32'):
+        
+        self.start()
+        index = self.dataset.index
+        # a data set smaller than the buffer is shuffled as a whole
+        threshold = max(
+            min(self.shuffle_buffer, self.get_num_samples()),
+            batch_size,
+        )
+        buffer = ShuffleBuffer(
+            threshold + self.chunk_size * (
+                NUM_SYMMETRIES if self.augment else 1
+            ),
+            index.shape,
+            index.dtype,
+            self._rng,
+        )
+        while True:
+            x, y = self._queue.get()
+            buffer.add(x, y)
+            while buffer.size >= threshold:
+                x_batch, y_batch = buffer.draw(batch_size)
+                x_batch = x_batch.astype(dtype)
+                if self.one_hot:
+                    one_hot = np.zeros(
+                        (batch_size, num_classes),
+                        dtype=dtype,
+                    )
+                    one_hot[np.arange(batch_size), y_batch] = 1
+                    y_batch = one_hot
+                yield x_batch, y_batch
\ No newline at end of file
@@ -11,6 +11,7 @@ from dlgo.gosgf import Sgf_game
 from dlgo.goboard_fast import Board, GameState, Move
 from dlgo.gotypes import Player, Point
 from dlgo.encoders.base import get_encoder_by_name
+from dlgo.encoders.symmetry import augment as augment_symmetries
 
 from dlgo.data.index_processor import KGSIndex
 from dlgo.data.sampling import Sampler
@@ -51,7 +52,8 @@ class GoDataProcessor:
     def load_go_data(
             self,
             data_type='train',
-            num_samples=1000):
+            num_samples=1000,
+            augment=False):
         
         index = KGSIndex(data_directory=self.data_dir)
         index.download_files()
@@ -76,7 +78,11 @@ class GoDataProcessor:
                                  data_file_name,
                                  indices_by_zip_name[zip_name])
         
-        features_and_labels = self.consolidate_games(data_type, data)
+        features_and_labels = self.consolidate_games(
+            data_type,
+            data,
+            augment,
+        )
         return features_and_labels
     
     def unzip_data(self, zip_file_name):
@@ -106,7 +112,7 @@ class GoDataProcessor:
         feature_shape = np.insert(
             shape, 0, np.asarray([total_examples])
         )
-        features = np.zeros(feature_shape)
+        features = np.zeros(feature_shape, dtype=self.encoder.plane_dtype)
         labels = np.zeros((total_examples,))
 
         counter = 0
@@ -130,7 +136,10 @@ class GoDataProcessor:
                     else:
                         move = Move.pass_turn()
                     if first_move_done and point is not None:
-                        features[counter] = self.encoder.encode(game_state)
+                        self.encoder.encode_into(
+                            game_state,
+                            features[counter],
+                        )
                         labels[counter] = self.encoder.encode_point(point)
                         counter += 1
                     game_state = game_state.apply_move(move)
@@ -153,7 +162,8 @@ class GoDataProcessor:
     def consolidate_games(
             self,
             data_type,
-            samples):
+            samples,
+            augment=False):
         
         files_needed = set(file_name for file_name, index in samples)
         file_names = []
@@ -170,6 +180,9 @@ class GoDataProcessor:
                 label_file = feature_file.replace('features', 'labels')
                 x = np.load(feature_file)
                 y = np.load(label_file)
+                if augment:
+                    # all 8 rotations / reflections of every position
+                    x, y = augment_symmetries(x, y)
                 x = x.astype('float32')
                 y = utils.to_categorical(
                     y.astype(int), 19 * 19
@@ -0,0 +1,162 @@
+import json
+import os
+
+import numpy as np
+
+__all__ = [
+    'ShardDataset',
+    'ShardIndex',
+    'ShardWriter',
+    'index_path',
+    'record_dtype',
+]
+
+
+def record_dtype(shape, plane_dtype=np.uint8):
+    # one training example: the feature planes (uint8 for all but the
+    # oneplane encoder) followed by the label
+    return np.dtype([
+        ('features', plane_dtype, tuple(shape)),
+        ('label', np.int16),
+    ])
+
+
+def index_path(data_directory, data_type):
+    return data_directory + '/' + data_type + '_index.json'
+
+
+class ShardWriter():
+    # Appends fixed size records to a shard file. Records go to a .part
+    # file that is only renamed to path by close(), so a shard that
+    # exists is always complete.
+    def __init__(
+            self,
+            path,
+            shape,
+            plane_dtype=np.uint8):
+        
+        self.path = path
+        self.dtype = record_dtype(shape, plane_dtype)
+        self.num_records = 0
+        self._part_path = path + '.part'
+        self._file = open(self._part_path, 'wb')
+    
+    def write(self, features, labels):
+        records = np.empty(len(labels), dtype=self.dtype)
+        records['features'] = features
+        records['label'] = labels
+        records.tofile(self._file)
+        self.num_records += len(labels)
+    
+    def close(self):
+        self._file.close()
+        os.replace(self._part_path, self.path)
+    
+    def abort(self):
+        self._file.close()
+        os.remove(self._part_path)
+
+
+class ShardIndex():
+    # The shards of one data set, their record counts and the feature
+    # shape, stored as json next to them.
+    def __init__(
+            self,
+            shape,
+            shards=None,
+            encoder=None,
+            dtype='uint8'):
+        
+        self.shape = tuple(shape)
+        self.shards = shards if shards is not None else []
+        self.encoder = encoder
+        self.dtype = dtype
+    
+    def add(
+            self,
+            path,
+            num_records,
+            offset=0):
+        
+        # num_records records of the shard at path, from record offset on
+        self.shards.append({
+            'path': path,
+            'offset': offset,
+            'num_records': num_records,
+        })
+    
+    @property
+    def num_samples(self):
+        return sum(shard['num_records'] for shard in self.shards)
+    
+    def to_dict(self):
+        return {
+            'shape': list(self.shape),
+            'encoder': self.encoder,
+            'dtype': self.dtype,
+            'shards': self.shards,
+        }
+    
+    def save(self, path):
+        part_path = path + '.part'
+        with open(part_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(part_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            index = json.load(f)
+        return cls(
+            index['shape'],
+            index['shards'],
+            index['encoder'],
+            index['dtype'],
+        )
+
+
+class ShardDataset():
+    # Read only view of the examples in a ShardIndex. Shards are opened
+    # with np.memmap, so only the rows that are read get paged in.
+    def __init__(self, index):
+        self.index = index
+        self.dtype = record_dtype(index.shape, index.dtype)
+        self._arrays = None
+    
+    @property
+    def num_samples(self):
+        return self.index.num_samples
+    
+    def shard_arrays(self):
+        if self._arrays is None:
+            self._arrays = [
+                np.memmap(
+                    shard['path'],
+                    dtype=self.dtype,
+                    mode='r',
+                    offset=shard.get('offset', 0) * self.dtype.itemsize,
+                    shape=(shard['num_records'],),
+                )
+                for shard in self.index.shards
+                if shard['num_records'] > 0
+            ]
+        return self._arrays
+    
+    def read(
+            self,
+            shard,
+            start,
+            stop):
+        
+        # copies of the features and labels of records start:stop
+        records = self.shard_arrays()[shard][start:stop]
+        return (
+            np.array(records['features']),
+            records['label'].astype(np.int64),
+        )
+    
+    def iter_chunks(self, chunk_size=1024):
+        # (features, labels) of consecutive records, shard by shard
+        for shard, records in enumerate(self.shard_arrays()):
+            for start in range(0, len(records), chunk_size):
+                yield self.read(shard, start, start + chunk_size)
\ No newline at end of file
@@ -4,7 +4,9 @@ from dlgo.encoders.base import Encoder
 from dlgo.encoders.utils import is_ladder_capture, is_ladder_escape
 from dlgo.gotypes import Point, Player
 from dlgo.goboard_fast import Move
-from dlgo.agent.helpers import is_point_an_eye
+from dlgo import movemasks
+
+EMPTY = 0
 
 FEATRE_OFFSETS = {
     'stone_color': 0,
@@ -35,94 +37,210 @@ class AlphaGoEncoder(Encoder):
         self.board_width, self.board_height = board_size
         self.use_player_plane = use_player_plane
         self.num_planes = 48 + use_player_plane
+        # per player: the stone colors the move features were last
+        # computed for, and the liberties after, capture size and string
+        # size of a stone played on each empty point. Those depend on the
+        # colors alone, so the next position only recomputes the points
+        # whose neighbors or neighboring strings changed.
+        self._move_features = {}
     
     def name(self):
         return 'alphago'
     
     def encode(self, game_state):
-        board_tensor = np.zeros(
-            (
-                self.num_planes,
-                self.board_height,
-                self.board_width,
-            )
-        )
-        for r in range(self.board_height):
-            for c in range(self.board_width):
-                point = Point(row=r + 1, col=c + 1)
-
-                go_string = game_state.board.get_go_string(point)
-                if go_string and go_string.color == game_state.next_player:
-                    board_tensor[offset('stone_color')][r][c] = 1
-                elif go_string and go_string.color == game_state.next_plaer.other:
-                    board_tensor[offset('stone_color') + 1][r][c] = 1
-                else:
-                    board_tensor[offset('stone_color') + 2][r][c] = 1
-                
-                board_tensor[offset('ones')] = self.ones()
-                board_tensor[offset('zeros')] = self.zeros()
+        board_tensor = np.zeros(self.shape())
+        self.encode_into(game_state, board_tensor)
+        return board_tensor
+    
+    def encode_into(self, game_state, board_tensor):
+        # writes the planes of game_state into a zeroed board_tensor
+        board = game_state.board
+        player = game_state.next_player
+        colors, _ = movemasks.board_planes(board)
+        colors = colors[1:-1, 1:-1]
+        empty = colors == EMPTY
+        board_tensor[offset('stone_color')][colors == player.value] = 1
+        board_tensor[offset('stone_color') + 1][
+            colors == player.other.value
+        ] = 1
+        board_tensor[offset('stone_color') + 2][empty] = 1
+        board_tensor[offset('ones')] = 1
 
-                if not is_point_an_eye(
-                    game_state.board,
-                    point,
-                    game_state.next_player,
-                ):
-                    board_tensor[offset('sensibleness')][r][c] = 1
-                
-                ages = min(game_state.board.move_ages.get(r, c), 8)
-                if ages > 0:
-                    print(ages)
-                    board_tensor[offset('turns_since') + ages][r][c] = 1
-                
-                if game_state.board.get_go_string(point):
-                    liberties = min(
-                        game_state.board.get_go_string(point).num_liberties,
-                        8,
-                    )
-                    board_tensor[offset('liberties') + liberties][r][c] = 1
-                
-                move = Move(point)
-                if game_state.is_valid_move(move):
-                    new_state = game_state.apply_move(move)
-                    liberties = min(
-                        new_state.board.get_go_string(point).num_liberties,
-                        8,
-                    )
-                    board_tensor[offset('liberties_after') + liberties][r][c] = 1
+        legal = movemasks.legal_play_mask(game_state)
+        sensible = legal & ~movemasks.eye_mask(game_state)
+        board_tensor[offset('sensibleness')][sensible] = 1
 
-                    adjacent_strings = [
-                        game_state.board.get_go_string(nb)
-                        for nb in point.neighbors()
-                    ]
+        stone_rows, stone_cols = np.nonzero(~empty)
+        for r, c in zip(stone_rows.tolist(), stone_cols.tolist()):
+            age = int(board.move_ages.get(r, c))
+            if age >= 0:
+                board_tensor[offset('turns_since') + min(age, 7), r, c] = 1
+            go_string = board.get_go_string(Point(row=r + 1, col=c + 1))
+            liberties = min(go_string.num_liberties, 8)
+            board_tensor[offset('liberties') + liberties - 1, r, c] = 1
 
-                    capture_count = 0
-                    for go_string in adjacent_strings:
-                        other_player = game_state.next_player.other
-                        if go_string and go_string.num_liberties == 1 and go_string.color == other_player:
-                            capture_count += len(go_string.stones)
-                    capture_count = min(capture_count, 8)
-                    board_tensor[offset('capture_size') + capture_count][r][c] = 1
+        liberties_after, capture_size, string_size = \
+            self.move_features(game_state, colors)
+        rows, cols = np.nonzero(legal)
+        board_tensor[
+            offset('liberties_after') +
+            np.minimum(liberties_after[rows, cols], 8) - 1,
+            rows,
+            cols,
+        ] = 1
+        board_tensor[
+            offset('capture_size') + np.minimum(capture_size[rows, cols], 7),
+            rows,
+            cols,
+        ] = 1
+        rows, cols = np.nonzero(legal & (liberties_after == 1))
+        board_tensor[
+            offset('self_atari_size') +
+            np.minimum(string_size[rows, cols], 8) - 1,
+            rows,
+            cols,
+        ] = 1
 
-                if go_string and go_string.num_liberties == 1:
-                    go_string = game_state.board.get_go_string(point)
-                    if go_string:
-                        num_atari_stones = min(len(go_string.stones), 8)
-                        board_tensor[offset('self_atari_size') + num_atari_stones][r][c] = 1
-                
-                if is_ladder_capture(game_state, point):
-                    board_tensor[offset('ladder_capture')][r][c] = 1
+        for point in self.ladder_candidates(game_state, legal):
+            r, c = point.row - 1, point.col - 1
+            if is_ladder_capture(game_state, point):
+                board_tensor[offset('ladder_capture'), r, c] = 1
+            if is_ladder_escape(game_state, point):
+                board_tensor[offset('ladder_escape'), r, c] = 1
 
-                if is_ladder_escape(game_state, point):
-                    board_tensor[offset('ladder_escape')][r][c] = 1
-                
-                if self.use_player_plane:
-                    if game_state.next_player == Player.black:
-                        board_tensor[offset('ones')] = self.ones()
-                    else:
-                        board_tensor[offset('zeros')] = self.zeros()
-        
+        if self.use_player_plane and player == Player.black:
+            board_tensor[offset('current_player_color')] = 1
         return board_tensor
     
+    def move_features(self, game_state, colors):
+        player = game_state.next_player
+        cached = self._move_features.get(player)
+        if cached is None or cached[0].shape != colors.shape:
+            shape = colors.shape
+            cached = (
+                np.full(shape, -1, dtype=np.int8),
+                np.zeros(shape, dtype=np.int16),
+                np.zeros(shape, dtype=np.int16),
+                np.zeros(shape, dtype=np.int16),
+            )
+            self._move_features[player] = cached
+        last_colors, liberties_after, capture_size, string_size = cached
+        changed = colors != last_colors
+        if not changed.any():
+            return liberties_after, capture_size, string_size
+        board = game_state.board
+        dirty = self._dirty_points(board, colors, changed)
+        rows, cols = np.nonzero(dirty & (colors == EMPTY))
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            liberties_after[r, c], capture_size[r, c], string_size[r, c] = \
+                self._point_features(
+                    board,
+                    colors,
+                    Point(row=r + 1, col=c + 1),
+                    player.value,
+                )
+        last_colors[:] = colors
+        return liberties_after, capture_size, string_size
+    
+    @staticmethod
+    def _dilate(mask):
+        grown = mask.copy()
+        grown[1:] |= mask[:-1]
+        grown[:-1] |= mask[1:]
+        grown[:, 1:] |= mask[:, :-1]
+        grown[:, :-1] |= mask[:, 1:]
+        return grown
+    
+    def _dirty_points(self, board, colors, changed):
+        # a point's move features only change with the colors of its
+        # neighbors or with a neighboring string, and a string only
+        # changes when one of its neighbors does
+        near = self._dilate(changed)
+        touched = np.zeros(colors.shape, dtype=bool)
+        seen = set()
+        rows, cols = np.nonzero(near & (colors != EMPTY))
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            if touched[r, c]:
+                continue
+            go_string = board.get_go_string(Point(row=r + 1, col=c + 1))
+            if id(go_string) in seen:
+                continue
+            seen.add(id(go_string))
+            for stone in go_string.stones:
+                touched[stone.row - 1, stone.col - 1] = True
+        return near | self._dilate(touched)
+    
+    def _point_features(
+            self,
+            board,
+            colors,
+            point,
+            own):
+        
+        # liberties, captured stones and string size after own plays at
+        # point, read from the neighboring strings
+        num_rows, num_cols = colors.shape
+        friendly = {}
+        enemy = {}
+        liberties = set()
+        for neighbor in point.neighbors():
+            r, c = neighbor.row - 1, neighbor.col - 1
+            if not (0 <= r < num_rows and 0 <= c < num_cols):
+                continue
+            color = colors[r, c]
+            if color == EMPTY:
+                liberties.add(neighbor)
+                continue
+            go_string = board.get_go_string(neighbor)
+            if color == own:
+                friendly[id(go_string)] = go_string
+            else:
+                enemy[id(go_string)] = go_string
+        for go_string in friendly.values():
+            liberties |= go_string.liberties
+        liberties.discard(point)
+        captured = [
+            go_string for go_string in enemy.values()
+            if go_string.num_liberties == 1
+        ]
+        if captured:
+            # captured stones next to the new string become liberties
+            new_stones = {point}
+            for go_string in friendly.values():
+                new_stones |= go_string.stones
+            for go_string in captured:
+                for stone in go_string.stones:
+                    if any(nb in new_stones for nb in stone.neighbors()):
+                        liberties.add(stone)
+        return (
+            len(liberties),
+            sum(len(go_string.stones) for go_string in captured),
+            1 + sum(len(go_string.stones) for go_string in friendly.values()),
+        )
+    
+    def ladder_candidates(self, game_state, legal):
+        # a ladder can only start on a liberty of an opponent string with
+        # two liberties or of one of our strings in atari
+        board = game_state.board
+        player = game_state.next_player
+        candidates = set()
+        seen = set()
+        for r in range(self.board_height):
+            for c in range(self.board_width):
+                go_string = board.get_go_string(Point(row=r + 1, col=c + 1))
+                if go_string is None or id(go_string) in seen:
+                    continue
+                seen.add(id(go_string))
+                if go_string.color == player:
+                    if go_string.num_liberties == 1:
+                        candidates |= go_string.liberties
+                elif go_string.num_liberties == 2:
+                    candidates |= go_string.liberties
+        return [
+            point for point in candidates
+            if legal[point.row - 1, point.col - 1]
+        ]
+    
     def ones(self):
         return np.ones(
             (
@@ -147,7 +265,7 @@ class AlphaGoEncoder(Encoder):
             num_planes=8):
         
         pass
-
+    
     def encode_point(self, point):
         return self.board_width * (point.row - 1) + (point.col - 1)
     
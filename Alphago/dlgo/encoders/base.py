@@ -1,5 +1,7 @@
 import importlib
 
+import numpy as np
+
 __all__ = [
     'Encoder',
     'get_encoder_by_name',
@@ -7,12 +9,35 @@ __all__ = [
 
 
 class Encoder:
+    # dtype of encode_batch tensors, big enough for every plane value
+    plane_dtype = np.uint8
+    # bump when the planes an encoder produces change; processed game
+    # data is cached per encoder name and version
+    version = 1
+    
     def name(self):
         raise NotImplementedError
     
     def encode(self, game_state):
         raise NotImplementedError
     
+    def encode_into(self, game_state, board_tensor):
+        board_tensor[...] = self.encode(game_state)
+        return board_tensor
+    
+    def encode_batch(self, game_states, out=None):
+        # (N, planes, rows, cols) tensor of plane_dtype, or into out
+        if out is None:
+            out = np.zeros(
+                (len(game_states),) + tuple(self.shape()),
+                dtype=self.plane_dtype,
+            )
+        else:
+            out[:len(game_states)] = 0
+        for i, game_state in enumerate(game_states):
+            self.encode_into(game_state, out[i])
+        return out
+    
     def encode_point(self, point):
         raise NotImplementedError
     
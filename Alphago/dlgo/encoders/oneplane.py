@@ -5,6 +5,9 @@ from dlgo.goboard import Point
 
 
 class OnePlaneEncoder(Encoder):
+    # opponent stones are -1
+    plane_dtype = np.int8
+    
     def __init__(self, board_size):
         self.board_width, self.board_height = board_size
         self.num_planes = 1
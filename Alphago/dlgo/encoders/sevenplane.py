@@ -1,7 +1,8 @@
 import numpy as np
 
+from dlgo import movemasks
 from dlgo.encoders.base import Encoder
-from dlgo.goboard import Move, Point
+from dlgo.gotypes import Point
 
 
 class SevenPlaneEncoder(Encoder):
@@ -13,7 +14,7 @@ class SevenPlaneEncoder(Encoder):
         return 'sevneplane'
     
     def encode(self, game_state):
-        board_tensor = np.zeors(self.shape())
+        board_tensor = np.zeros(self.shape())
         base_plane = {
             game_state.next_player: 0,
             game_state.next_player.other: 3,
@@ -22,16 +23,12 @@ class SevenPlaneEncoder(Encoder):
             for col in range(self.board_width):
                 p = Point(row=row + 1, col=col + 1)
                 go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    if game_state.does_move_violate_ko(
-                        game_state.next_player,
-                        Move.play(p)
-                    ):
-                        board_tensor[6][row][col] = 1
-                else:
+                if go_string is not None:
                     liberty_plane = min(3, go_string.num_liberties) - 1
                     liberty_plane += base_plane[go_string.color]
                     board_tensor[liberty_plane][row][col] = 1
+        # points the player to move may not play because of ko
+        board_tensor[6][movemasks.ko_mask(game_state)] = 1
         return board_tensor
     
     def encode_point(self, point):
@@ -1,7 +1,7 @@
 import numpy as np
 
+from dlgo import movemasks
 from dlgo.encoders.base import Encoder
-from dlgo.goboard import Move
 from dlgo.gotypes import Player, Point
 
 
@@ -23,17 +23,13 @@ class SimpleEncoder(Encoder):
             for c in range(self.board_width):
                 p = Point(row=r + 1, col=c + 1)
                 go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    if game_state.does_move_violate_ko(
-                        game_state.next_player,
-                        Move.play(p),
-                    ):
-                        board_tensor[10][r][c] = 1
-                else:
+                if go_string is not None:
                     liberty_plane = min(4, go_string.num_liberties) - 1
                     if go_string.color == Player.white:
                         liberty_plane += 4
                     board_tensor[liberty_plane][r][c] = 1
+        # points the player to move may not play because of ko
+        board_tensor[10][movemasks.ko_mask(game_state)] = 1
         return board_tensor
     
     def encode_point(self, point):
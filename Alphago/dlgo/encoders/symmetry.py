@@ -0,0 +1,86 @@
+import numpy as np
+
+__all__ = [
+    'NUM_SYMMETRIES',
+    'augment',
+    'augment_random',
+    'symmetry_permutations',
+]
+
+NUM_SYMMETRIES = 8
+
+_permutations = {}
+
+
+def symmetry_permutations(num_rows, num_cols):
+    # the 8 rotations / reflections of the board as permutations of the
+    # flat point indices: transformed[i] = original[perm[i]]. Non square
+    # boards only have the 4 that keep their shape.
+    key = (num_rows, num_cols)
+    if key not in _permutations:
+        grid = np.arange(num_rows * num_cols).reshape(num_rows, num_cols)
+        transforms = []
+        for k in range(4):
+            rotated = np.rot90(grid, k)
+            transforms.append(rotated)
+            transforms.append(np.fliplr(rotated))
+        perms = np.array([
+            t.ravel() for t in transforms if t.shape == grid.shape
+        ])
+        perms.flags.writeable = False
+        _permutations[key] = perms
+    return _permutations[key]
+
+
+def _inverse(perm):
+    inverse = np.empty_like(perm)
+    inverse[perm] = np.arange(len(perm))
+    return inverse
+
+
+def _transform_labels(labels, perm):
+    # labels index the flat points; anything past the board (a pass
+    # move) stays where it is
+    labels = np.asarray(labels, dtype=np.int64)
+    inverse = np.concatenate([
+        _inverse(perm),
+        np.arange(len(perm), labels.max() + 1 if labels.size else 0),
+    ])
+    return inverse[labels]
+
+
+def augment(features, labels=None):
+    # every symmetry of every sample: (N, planes, rows, cols) features
+    # become (8N, planes, rows, cols), sample i's copies at i, N + i, ...
+    num_samples, num_planes, num_rows, num_cols = features.shape
+    perms = symmetry_permutations(num_rows, num_cols)
+    flat = features.reshape(num_samples, num_planes, num_rows * num_cols)
+    out = np.concatenate([flat[:, :, perm] for perm in perms])
+    out = out.reshape((len(perms) * num_samples,) + features.shape[1:])
+    if labels is None:
+        return out
+    return out, np.concatenate(
+        [_transform_labels(labels, perm) for perm in perms]
+    )
+
+
+def augment_random(features, labels=None, rng=np.random):
+    # one random symmetry per sample, same shape as the input
+    num_samples, num_planes, num_rows, num_cols = features.shape
+    perms = symmetry_permutations(num_rows, num_cols)
+    choice = rng.randint(len(perms), size=num_samples)
+    flat = features.reshape(num_samples, num_planes, num_rows * num_cols)
+    index = perms[choice][:, np.newaxis, :]
+    out = np.take_along_axis(flat, index, axis=2).reshape(features.shape)
+    if labels is None:
+        return out
+    labels = np.asarray(labels, dtype=np.int64)
+    new_labels = labels.copy()
+    for k in range(len(perms)):
+        selected = choice == k
+        if selected.any():
+            new_labels[selected] = _transform_labels(
+                labels[selected],
+                perms[k],
+            )
+    return out, new_labels
\ No newline at end of file
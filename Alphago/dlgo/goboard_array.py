@@ -0,0 +1,653 @@
+from array import array
+
+import numpy as np
+
+from dlgo.gotypes import Player, Point
+from dlgo.goboard_fast import KoHistory, Move
+from dlgo.scoring import compute_game_result
+from dlgo import movemasks, zobrist
+
+__all__ = [
+    'Board',
+    'GameState',
+    'Move',
+]
+
+# point contents, black and white match Player.value
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+PLAYERS = (None, Player.black, Player.white)
+
+# undo log entries written by Board.place_stone
+ADD_LIBERTY = 0
+REMOVE_LIBERTY = 1
+MERGE = 2
+CAPTURE = 3
+
+geometries = {}
+
+
+class BoardGeometry():
+    # Lookup tables shared by every board of one size. Points are stored
+    # in a flat array with a one point border on each side, so the four
+    # neighbors of index i are always i - 1, i + 1, i - stride and
+    # i + stride.
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.stride = num_cols + 2
+        self.size = (num_rows + 2) * self.stride
+        self.point_to_index = {}
+        self.index_to_point = [None] * self.size
+        self.on_board = []
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                idx = r * self.stride + c
+                point = Point(row=r, col=c)
+                self.point_to_index[point] = idx
+                self.index_to_point[idx] = point
+                self.on_board.append(idx)
+        self.neighbors = [()] * self.size
+        self.corners = [()] * self.size
+        for idx in self.on_board:
+            self.neighbors[idx] = (
+                idx - self.stride, idx + self.stride, idx - 1, idx + 1,
+            )
+            self.corners[idx] = (
+                idx - self.stride - 1, idx - self.stride + 1,
+                idx + self.stride - 1, idx + self.stride + 1,
+            )
+        self.empty_colors = [BORDER] * self.size
+        for idx in self.on_board:
+            self.empty_colors[idx] = EMPTY
+        # zobrist codes per index and point content
+        self.hash_codes = [[0] * self.size for _ in range(3)]
+        for idx in self.on_board:
+            point = self.index_to_point[idx]
+            for color in (EMPTY, BLACK, WHITE):
+                self.hash_codes[color][idx] = \
+                    zobrist.HASH_CODE[point, PLAYERS[color]]
+
+
+def get_geometry(num_rows, num_cols):
+    dim = (num_rows, num_cols)
+    if dim not in geometries:
+        geometries[dim] = BoardGeometry(num_rows, num_cols)
+    return geometries[dim]
+
+
+class GoString():
+    # read-only snapshot of a string, built on demand for callers that
+    # expect the goboard_fast interface
+    def __init__(
+            self,
+            color,
+            stones,
+            liberties):
+        
+        self.color = color
+        self.stones = frozenset(stones)
+        self.liberties = frozenset(liberties)
+    
+    @property
+    def num_liberties(self):
+        return len(self.liberties)
+    
+    def __eq__(self, other):
+        return isinstance(other, GoString) and \
+            self.color == other.color and \
+            self.stones == other.stones and \
+            self.liberties == other.liberties
+
+
+class MoveAges():
+    # same interface as dlgo.utils.MoveAge, derived from the move number
+    # each stone was placed at instead of aging every stone per move
+    def __init__(self, board):
+        self._board = board
+    
+    def get(self, row, col):
+        board = self._board
+        idx = (row + 1) * board._geo.stride + col + 1
+        placed_at = board._placed_at[idx]
+        if placed_at < 0:
+            return -1
+        return board._num_placed - 1 - placed_at
+
+
+class Board():
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self._geo = get_geometry(num_rows, num_cols)
+        size = self._geo.size
+        self._color = array('l', self._geo.empty_colors)
+        # union-find root of the string a stone belongs to; merges point
+        # every stone of the smaller string at the larger root, so a
+        # lookup is a single index
+        self._parent = array('l', range(size))
+        # circular linked list of the stones in each string
+        self._next = array('l', range(size))
+        # per root: stone count and pseudo-liberty count, sum and sum of
+        # squares. A string is in atari exactly when all its
+        # pseudo-liberties are the same point, i.e. n * sum_sq == sum ** 2
+        self._size = array('l', [0]) * size
+        self._libs = array('l', [0]) * size
+        self._lib_sum = array('l', [0]) * size
+        self._lib_sum_sq = array('l', [0]) * size
+        self._placed_at = array('l', [-1]) * size
+        self._num_placed = 0
+        self._hash = zobrist.EMPTY_BOARD
+        self._strings = {}
+    
+    @property
+    def move_ages(self):
+        return MoveAges(self)
+    
+    def _add_liberty(self, root, lib):
+        self._libs[root] += 1
+        self._lib_sum[root] += lib
+        self._lib_sum_sq[root] += lib * lib
+    
+    def _remove_liberty(self, root, lib):
+        self._libs[root] -= 1
+        self._lib_sum[root] -= lib
+        self._lib_sum_sq[root] -= lib * lib
+    
+    def _in_atari(self, root):
+        libs = self._libs[root]
+        return libs > 0 and \
+            libs * self._lib_sum_sq[root] == self._lib_sum[root] ** 2
+    
+    def _merge(self, root_a, root_b, undo_log=None):
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        if undo_log is not None:
+            undo_log.append((
+                MERGE,
+                root_a,
+                root_b,
+                self._size[root_b],
+                self._libs[root_b],
+                self._lib_sum[root_b],
+                self._lib_sum_sq[root_b],
+            ))
+        parent = self._parent
+        nxt = self._next
+        stone = root_b
+        while True:
+            parent[stone] = root_a
+            stone = nxt[stone]
+            if stone == root_b:
+                break
+        nxt[root_a], nxt[root_b] = nxt[root_b], nxt[root_a]
+        self._size[root_a] += self._size[root_b]
+        self._libs[root_a] += self._libs[root_b]
+        self._lib_sum[root_a] += self._lib_sum[root_b]
+        self._lib_sum_sq[root_a] += self._lib_sum_sq[root_b]
+        return root_a
+    
+    def _unmerge(
+            self,
+            root_a,
+            root_b,
+            size,
+            libs,
+            lib_sum,
+            lib_sum_sq):
+        
+        # swapping the two next pointers again splits the stone lists.
+        # root_b's counts come from the log, its slot may have been
+        # reused by a capture and a later stone in the meantime
+        nxt = self._next
+        nxt[root_a], nxt[root_b] = nxt[root_b], nxt[root_a]
+        for stone in self._string_indices(root_b):
+            self._parent[stone] = root_b
+        self._size[root_a] -= size
+        self._libs[root_a] -= libs
+        self._lib_sum[root_a] -= lib_sum
+        self._lib_sum_sq[root_a] -= lib_sum_sq
+        self._size[root_b] = size
+        self._libs[root_b] = libs
+        self._lib_sum[root_b] = lib_sum
+        self._lib_sum_sq[root_b] = lib_sum_sq
+    
+    def _string_indices(self, root):
+        stones = [root]
+        nxt = self._next
+        stone = nxt[root]
+        while stone != root:
+            stones.append(stone)
+            stone = nxt[stone]
+        return stones
+    
+    def _remove_string(self, root, undo_log=None):
+        color = self._color
+        hash_codes = self._geo.hash_codes
+        string_color = color[root]
+        stones = self._string_indices(root)
+        if undo_log is not None:
+            undo_log.append((
+                CAPTURE,
+                root,
+                string_color,
+                stones,
+                [self._placed_at[stone] for stone in stones],
+            ))
+        for stone in stones:
+            color[stone] = EMPTY
+            self._placed_at[stone] = -1
+            self._hash ^= hash_codes[string_color][stone]
+            self._hash ^= hash_codes[EMPTY][stone]
+        # removing a string can create liberties for other strings
+        neighbors = self._geo.neighbors
+        parent = self._parent
+        for stone in stones:
+            self._parent[stone] = stone
+            self._next[stone] = stone
+            for neighbor in neighbors[stone]:
+                if color[neighbor] == BLACK or color[neighbor] == WHITE:
+                    self._add_liberty(parent[neighbor], stone)
+                    if undo_log is not None:
+                        undo_log.append(
+                            (ADD_LIBERTY, parent[neighbor], stone)
+                        )
+        return stones
+    
+    def _restore_string(
+            self,
+            root,
+            string_color,
+            stones,
+            placed_at):
+        
+        # a captured string had no liberties left
+        self._size[root] = len(stones)
+        self._libs[root] = 0
+        self._lib_sum[root] = 0
+        self._lib_sum_sq[root] = 0
+        for i, stone in enumerate(stones):
+            self._color[stone] = string_color
+            self._parent[stone] = root
+            self._next[stone] = stones[(i + 1) % len(stones)]
+            self._placed_at[stone] = placed_at[i]
+    
+    def place_stone(self, player, point, undo_log=None):
+        # with an undo_log list, every change is recorded so that
+        # undo_place_stone(undo_log) can take the stone back
+        assert self.is_on_grid(point)
+        idx = self._geo.point_to_index[point]
+        assert self._color[idx] == EMPTY
+        self._strings = {}
+        if undo_log is not None:
+            undo_log.append((idx, self._hash, self._num_placed))
+        color = self._color
+        parent = self._parent
+        own = player.value
+        hash_codes = self._geo.hash_codes
+        color[idx] = own
+        parent[idx] = idx
+        self._next[idx] = idx
+        self._size[idx] = 1
+        self._libs[idx] = 0
+        self._lib_sum[idx] = 0
+        self._lib_sum_sq[idx] = 0
+        self._placed_at[idx] = self._num_placed
+        self._num_placed += 1
+        self._hash ^= hash_codes[EMPTY][idx]
+        self._hash ^= hash_codes[own][idx]
+        root = idx
+        opponents = []
+        for neighbor in self._geo.neighbors[idx]:
+            neighbor_color = color[neighbor]
+            if neighbor_color == EMPTY:
+                self._add_liberty(root, neighbor)
+                if undo_log is not None:
+                    undo_log.append((ADD_LIBERTY, root, neighbor))
+            elif neighbor_color != BORDER:
+                neighbor_root = parent[neighbor]
+                self._remove_liberty(neighbor_root, idx)
+                if undo_log is not None:
+                    undo_log.append((REMOVE_LIBERTY, neighbor_root, idx))
+                if neighbor_color == own:
+                    if neighbor_root != root:
+                        root = self._merge(root, neighbor_root, undo_log)
+                elif neighbor_root not in opponents:
+                    opponents.append(neighbor_root)
+        captured = []
+        for opponent_root in opponents:
+            if self._libs[opponent_root] == 0:
+                captured += self._remove_string(opponent_root, undo_log)
+        return captured
+    
+    def undo_place_stone(self, undo_log):
+        for entry in reversed(undo_log[1:]):
+            action = entry[0]
+            if action == ADD_LIBERTY:
+                self._remove_liberty(entry[1], entry[2])
+            elif action == REMOVE_LIBERTY:
+                self._add_liberty(entry[1], entry[2])
+            elif action == MERGE:
+                self._unmerge(*entry[1:])
+            else:
+                self._restore_string(*entry[1:])
+        idx, self._hash, self._num_placed = undo_log[0]
+        self._color[idx] = EMPTY
+        self._parent[idx] = idx
+        self._next[idx] = idx
+        self._placed_at[idx] = -1
+        self._strings = {}
+    
+    def is_self_capture(self, player, point):
+        idx = self._geo.point_to_index[point]
+        color = self._color
+        own = player.value
+        for neighbor in self._geo.neighbors[idx]:
+            neighbor_color = color[neighbor]
+            if neighbor_color == EMPTY:
+                # this point has a liberty. Can't be self capture
+                return False
+            elif neighbor_color == BORDER:
+                continue
+            in_atari = self._in_atari(self._parent[neighbor])
+            if neighbor_color == own:
+                if not in_atari:
+                    # connects to a string with another liberty
+                    return False
+            elif in_atari:
+                # this move is real capture, not a self capture
+                return False
+        return True
+    
+    def will_capture(self, player, point):
+        idx = self._geo.point_to_index[point]
+        color = self._color
+        other = player.other.value
+        for neighbor in self._geo.neighbors[idx]:
+            if color[neighbor] == other and \
+                    self._in_atari(self._parent[neighbor]):
+                return True
+        return False
+    
+    def hash_after_move(self, player, point):
+        # zobrist hash of the board after player plays at point,
+        # computed without placing the stone
+        idx = self._geo.point_to_index[point]
+        hash_codes = self._geo.hash_codes
+        color = self._color
+        other = player.other.value
+        next_hash = self._hash ^ hash_codes[EMPTY][idx] ^ \
+            hash_codes[player.value][idx]
+        captured_roots = []
+        for neighbor in self._geo.neighbors[idx]:
+            if color[neighbor] != other:
+                continue
+            root = self._parent[neighbor]
+            if root in captured_roots or not self._in_atari(root):
+                continue
+            captured_roots.append(root)
+            for stone in self._string_indices(root):
+                next_hash ^= hash_codes[other][stone] ^ \
+                    hash_codes[EMPTY][stone]
+        return next_hash
+    
+    def is_on_grid(self, point):
+        return 1 <= point.row <= self.num_rows and \
+            1 <= point.col <= self.num_cols
+    
+    def neighbors(self, point):
+        index_to_point = self._geo.index_to_point
+        return [
+            index_to_point[n]
+            for n in self._geo.neighbors[self._geo.point_to_index[point]]
+            if self._color[n] != BORDER
+        ]
+    
+    def corners(self, point):
+        index_to_point = self._geo.index_to_point
+        return [
+            index_to_point[n]
+            for n in self._geo.corners[self._geo.point_to_index[point]]
+            if self._color[n] != BORDER
+        ]
+    
+    def get(self, point):
+        idx = self._geo.point_to_index.get(point)
+        if idx is None:
+            return None
+        return PLAYERS[self._color[idx]]
+    
+    def get_go_string(self, point):
+        idx = self._geo.point_to_index.get(point)
+        if idx is None or self._color[idx] == EMPTY:
+            return None
+        root = self._parent[idx]
+        string = self._strings.get(root)
+        if string is None:
+            index_to_point = self._geo.index_to_point
+            stones = self._string_indices(root)
+            liberties = set()
+            for stone in stones:
+                for neighbor in self._geo.neighbors[stone]:
+                    if self._color[neighbor] == EMPTY:
+                        liberties.add(index_to_point[neighbor])
+            string = GoString(
+                PLAYERS[self._color[idx]],
+                [index_to_point[stone] for stone in stones],
+                liberties,
+            )
+            self._strings[root] = string
+        return string
+    
+    def __eq__(self, other):
+        return isinstance(other, Board) and \
+            self.num_rows == other.num_rows and \
+            self.num_cols == other.num_cols and \
+            self._hash == other._hash
+    
+    def copy(self):
+        # every table is a flat array of machine ints, so copying the
+        # board is a handful of memcpy calls
+        copied = Board.__new__(Board)
+        copied.num_rows = self.num_rows
+        copied.num_cols = self.num_cols
+        copied._geo = self._geo
+        copied._color = self._color[:]
+        copied._parent = self._parent[:]
+        copied._next = self._next[:]
+        copied._size = self._size[:]
+        copied._libs = self._libs[:]
+        copied._lib_sum = self._lib_sum[:]
+        copied._lib_sum_sq = self._lib_sum_sq[:]
+        copied._placed_at = self._placed_at[:]
+        copied._num_placed = self._num_placed
+        copied._hash = self._hash
+        copied._strings = {}
+        return copied
+    
+    def __deepcopy__(self, memodict={}):
+        return self.copy()
+    
+    def padded_planes(self):
+        # color and atari planes for dlgo.movemasks, read straight from
+        # the flat tables, which already carry the border ring
+        geo = self._geo
+        shape = (geo.num_rows + 2, geo.stride)
+        colors = np.frombuffer(self._color, dtype='l')
+        parent = np.frombuffer(self._parent, dtype='l')
+        libs = np.frombuffer(self._libs, dtype='l')[parent]
+        lib_sum = np.frombuffer(self._lib_sum, dtype='l')[parent]
+        lib_sum_sq = np.frombuffer(self._lib_sum_sq, dtype='l')[parent]
+        in_atari = (colors == BLACK) | (colors == WHITE)
+        in_atari &= libs > 0
+        in_atari &= libs * lib_sum_sq == lib_sum * lib_sum
+        return (
+            colors.astype(np.int8).reshape(shape),
+            in_atari.reshape(shape),
+        )
+    
+    def zobrist_hash(self):
+        return self._hash
+
+
+class GameState():
+    def __init__(
+            self,
+            board,
+            next_player,
+            previous,
+            move):
+        
+        self.board = board
+        self.next_player = next_player
+        self.previous_state = previous
+        if previous is None:
+            self.previous_states = KoHistory()
+        else:
+            self.previous_states = previous.previous_states.add(
+                (previous.next_player, previous.board.zobrist_hash())
+            )
+        self.last_move = move
+        self._undo_stack = []
+    
+    def apply_move(self, move):
+        if move.is_play:
+            next_board = self.board.copy()
+            next_board.place_stone(self.next_player, move.point)
+        else:
+            next_board = self.board
+        return GameState(
+            next_board,
+            self.next_player.other,
+            self,
+            move,
+        )
+    
+    def copy(self):
+        # same position with a private board, to push / pop moves on
+        # without touching this state or the states sharing its board
+        copied = GameState.__new__(GameState)
+        copied.board = self.board.copy()
+        copied.next_player = self.next_player
+        copied.previous_state = self.previous_state
+        copied.previous_states = self.previous_states
+        copied.last_move = self.last_move
+        copied._undo_stack = []
+        return copied
+    
+    def push(self, move):
+        # mutable search mode: play move on this state in place, pop()
+        # takes it back from the board's undo log
+        situation = (self.next_player, self.board.zobrist_hash())
+        undo_log = None
+        if move.is_play:
+            undo_log = []
+            self.board.place_stone(self.next_player, move.point, undo_log)
+        self._undo_stack.append(
+            (move, self.last_move, self.previous_states, undo_log)
+        )
+        self.previous_states = self.previous_states.add(situation)
+        self.next_player = self.next_player.other
+        self.last_move = move
+    
+    def pop(self):
+        move, last_move, previous_states, undo_log = self._undo_stack.pop()
+        if undo_log is not None:
+            self.board.undo_place_stone(undo_log)
+        self.next_player = self.next_player.other
+        self.last_move = last_move
+        self.previous_states = previous_states
+        return move
+    
+    @property
+    def depth(self):
+        # number of pushed moves pop() can still take back
+        return len(self._undo_stack)
+    
+    @classmethod
+    def new_game(cls, board_size):
+        if isinstance(board_size, int):
+            board_size = (board_size, board_size)
+        board = Board(*board_size)
+        return GameState(
+            board,
+            Player.black,
+            None,
+            None,
+        )
+    
+    def is_move_self_capture(
+            self,
+            player,
+            move):
+        
+        if not move.is_play:
+            return False
+        return self.board.is_self_capture(player, move.point)
+    
+    @property
+    def situation(self):
+        return (self.next_player, self.board)
+    
+    def does_move_violate_ko(
+            self,
+            player,
+            move):
+        
+        if not move.is_play:
+            return False
+        if not self.board.will_capture(player, move.point):
+            return False
+        next_situation = (
+            player.other,
+            self.board.hash_after_move(player, move.point),
+        )
+        return next_situation in self.previous_states
+    
+    def is_valid_move(self, move):
+        if self.is_over():
+            return False
+        if move.is_pass or move.is_resign:
+            return True
+        return (
+            self.board.get(move.point) is None and
+            not self.is_move_self_capture(self.next_player, move) and
+            not self.does_move_violate_ko(self.next_player, move)
+        )
+    
+    def is_over(self):
+        if self.last_move is None:
+            return False
+        if self.last_move.is_resign:
+            return True
+        if self._undo_stack:
+            second_last_move = self._undo_stack[-1][1]
+        elif self.previous_state is not None:
+            second_last_move = self.previous_state.last_move
+        else:
+            second_last_move = None
+        if second_last_move is None:
+            return False
+        return self.last_move.is_pass and second_last_move.is_pass
+    
+    def legal_moves(self):
+        if self.is_over():
+            return []
+        moves = [
+            Move.play(point) for point in movemasks.legal_points(self)
+        ]
+        # these two moves are always legal
+        moves.append(Move.pass_turn())
+        moves.append(Move.resign())
+        return moves
+    
+    def winner(self):
+        if not self.is_over():
+            return None
+        if self.last_move.is_resign:
+            return self.next_player
+        game_result = compute_game_result(self)
+        return game_result.winner
\ No newline at end of file
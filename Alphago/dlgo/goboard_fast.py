@@ -1,7 +1,10 @@
 import copy
+
+import numpy as np
+
 from dlgo.gotypes import Player, Point
 from dlgo.scoring import compute_game_result
-from dlgo import zobrist
+from dlgo import movemasks, zobrist
 from dlgo.utils import MoveAge
 
 __all__ = [
@@ -53,6 +56,42 @@ class IllegalMoveError(Exception):
     pass
 
 
+class KoHistory():
+    # Persistent set of (player, zobrist hash) situations. add() returns
+    # a new set that shares all existing entries with this one, so every
+    # game state can hold its own history without copying it. The bloom
+    # bits answer most negative lookups without walking the chain. key
+    # is a hash of the set of situations, the same whatever order they
+    # were added in.
+    __slots__ = ('situation', 'parent', 'bloom', 'key')
+
+    def __init__(
+            self,
+            situation=None,
+            parent=None):
+        
+        self.situation = situation
+        self.parent = parent
+        self.bloom = 0 if parent is None else parent.bloom
+        self.key = 0 if parent is None else parent.key
+        if situation is not None:
+            self.bloom |= 1 << (situation[1] & 4095)
+            self.key = (self.key + hash(situation)) & 0xFFFFFFFFFFFFFFFF
+    
+    def add(self, situation):
+        return KoHistory(situation, self)
+    
+    def __contains__(self, situation):
+        if not (self.bloom >> (situation[1] & 4095)) & 1:
+            return False
+        node = self
+        while node is not None:
+            if node.situation == situation:
+                return True
+            node = node.parent
+        return False
+
+
 class GoString():
     def __init__(
             self,
@@ -61,8 +100,8 @@ class GoString():
             liberties):
         
         self.color = color
-        self.stones = stones
-        self.liberties = liberties
+        self.stones = frozenset(stones)
+        self.liberties = frozenset(liberties)
     
     def without_liberty(self, point):
         new_liberties = self.liberties - set([point])
@@ -70,7 +109,7 @@ class GoString():
     
     def with_liberty(self, point):
         new_liberties = self.liberties | set([point])
-        return GoString(self.colir, self.stones, new_liberties)
+        return GoString(self.color, self.stones, new_liberties)
     
     def merged_with(self, string):
         assert string.color == self.color 
@@ -122,7 +161,9 @@ class Board():
     def corners(self, point):
         return self.corner_table[point]
     
-    def place_stone(self, player, point):
+    def place_stone(self, player, point, undo_log=None):
+        # with an undo_log list, every change is recorded so that
+        # undo_place_stone(undo_log) can take the stone back
         assert self.is_on_grid(point)
         if self._grid.get(point) is not None:
             print('Illegal play on %s' % str(point))
@@ -131,6 +172,8 @@ class Board():
         adjacent_same_color = []
         adjacent_opposite_color = []
         liberties = []
+        if undo_log is not None:
+            undo_log.append((self._hash, self.move_ages.move_ages.copy()))
         self.move_ages.increment_all()
         self.move_ages.add(point)
         for neighbor in self.neighbor_table[point]:
@@ -148,7 +191,7 @@ class Board():
         for same_color_string in adjacent_same_color:
             new_string = new_string.merged_with(same_color_string)
         for new_string_point in new_string.stones:
-            self._grid[new_string_point] = new_string
+            self._set_string(new_string_point, new_string, undo_log)
         # remove empty-point hash code
         self._hash ^= zobrist.HASH_CODE[point, None]
         # Add filled point hash code
@@ -160,15 +203,25 @@ class Board():
         for other_color_string in adjacent_opposite_color:
             replacement = other_color_string.without_liberty(point)
             if replacement.num_liberties:
-                self._replace_string(other_color_string.without_liberty(point))
+                self._replace_string(replacement, undo_log)
             else:
-                self._remove_string(other_color_string)
+                self._remove_string(other_color_string, undo_log)
+    
+    def undo_place_stone(self, undo_log):
+        for point, string in reversed(undo_log[1:]):
+            self._grid[point] = string
+        self._hash, self.move_ages.move_ages = undo_log[0]
+    
+    def _set_string(self, point, string, undo_log):
+        if undo_log is not None:
+            undo_log.append((point, self._grid.get(point)))
+        self._grid[point] = string
     
-    def _replace_string(self, new_string):
+    def _replace_string(self, new_string, undo_log=None):
         for point in new_string.stones:
-            self._grid[point] = new_string
+            self._set_string(point, new_string, undo_log)
     
-    def _remove_string(self, string):
+    def _remove_string(self, string, undo_log=None):
         for point in string.stones:
             self.move_ages.reset_age(point)
             # removing a string can create liberties for other strings
@@ -177,13 +230,16 @@ class Board():
                 if neighbor_string is None:
                     continue
                 if neighbor_string is not string:
-                    self._replace_string(neighbor_string.with_liberty(point))
-            self._grid[point] = None
+                    self._replace_string(
+                        neighbor_string.with_liberty(point),
+                        undo_log,
+                    )
+            self._set_string(point, None, undo_log)
             # remove filled point hash code
             self._hash ^= zobrist.HASH_CODE[point, string.color]
             # add empty point hash code
             self._hash ^= zobrist.HASH_CODE[point, None]
-        
+    
     def is_self_capture(self, player, point):
         friendly_strings = []
         for neighbor in self.neighbor_table[point]:
@@ -198,7 +254,7 @@ class Board():
                 if neighbor_string.num_liberties == 1:
                     # this move is real capture, not a self capture
                     return False
-        
+
         if all(neighbor.num_liberties == 1 for neighbor in friendly_strings):
             return True
         return False
@@ -216,6 +272,24 @@ class Board():
                     return True
         return False
     
+    def hash_after_move(self, player, point):
+        # zobrist hash of the board after player plays at point,
+        # computed without copying the board
+        next_hash = self._hash ^ zobrist.HASH_CODE[point, None] ^ \
+            zobrist.HASH_CODE[point, player]
+        captured = []
+        for neighbor in self.neighbor_table[point]:
+            neighbor_string = self._grid.get(neighbor)
+            if neighbor_string is None or neighbor_string.color == player:
+                continue
+            if neighbor_string.num_liberties == 1 and \
+                    neighbor_string not in captured:
+                captured.append(neighbor_string)
+                for stone in neighbor_string.stones:
+                    next_hash ^= zobrist.HASH_CODE[stone, neighbor_string.color]
+                    next_hash ^= zobrist.HASH_CODE[stone, None]
+        return next_hash
+    
     def is_on_grid(self, point):
         return 1 <= point.row <= self.num_rows and \
             1 <= point.col <= self.num_cols
@@ -236,7 +310,7 @@ class Board():
         return isinstance(other, Board) and \
             self.num_rows == other.num_rows and \
             self.num_cols == other.num_cols and \
-            self._hash() == other._hash()
+            self._hash == other._hash
     
     def __deepcopy__(self, memodict={}):
         copied = Board(self.num_rows, self.num_cols)
@@ -244,8 +318,40 @@ class Board():
         # (immutable) to GoStrings (also immutable)
         copied._grid = copy.copy(self._grid)
         copied._hash = self._hash
+        copied.move_ages.move_ages = self.move_ages.move_ages.copy()
         return copied
     
+    def padded_planes(self):
+        # color and atari planes with a border ring for dlgo.movemasks
+        colors = np.full((self.num_rows + 2, self.num_cols + 2), 3, np.int8)
+        colors[1:-1, 1:-1] = 0
+        in_atari = np.zeros(colors.shape, dtype=bool)
+        for point, string in self._grid.items():
+            if string is None:
+                continue
+            colors[point] = string.color.value
+            in_atari[point] = string.num_liberties == 1
+        return colors, in_atari
+    
+    def color_plane(self):
+        # the color plane of padded_planes() alone, for dlgo.scoring
+        colors = np.full((self.num_rows + 2, self.num_cols + 2), 3, np.int8)
+        colors[1:-1, 1:-1] = 0
+        black = []
+        white = []
+        for point, string in self._grid.items():
+            if string is None:
+                continue
+            if string.color == Player.black:
+                black.append(point)
+            else:
+                white.append(point)
+        if black:
+            colors[tuple(zip(*black))] = 1
+        if white:
+            colors[tuple(zip(*white))] = 2
+        return colors
+    
     def zobrist_hash(self):
         return self._hash
 
@@ -318,15 +424,13 @@ class GameState():
         self.next_player = next_player
         self.previous_state = previous
         if previous is None:
-            self.previous_state = frozenset()
+            self.previous_states = KoHistory()
         else:
-            self.previous_state = frozenset(
-                previous.previous_state |
-                {
-                    (previous.next_player, previous.board.zobrist_hash())
-                }
+            self.previous_states = previous.previous_states.add(
+                (previous.next_player, previous.board.zobrist_hash())
             )
         self.last_move = move
+        self._undo_stack = []
     
     def apply_move(self, move):
         if move.is_play:
@@ -341,6 +445,47 @@ class GameState():
             move,
         )
     
+    def copy(self):
+        # same position with a private board, to push / pop moves on
+        # without touching this state or the states sharing its board
+        copied = GameState.__new__(GameState)
+        copied.board = copy.deepcopy(self.board)
+        copied.next_player = self.next_player
+        copied.previous_state = self.previous_state
+        copied.previous_states = self.previous_states
+        copied.last_move = self.last_move
+        copied._undo_stack = []
+        return copied
+    
+    def push(self, move):
+        # mutable search mode: play move on this state in place. Only
+        # the changed grid entries are recorded, pop() restores them.
+        situation = (self.next_player, self.board.zobrist_hash())
+        undo_log = None
+        if move.is_play:
+            undo_log = []
+            self.board.place_stone(self.next_player, move.point, undo_log)
+        self._undo_stack.append(
+            (move, self.last_move, self.previous_states, undo_log)
+        )
+        self.previous_states = self.previous_states.add(situation)
+        self.next_player = self.next_player.other
+        self.last_move = move
+    
+    def pop(self):
+        move, last_move, previous_states, undo_log = self._undo_stack.pop()
+        if undo_log is not None:
+            self.board.undo_place_stone(undo_log)
+        self.next_player = self.next_player.other
+        self.last_move = last_move
+        self.previous_states = previous_states
+        return move
+    
+    @property
+    def depth(self):
+        # number of pushed moves pop() can still take back
+        return len(self._undo_stack)
+    
     @classmethod
     def new_game(cls, board_size):
         if isinstance(board_size, int):
@@ -375,10 +520,11 @@ class GameState():
             return False
         if not self.board.will_capture(player, move.point):
             return False
-        next_board = copy.deepcopy(self.board)
-        next_board.place_stone(player, move.point)
-        next_situation = (player.other, next_board.zobrist_hahs())
-        return next_situation in self.previous_state
+        next_situation = (
+            player.other,
+            self.board.hash_after_move(player, move.point),
+        )
+        return next_situation in self.previous_states
     
     def is_valid_move(self, move):
         if self.is_over():
@@ -396,20 +542,22 @@ class GameState():
             return False
         if self.last_move.is_resign:
             return True
-        second_last_move = self.previous_state.last_move
+        if self._undo_stack:
+            second_last_move = self._undo_stack[-1][1]
+        elif self.previous_state is not None:
+            second_last_move = self.previous_state.last_move
+        else:
+            second_last_move = None
         if second_last_move is None:
             return False
         return self.last_move.is_pass and second_last_move.is_pass
-
+    
     def legal_moves(self):
         if self.is_over():
             return []
-        moves = []
-        for row in range(1, self.board.num_rows + 1):
-            for col in range(1, self.board.num_cols + 1):
-                move = Move.play(Point(row, col))
-                if self.is_valid_move(move):
-                    moves.append(move)
+        moves = [
+            Move.play(point) for point in movemasks.legal_points(self)
+        ]
         # these two moves are always legal
         moves.append(Move.pass_turn())
         moves.append(Move.resign())
@@ -0,0 +1,19 @@
+import importlib
+
+__all__ = [
+    'GOBOARD_NAMES',
+    'get_goboard_by_name',
+]
+
+GOBOARD_NAMES = ('slow', 'fast', 'array')
+
+
+def get_goboard_by_name(name):
+    # returns the backend module, so callers use goboard.GameState,
+    # goboard.Move, ... exactly as with `from dlgo import goboard_fast`
+    if name not in GOBOARD_NAMES:
+        raise ValueError(
+            'Unknown goboard backend: {}, choose from {}'.format(
+                name, ', '.join(GOBOARD_NAMES))
+        )
+    return importlib.import_module('dlgo.goboard_' + name)
\ No newline at end of file
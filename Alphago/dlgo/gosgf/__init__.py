@@ -1 +1,2 @@
+from .main_line import *
 from .sgf import *
\ No newline at end of file
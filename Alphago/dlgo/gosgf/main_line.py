@@ -0,0 +1,211 @@
+"""
+Read the main line of SGF games without building a game tree.
+
+The data pipeline only needs the board size, the handicap and the setup
+    stones of the root node, and the B / W moves of the leftmost variation.
+    This module finds them in one scan over the raw bytes, decoding no other
+    properties, where Sgf_game.from_string tokenizes the whole file, builds
+    Tree_nodes for every variation and interprets property values through
+    a presenter.
+
+Moves come out in the form of Tree_node.get_move(): ('b' or 'w', (row, col))
+    with (0, 0) at the lower left, or (color, None) for a pass.
+"""
+
+from __future__ import absolute_import
+import re
+import tarfile
+
+from . import sgf_grammer
+from . import sgf_properties
+
+__all__ = [
+    'Main_line',
+    'iter_main_line',
+    'iter_tar_main_lines',
+    'parse_main_line',
+]
+
+
+# a delimiter, or one property with all of its values
+_token_re = re.compile(
+    r"""
+(?P<D> [;()] )
+|
+(?P<I> [A-Za-z]+ ) \s*
+(?P<V> (?: \[ [^\\\]]* (?: \\. [^\\\]]* )* \] \s* )+ )
+""".encode('ascii'), re.VERBOSE | re.DOTALL
+)
+_value_re = re.compile(
+    r"\[ ( [^\\\]]* (?: \\. [^\\\]]* )* ) \]".encode('ascii'),
+    re.VERBOSE | re.DOTALL,
+)
+_lowercase = b"abcdefghijklmnopqrstuvwxyz"
+_root_properties = frozenset([b"SZ", b"HA", b"AB", b"AW"])
+_move_values = {}
+
+
+def _points_by_value(size):
+    """
+    Map of every raw move value of a board size to its (row, col).
+    """
+    if size not in _move_values:
+        points = {b"[]": None}
+        if size <= 19:
+            points[b"[tt]"] = None
+        for row in range(size):
+            for col in range(size):
+                value = bytes(bytearray([
+                    91, 97 + col, 97 + size - row - 1, 93,
+                ]))
+                points[value] = (row, col)
+        _move_values[size] = points
+    return _move_values[size]
+
+
+class Main_line:
+    """
+    Board size, handicap, setup stones and main line moves of a game.
+
+    Public attributes
+        size         -- board size (int), 19 if SZ is missing
+        handicap     -- int or None, as Sgf_game.get_handicap()
+        black_stones -- set of (row, col) from the root's AB
+        white_stones -- set of (row, col) from the root's AW
+        moves        -- list of (color, move), as Tree_node.get_move()
+    """
+    def __init__(self):
+        self.size = 19
+        self.handicap = None
+        self.black_stones = set()
+        self.white_stones = set()
+        self.moves = []
+
+
+def _points(raw_values, size):
+    points = set()
+    for value in _value_re.findall(raw_values):
+        point = sgf_properties.interpret_go_point(value, size)
+        if point is not None:
+            points.add(point)
+    return points
+
+
+def _interpret_move(values, size):
+    # values holds the brackets and any trailing whitespace; only the
+    # first value counts, as in Tree_node.get_raw_move()
+    try:
+        return _points_by_value(size)[values.rstrip()]
+    except KeyError:
+        return sgf_properties.interpret_go_point(
+            _value_re.match(values).group(1),
+            size,
+        )
+
+
+def _scan(s, game):
+    """
+    Fill 'game' from the root node of 's' and yield its moves.
+
+    All tokens are found by one findall() call. The moves of the leftmost
+        variation end at the first ')', since only its siblings follow.
+        Unlike sgf_grammer.tokenize(), text that is not a token is skipped
+        rather than ending the game.
+    """
+    m = sgf_grammer._find_start_re.search(s)
+    if not m:
+        return
+    num_nodes = 0
+    color = values = None
+    for delimiter, ident, raw_values in _token_re.findall(s, m.start()):
+        if delimiter:
+            if color is not None:
+                yield color, _interpret_move(values, game.size)
+                color = None
+            if delimiter == b")":
+                return
+            if delimiter == b";":
+                num_nodes += 1
+            continue
+        if not ident.isupper():
+            # FF[3] style long names like AddBlack
+            ident = ident.translate(None, _lowercase)
+        if ident == b"B":
+            color = 'b'
+            values = raw_values
+        elif ident == b"W":
+            if color != 'b':
+                color = 'w'
+                values = raw_values
+        elif num_nodes == 1 and ident in _root_properties:
+            value = _value_re.match(raw_values).group(1)
+            if ident == b"SZ":
+                game.size = int(value, 10)
+            elif ident == b"HA":
+                handicap = int(value, 10)
+                if handicap == 1:
+                    raise ValueError("bad HA property")
+                game.handicap = handicap or None
+            elif ident == b"AB":
+                game.black_stones |= _points(raw_values, game.size)
+            else:
+                game.white_stones |= _points(raw_values, game.size)
+    if color is not None:
+        yield color, _interpret_move(values, game.size)
+
+
+def parse_main_line(s):
+    """
+    Read the main line of a single SGF game.
+
+    s -- 8-bit string
+
+    Returns a Main_line.
+
+    Raises ValueError if a move, size or handicap value is malformed.
+
+    Setup stones are interpreted with the size known when they are read,
+        so SZ should come before AB / AW in the root node, as it does in
+        KGS and most other game records.
+    """
+    game = Main_line()
+    game.moves = list(_scan(s, game))
+    return game
+
+
+def iter_main_line(s):
+    """
+    Provide the moves of the leftmost variation of an SGF game as an
+        iterator of (color, move) pairs; see parse_main_line().
+    """
+    return _scan(s, Main_line())
+
+
+def iter_tar_main_lines(archive_path, game_indices=None):
+    """
+    Read the main lines of the .sgf members of a tar archive in one pass.
+
+    archive_path -- path of a (gzipped) tar file, like the KGS archives
+    game_indices -- only these games, or None for all of them
+
+    Games are numbered by their position in the archive, not counting the
+        leading directory member, which is how dlgo.data.Sampler numbers
+        KGS games.
+
+    Yields pairs (game index, Main_line).
+
+    Raises ValueError if a selected member is not an .sgf file.
+    """
+    if game_indices is not None:
+        game_indices = set(game_indices)
+    with tarfile.open(archive_path, 'r|*') as archive:
+        for position, member in enumerate(archive):
+            index = position - 1
+            if game_indices is not None and index not in game_indices:
+                continue
+            if index < 0 and member.isdir():
+                continue
+            if not member.name.endswith('.sgf'):
+                raise ValueError(member.name + ' is not a valid sgf')
+            content = archive.extractfile(member).read()
+            yield index, parse_main_line(content)
\ No newline at end of file
@@ -393,7 +393,7 @@ class Tree_node(Node):
         self._children = []
         Node.__init__(self, properties, parent._presenter)
     
-    def __add_child(self, node):
+    def _add_child(self, node):
         self._children.append(node)
     
     def __len__(self):
@@ -521,7 +521,7 @@ class _Unexpected_root_tree_node(_Root_tree_node):
             self._coarse_tree,
             self,
             Tree_node,
-            Tree_node.__add_child,
+            Tree_node._add_child,
         )
         delattr(self, '_coarse_tree')
         self.__class__ = _Root_tree_node
@@ -810,7 +810,7 @@ class Sgf_game:
             nodes without building the entire game tree.
         """
         if isinstance(self.root, _Unexpected_root_tree_node):
-            return self.root_main_sequence_iter()
+            return self.root._main_sequence_iter()
         return iter(self.get_main_sequence())
     
     def extend_main_sequence(self):
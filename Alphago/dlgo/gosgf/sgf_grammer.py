@@ -27,7 +27,7 @@ import string
 import six
 
 _propident_re = re.compile(
-    r"\A[A-Z]{1, 8}\Z".encode('ascii')
+    r"\A[A-Z]{1,8}\Z".encode('ascii')
 )
 _propvalue_re = re.compile(
     r"\A [^\\\]]* (?: \\. [^\\\]]* )* \Z".encode('ascii'),
@@ -40,9 +40,9 @@ _tokenize_re = re.compile(
     r"""
 \s*
 (?:
-    \[ (?P<V> [^\\\]]* (?: \\. [^\\\]]* )* \]     # PropValue
+    \[ (?P<V> [^\\\]]* (?: \\. [^\\\]]* )* ) \]   # PropValue
     |
-    (?P<I> [A-Z]{1, 8} )                        # PropIdent
+    (?P<I> [A-Z]{1,8} )                         # PropIdent
     |
     (?P<D> [;()] )                              # delimiter
 )
@@ -165,7 +165,7 @@ def _parse_sgf_game(s, start_position):
             if token_type == 'V':
                 raise ValueError("undexpected value")
             if token_type == 'D':
-                if token == 'b':
+                if token == b';':
                     if sequence is None:
                         raise ValueError("unexpected node")
                     properties = {}
@@ -75,7 +75,7 @@ def interpret_go_point(s, size):
     return row, col
 
 
-def serailize_go_point(move, size):
+def serialize_go_point(move, size):
     """
     Serialize a GO Point, Move, or Stone value.
 
@@ -330,7 +330,7 @@ def serialize_point(point, context):
     """
     if point is None:
         raise ValueError
-    return serailize_go_point(point, context.size)
+    return serialize_go_point(point, context.size)
 
 
 def interpret_move(s, context):
@@ -344,7 +344,7 @@ def interpret_move(s, context):
     return interpret_go_point(s, context.size)
 
 
-def serailize_move(move, context):
+def serialize_move(move, context):
     """
     Serialize a Move value.
 
@@ -352,7 +352,7 @@ def serailize_move(move, context):
 
     See serialize_go_point() above for details.
     """
-    return serailize_go_point(move, context.size)
+    return serialize_go_point(move, context.size)
 
 
 def interpret_point_list(values, context):
@@ -493,7 +493,7 @@ def interpret_FG(s, context):
     return int(flags), interpret_simpletext(name, context)
 
 
-def serilaize_FG(value, context):
+def serialize_FG(value, context):
     """
     Serialize an FG (figure) property value.
 
@@ -567,7 +567,7 @@ def _make_property_type(
     
     return Property_type(
         globals()["interpret_" + type_name],
-        globals()["serailize_" + type_name],
+        globals()["serialize_" + type_name],
         uses_list=(type_name.endswith("_list")),
         allows_empty_list=allows_empty_list,
     )
@@ -639,7 +639,7 @@ _property_types_by_ident = {
     b'OW': P['number'],                     # move          OtStones White
     b'PB': P['simpletext'],                 # game-info     Player Black
     b'PC': P['simpletext'],                 # game-info     Place
-    b'PL': P['colour'],                     # setup         Player to play
+    b'PL': P['color'],                      # setup         Player to play
     b'PM': P['number'],                     # - [inherit]   Print move mode
     b'PW': P['simpletext'],                 # game-info     Player White
     b'RE': P['simpletext'],                 # game-info     Result
@@ -830,7 +830,7 @@ class Presenter(_Context):
             values for each type.
 
         elist handling: if the property's value type is an elist type and the
-            serailize_... function returns an empty list, this returns a list
+            serialize_... function returns an empty list, this returns a list
             containing a single empty string.
 
         Raises ValueError if it cannot serialize the value.
@@ -1 +1,2 @@
-from .frontend import *
\ No newline at end of file
+from .frontend import *
+from .server import *
\ No newline at end of file
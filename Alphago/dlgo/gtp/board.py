@@ -7,7 +7,7 @@ COLS = 'ABCDEFGHJKLMNOPQRST'
 
 def coords_to_gtp_position(move):
     point = move.point
-    return COLS[point.col - 1] + str(point.move)
+    return COLS[point.col - 1] + str(point.row)
 
 
 def gtp_position_to_coords(gtp_position):
@@ -1,4 +1,5 @@
 import sys
+import time
 
 from dlgo.gtp import command, response
 from dlgo.gtp.board import gtp_position_to_coords, coords_to_gtp_position
@@ -23,13 +24,18 @@ class GTPFrontend:
     def __init__(
             self,
             termination_agent,
-            termination=None):
+            termination=None,
+            input_stream=None,
+            output_stream=None,
+            latencies=None):
         
         self.agent = termination_agent
         self.game_state = GameState.new_game(19)
-        self._input = sys.stdin
-        self._output = sys.stdout
+        self._input = input_stream if input_stream is not None else sys.stdin
+        self._output = output_stream if output_stream is not None else sys.stdout
         self._stopped = False
+        # dlgo.serving.LatencyStats for genmove, if given
+        self.latencies = latencies
 
         self.handlers = {
             'boardsize': self.handle_boardsize,
@@ -48,7 +54,10 @@ class GTPFrontend:
     
     def run(self):
         while not self._stopped:
-            input_line = self._input.readline().strip()
+            input_line = self._input.readline()
+            if not input_line:
+                break   # end of input
+            input_line = input_line.strip()
             cmd = command.parse(input_line)
             resp = self.process(cmd)
             self._output.write(response.serialize(cmd, resp))
@@ -71,7 +80,10 @@ class GTPFrontend:
         return response.success()
     
     def handle_genmove(self, color):
+        start = time.time()
         move = self.agent.select_move(self.game_state)
+        if self.latencies is not None:
+            self.latencies.record(time.time() - start)
         self.game_state = self.game_state.apply_move(move)
         if move.is_pass:
             return response.success('pass')
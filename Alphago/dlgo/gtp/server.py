@@ -0,0 +1,46 @@
+import io
+import socketserver
+
+from dlgo.gtp.frontend import GTPFrontend
+from dlgo.serving import LatencyStats
+
+__all__ = [
+    'GTPServer',
+]
+
+
+class GTPServer(socketserver.ThreadingTCPServer):
+    # GTP over TCP, one GTPFrontend and one agent per connection, each
+    # connection on its own thread. make_agent() returns the agent for a
+    # new connection; agents built on one dlgo.serving.ModelBatcher get
+    # the network evaluations of all connections batched together.
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(
+            self,
+            make_agent,
+            address=('127.0.0.1', 5000)):
+        
+        self.make_agent = make_agent
+        self.latencies = LatencyStats()
+        socketserver.ThreadingTCPServer.__init__(
+            self,
+            address,
+            _GTPHandler,
+        )
+
+
+class _GTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        frontend = GTPFrontend(
+            self.server.make_agent(),
+            input_stream=io.TextIOWrapper(self.rfile, encoding='utf-8'),
+            output_stream=io.TextIOWrapper(
+                self.wfile,
+                encoding='utf-8',
+                write_through=True,
+            ),
+            latencies=self.server.latencies,
+        )
+        frontend.run()
\ No newline at end of file
@@ -5,9 +5,7 @@ from flask import jsonify
 from flask import request
 
 from dlgo import agent
-from dlgo import goboard_fast as goboard
-from dlgo.utils import coords_from_point
-from dlgo.utils import point_from_coords
+from dlgo.serving import BotServer, encode_move
 
 
 __all__ = [
@@ -15,11 +13,12 @@ __all__ = [
 ]
 
 
-def get_web_app(bot_map):
+def get_web_app(bot_map, bot_server=None):
     """
     Create a flask application for serving bot moves.
 
-    The bot_map from URL path fragments to Agent instances.
+    The bot_map from URL path fragments to Agent instances (or functions
+        creating one Agent per request thread, see dlgo.serving.BotServer).
 
     The /static path will return some static content (including the
         jgoboard JS).
@@ -27,6 +26,10 @@ def get_web_app(bot_map):
     Clients can get the post move by POSTing json to 
         /select-move/<bot nam>
 
+    Requests with a 'game_id' continue that game from its cached
+        GameState instead of replaying all of its moves. GET /stats
+        returns latency percentiles per bot.
+
     Examples:
 
         >>> myagent = agent.RandomBot()
@@ -37,6 +40,8 @@ def get_web_app(bot_map):
     
         Flask application instance
     """
+    if bot_server is None:
+        bot_server = BotServer(bot_map)
     here = os.path.dirname(__file__)
     static_path = os.path.join(here, 'static')
     app = Flask(
@@ -44,34 +49,25 @@ def get_web_app(bot_map):
         static_folder=static_path,
         static_url_path='/static',
     )
-
+    
     @app.route('/select-move/<bot_name>', methods=['POST'])
     def select_move(bot_name):
         content = request.json
-        board_size = content['board_size']
-        game_state = goboard.GameState.new_game(board_size)
-        # replay the game up to this point.
-        for move in content['moves']:
-            if move == 'pass':
-                next_move = goboard.Move.pass_turn()
-            elif move == 'resign':
-                next_move = goboard.Move.resign()
-            else:
-                next_move = goboard.Move.play(point_from_coords(move))
-            game_state = game_state.apply_move(next_move)
-        bot_agent = bot_map[bot_name]
-        bot_move = bot_agent.select_move(game_state)
-        if bot_move.is_pass:
-            bot_move_str = 'pass'
-        elif bot_move.is_resign:
-            bot_move_str = 'resign'
-        else:
-            bot_move_str = coords_from_point(bot_move.point)
+        bot_move, diagnostics = bot_server.select_move(
+            bot_name,
+            content['board_size'],
+            content['moves'],
+            content.get('game_id'),
+        )
         return jsonify(
             {
-                'bot_move': bot_move_str,
-                'diagnostics': bot_agent.diagnostics()
+                'bot_move': encode_move(bot_move),
+                'diagnostics': diagnostics,
             }
         )
     
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        return jsonify(bot_server.stats())
+    
     return app
\ No newline at end of file
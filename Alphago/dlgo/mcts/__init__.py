@@ -1 +1,2 @@
-from .mcts import *
\ No newline at end of file
+from .mcts import *
+from .playout import *
\ No newline at end of file
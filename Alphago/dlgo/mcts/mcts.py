@@ -1,7 +1,10 @@
+import importlib
 import math
 import random
+from concurrent.futures import ProcessPoolExecutor
 
 from dlgo import agent
+from dlgo import scoring
 from dlgo.gotypes import Player
 from dlgo.utils import coords_from_point
 
@@ -16,9 +19,14 @@ class MCTSNode(object):
             self,
             game_state,
             parent=None,
-            move=None):
+            move=None,
+            keep_state=True):
         
-        self.game_state = game_state
+        # without keep_state the node only remembers what the search
+        # needs; the position itself lives in the agent's pushed state
+        self.game_state = game_state if keep_state else None
+        self.next_player = game_state.next_player
+        self.terminal = game_state.is_over()
         self.parent = parent
         self.move = move
         self.win_counts = {
@@ -29,13 +37,24 @@ class MCTSNode(object):
         self.children = []
         self.univsted_moves = game_state.legal_moves()
     
-    def add_random_child(self):
+    def add_random_child(self, mutable_state=None):
+        # with a mutable_state positioned at this node, the move is
+        # pushed onto it instead of building a new game state
         index = random.randint(
             0, len(self.univsted_moves) - 1
         )
         new_move = self.univsted_moves.pop(index)
-        new_game_state = self.game_state.apply_move(new_move)
-        new_node = MCTSNode(new_game_state, self, new_move)
+        if mutable_state is None:
+            new_game_state = self.game_state.apply_move(new_move)
+            new_node = MCTSNode(new_game_state, self, new_move)
+        else:
+            mutable_state.push(new_move)
+            new_node = MCTSNode(
+                mutable_state,
+                self,
+                new_move,
+                keep_state=False,
+            )
         self.children.append(new_node)
         return new_node
     
@@ -47,7 +66,7 @@ class MCTSNode(object):
         return len(self.univsted_moves) > 0
     
     def is_terminal(self):
-        return self.game_state.is_over()
+        return self.terminal
     
     def winning_frac(self, player):
         return float(self.win_counts[player]) / float(self.num_rollouts)
@@ -57,46 +76,146 @@ class MCTSAgent(agent.Agent):
     def __init__(
             self,
             num_rounds,
-            temperature):
+            temperature,
+            mutable_search=False,
+            playout_engine=None,
+            num_workers=1,
+            settle_every=0):
         
         agent.Agent.__init__(self)
         self.num_rounds = num_rounds
         self.temperature = temperature
+        # push / pop moves on one private copy of the game state instead
+        # of allocating a new state per node and rollout move. Needs a
+        # board with undo support (goboard_fast or goboard_array).
+        self.mutable_search = mutable_search
+        # e.g. a dlgo.mcts.PlayoutEngine, plays the rollouts on its own
+        # light board instead of with RandomBot and GameState
+        self.playout_engine = playout_engine
+        # root parallel search: num_workers processes grow independent
+        # trees from the same position, their root statistics are summed
+        self.num_workers = num_workers
+        # end rollouts as soon as dlgo.scoring.decided_winner settles the
+        # result, checking every settle_every moves once the rollout has
+        # played as many moves as there were empty points; 0 plays them
+        # to the end
+        self.settle_every = settle_every
+        self._executor = None
     
-    def select_move(self, game_state):
+    def search(self, game_state, num_rounds):
         root = MCTSNode(game_state)
+        search_state = game_state.copy() if self.mutable_search else None
 
-        for i in range(self.num_rounds):
+        for i in range(num_rounds):
             node = root
             while (not node.can_add_child()) and (not node.is_terminal()):
                 node = self.select_child(node)
-            
+                if search_state is not None:
+                    search_state.push(node.move)
+
             if node.can_add_child():
-                node = node.add_random_child()
-            
-            winner = self.simulate_random_game(node.game_state)
+                node = node.add_random_child(search_state)
+
+            if self.playout_engine is not None:
+                winner = self.playout_engine.playout(
+                    node.game_state if search_state is None
+                    else search_state
+                )
+                if search_state is not None:
+                    while search_state.depth > 0:
+                        search_state.pop()
+            elif search_state is None:
+                winner = self.simulate_random_game(
+                    node.game_state,
+                    self.settle_every,
+                )
+            else:
+                winner = self.simulate_random_game_in_place(
+                    search_state,
+                    self.settle_every,
+                )
+                while search_state.depth > 0:
+                    search_state.pop()
 
             while node is not None:
                 node.record_win(winner)
                 node = node.parent
-        
+        return root
+    
+    def root_stats(self, game_state):
+        # [(move, wins for the player to move, rollouts)] of the root's
+        # children, summed over all workers
+        player = game_state.next_player
+        if self.num_workers <= 1:
+            root = self.search(game_state, self.num_rounds)
+            return [
+                (child.move, child.win_counts[player], child.num_rollouts)
+                for child in root.children
+            ]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.num_workers)
+        # worker i plays with seed base_seed + i
+        if self.playout_engine is not None:
+            base_seed = self.playout_engine.next_seed()
+        else:
+            base_seed = random.randrange(2 ** 32)
+        agent_args = {
+            'temperature': self.temperature,
+            'mutable_search': self.mutable_search,
+            'playout_engine': self.playout_engine,
+            'settle_every': self.settle_every,
+        }
+        record = game_record(game_state)
+        rounds = [
+            self.num_rounds // self.num_workers +
+            (i < self.num_rounds % self.num_workers)
+            for i in range(self.num_workers)
+        ]
+        futures = [
+            self._executor.submit(
+                _search_worker,
+                agent_args,
+                record,
+                num_rounds,
+                base_seed + i,
+            )
+            for i, num_rounds in enumerate(rounds)
+        ]
+        totals = {}
+        for future in futures:
+            for move, wins, rollouts in future.result():
+                old_wins, old_rollouts = totals.get(move, (0, 0))
+                totals[move] = (old_wins + wins, old_rollouts + rollouts)
+        return [
+            (move, wins, rollouts)
+            for move, (wins, rollouts) in totals.items()
+        ]
+    
+    def close(self):
+        # shuts down the worker processes of a root parallel search
+        if getattr(self, '_executor', None) is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    def __del__(self):
+        self.close()
+    
+    def select_move(self, game_state):
+        stats = self.root_stats(game_state)
         scored_moves = [
-            (child.winning_frac(game_state.next_player),
-             child.move,
-             child.num_rollouts)
-             for child in root.children
+            (float(wins) / rollouts, move, rollouts)
+            for move, wins, rollouts in stats
         ]
         scored_moves.sort(key=lambda x: x[0], reverse=True)
         for s, m, n in scored_moves[:10]:
             print('%s - %.3f (%d)' % (m, s, n))
-        
+
         best_move = None
         best_pct = -1.0
-        for child in root.children:
-            child_pct = child.winning_frac(game_state.next_player)
+        for child_pct, move, _ in scored_moves:
             if child_pct > best_pct:
                 best_pct = child_pct
-                best_move = child.move
+                best_move = move
         print(
             'Select move %s with win pct %.3f' % (best_move, best_pct)
         )
@@ -111,7 +230,7 @@ class MCTSAgent(agent.Agent):
         best_score = -1
         best_child = None
         for child in node.children:
-            win_percentage = child.winning_frac(node.game_state.next_player)
+            win_percentage = child.winning_frac(node.next_player)
             exploration_factor = math.sqrt(log_rollouts / child.num_rollouts)
             uct_score = win_percentage + self.temperature * exploration_factor
             if uct_score > best_score:
@@ -120,12 +239,100 @@ class MCTSAgent(agent.Agent):
         return best_child
     
     @staticmethod
-    def simulate_random_game(game):
+    def _settle_check(game, settle_every):
+        # the first rollout move at which to look for a decided result
+        if not settle_every:
+            return None
+        colors = scoring.color_plane(game.board)
+        return max(settle_every, int((colors == scoring.EMPTY).sum()))
+    
+    @staticmethod
+    def simulate_random_game(game, settle_every=0):
         bots = {
-            Player.black: agent.RandomBot(),
-            Player.white: agent.RandomBot(),
+            Player.black: agent.FastRandomBot(),
+            Player.white: agent.FastRandomBot(),
         }
+        first_check = MCTSAgent._settle_check(game, settle_every)
+        num_moves = 0
         while not game.is_over():
             bot_move = bots[game.next_player].select_move(game)
             game = game.apply_move(bot_move)
-        return game.winner()
\ No newline at end of file
+            num_moves += 1
+            if first_check is not None and num_moves >= first_check and \
+                    num_moves % settle_every == 0:
+                
+                winner = scoring.decided_winner(game.board)
+                if winner is not None:
+                    return winner
+        return game.winner()
+    
+    @staticmethod
+    def simulate_random_game_in_place(game, settle_every=0):
+        # plays the rollout on game with push() and pops it again,
+        # so game is back at the same position afterwards
+        bots = {
+            Player.black: agent.FastRandomBot(),
+            Player.white: agent.FastRandomBot(),
+        }
+        first_check = MCTSAgent._settle_check(game, settle_every)
+        num_moves = 0
+        winner = None
+        while not game.is_over():
+            bot_move = bots[game.next_player].select_move(game)
+            game.push(bot_move)
+            num_moves += 1
+            if first_check is not None and num_moves >= first_check and \
+                    num_moves % settle_every == 0:
+                
+                winner = scoring.decided_winner(game.board)
+                if winner is not None:
+                    break
+        if winner is None:
+            winner = game.winner()
+        for _ in range(num_moves):
+            game.pop()
+        return winner
+
+
+def game_record(game_state):
+    # the moves leading to game_state, enough to rebuild it in another
+    # process without pickling the whole chain of states
+    moves = []
+    state = game_state
+    while state is not None and state.last_move is not None:
+        moves.append(state.last_move)
+        state = state.previous_state
+    board = game_state.board
+    return (
+        type(game_state).__module__,
+        (board.num_rows, board.num_cols),
+        moves[::-1],
+    )
+
+
+def replay_game_record(record):
+    module_name, board_size, moves = record
+    goboard = importlib.import_module(module_name)
+    game_state = goboard.GameState.new_game(board_size)
+    for move in moves:
+        game_state = game_state.apply_move(move)
+    return game_state
+
+
+def _search_worker(
+        agent_args,
+        record,
+        num_rounds,
+        seed):
+
+    random.seed(seed)
+    if agent_args['playout_engine'] is not None:
+        agent_args['playout_engine'].reseed(seed)
+    game_state = replay_game_record(record)
+    player = game_state.next_player
+    bot = MCTSAgent(num_rounds, **agent_args)
+    root = bot.search(game_state, num_rounds)
+    return [
+        (child.move, child.win_counts[player], child.num_rollouts)
+        for child in root.children
+    ]
\ No newline at end of file
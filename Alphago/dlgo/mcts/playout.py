@@ -0,0 +1,418 @@
+import random
+
+import numpy as np
+
+from dlgo import movemasks
+from dlgo import scoring
+from dlgo.gotypes import Player
+
+__all__ = [
+    'PlayoutBoard',
+    'PlayoutEngine',
+]
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+
+class PlayoutBoard():
+    # Compact board for random playouts: flat lists with a border ring,
+    # strings as circular stone lists with one root each, pseudo
+    # liberties with sum / sum of squares for the atari test, and the
+    # empty points kept in a list that is updated as stones come and go.
+    # It only knows simple ko, which is enough for rollouts.
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.stride = num_cols + 2
+        size = (num_rows + 2) * self.stride
+        self.color = [BORDER] * size
+        self.parent = list(range(size))
+        self.next = list(range(size))
+        self.size = [0] * size
+        self.libs = [0] * size
+        self.lib_sum = [0] * size
+        self.lib_sum_sq = [0] * size
+        self.empty = []
+        self.empty_pos = [-1] * size
+        self.ko = -1
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                idx = r * self.stride + c
+                self.color[idx] = EMPTY
+                self.empty_pos[idx] = len(self.empty)
+                self.empty.append(idx)
+    
+    @classmethod
+    def from_game_state(cls, game_state):
+        board = game_state.board
+        new_board = cls(board.num_rows, board.num_cols)
+        colors, _ = movemasks.board_planes(board)
+        stride = new_board.stride
+        stones = []
+        for r in range(1, board.num_rows + 1):
+            for c in range(1, board.num_cols + 1):
+                if colors[r, c] != EMPTY:
+                    stones.append((r * stride + c, int(colors[r, c])))
+        new_board._setup(stones)
+        ko = movemasks.ko_mask(game_state)
+        for r, c in zip(*ko.nonzero()):
+            new_board.ko = (int(r) + 1) * stride + int(c) + 1
+        return new_board
+    
+    def _setup(self, stones):
+        # put stones down without capturing, then count liberties once
+        # the whole position is there
+        color = self.color
+        stride = self.stride
+        for idx, stone_color in stones:
+            self._remove_empty(idx)
+            color[idx] = stone_color
+            self.size[idx] = 1
+            for neighbor in (idx - stride, idx + stride, idx - 1, idx + 1):
+                if color[neighbor] == stone_color:
+                    root_a = self.parent[idx]
+                    root_b = self.parent[neighbor]
+                    if root_a != root_b:
+                        self._merge(root_a, root_b)
+        for idx, _ in stones:
+            for neighbor in (idx - stride, idx + stride, idx - 1, idx + 1):
+                if color[neighbor] == EMPTY:
+                    self._add_liberty(self.parent[idx], neighbor)
+    
+    def copy(self):
+        copied = PlayoutBoard.__new__(PlayoutBoard)
+        copied.num_rows = self.num_rows
+        copied.num_cols = self.num_cols
+        copied.stride = self.stride
+        copied.color = self.color[:]
+        copied.parent = self.parent[:]
+        copied.next = self.next[:]
+        copied.size = self.size[:]
+        copied.libs = self.libs[:]
+        copied.lib_sum = self.lib_sum[:]
+        copied.lib_sum_sq = self.lib_sum_sq[:]
+        copied.empty = self.empty[:]
+        copied.empty_pos = self.empty_pos[:]
+        copied.ko = self.ko
+        return copied
+    
+    def _remove_empty(self, idx):
+        empty = self.empty
+        empty_pos = self.empty_pos
+        pos = empty_pos[idx]
+        last = empty.pop()
+        if last != idx:
+            empty[pos] = last
+            empty_pos[last] = pos
+        empty_pos[idx] = -1
+    
+    def _add_empty(self, idx):
+        self.empty_pos[idx] = len(self.empty)
+        self.empty.append(idx)
+    
+    def _add_liberty(self, root, lib):
+        self.libs[root] += 1
+        self.lib_sum[root] += lib
+        self.lib_sum_sq[root] += lib * lib
+    
+    def _remove_liberty(self, root, lib):
+        self.libs[root] -= 1
+        self.lib_sum[root] -= lib
+        self.lib_sum_sq[root] -= lib * lib
+    
+    def _in_atari(self, root):
+        libs = self.libs[root]
+        return libs > 0 and \
+            libs * self.lib_sum_sq[root] == self.lib_sum[root] ** 2
+    
+    def _merge(self, root_a, root_b):
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        parent = self.parent
+        nxt = self.next
+        stone = root_b
+        while True:
+            parent[stone] = root_a
+            stone = nxt[stone]
+            if stone == root_b:
+                break
+        nxt[root_a], nxt[root_b] = nxt[root_b], nxt[root_a]
+        self.size[root_a] += self.size[root_b]
+        self.libs[root_a] += self.libs[root_b]
+        self.lib_sum[root_a] += self.lib_sum[root_b]
+        self.lib_sum_sq[root_a] += self.lib_sum_sq[root_b]
+        return root_a
+    
+    def _capture(self, root):
+        color = self.color
+        parent = self.parent
+        nxt = self.next
+        stride = self.stride
+        stones = []
+        stone = root
+        while True:
+            stones.append(stone)
+            stone = nxt[stone]
+            if stone == root:
+                break
+        for stone in stones:
+            color[stone] = EMPTY
+            self._add_empty(stone)
+        for stone in stones:
+            parent[stone] = stone
+            nxt[stone] = stone
+            for neighbor in (
+                    stone - stride,
+                    stone + stride,
+                    stone - 1,
+                    stone + 1):
+                
+                if color[neighbor] == BLACK or color[neighbor] == WHITE:
+                    self._add_liberty(parent[neighbor], stone)
+        return len(stones)
+    
+    def is_eye(self, idx, own):
+        color = self.color
+        stride = self.stride
+        for neighbor in (idx - stride, idx + stride, idx - 1, idx + 1):
+            neighbor_color = color[neighbor]
+            if neighbor_color != own and neighbor_color != BORDER:
+                return False
+        friendly = 0
+        off_board = 0
+        for corner in (
+                idx - stride - 1,
+                idx - stride + 1,
+                idx + stride - 1,
+                idx + stride + 1):
+            
+            corner_color = color[corner]
+            if corner_color == own:
+                friendly += 1
+            elif corner_color == BORDER:
+                off_board += 1
+        if off_board > 0:
+            return off_board + friendly == 4
+        return friendly >= 3
+    
+    def is_playable(self, idx, own):
+        # legal under simple ko and doesn't fill one of our own eyes
+        if idx == self.ko or self.is_eye(idx, own):
+            return False
+        color = self.color
+        parent = self.parent
+        stride = self.stride
+        for neighbor in (idx - stride, idx + stride, idx - 1, idx + 1):
+            neighbor_color = color[neighbor]
+            if neighbor_color == EMPTY:
+                return True
+            if neighbor_color == BORDER:
+                continue
+            in_atari = self._in_atari(parent[neighbor])
+            if neighbor_color == own:
+                if not in_atari:
+                    return True
+            elif in_atari:
+                return True
+        return False
+    
+    def play(self, idx, own):
+        color = self.color
+        parent = self.parent
+        stride = self.stride
+        self._remove_empty(idx)
+        color[idx] = own
+        parent[idx] = idx
+        self.next[idx] = idx
+        self.size[idx] = 1
+        self.libs[idx] = 0
+        self.lib_sum[idx] = 0
+        self.lib_sum_sq[idx] = 0
+        root = idx
+        opponents = []
+        for neighbor in (idx - stride, idx + stride, idx - 1, idx + 1):
+            neighbor_color = color[neighbor]
+            if neighbor_color == EMPTY:
+                self._add_liberty(root, neighbor)
+            elif neighbor_color != BORDER:
+                neighbor_root = parent[neighbor]
+                self._remove_liberty(neighbor_root, idx)
+                if neighbor_color == own:
+                    if neighbor_root != root:
+                        root = self._merge(root, neighbor_root)
+                elif neighbor_root not in opponents:
+                    opponents.append(neighbor_root)
+        captured = 0
+        ko = -1
+        for opponent_root in opponents:
+            if self.libs[opponent_root] == 0:
+                captured += self._capture(opponent_root)
+                ko = opponent_root
+        # a single stone that took a single stone and now sits in atari
+        # can be taken right back
+        if captured == 1 and self.size[root] == 1 and \
+                self.libs[root] == 1:
+            self.ko = ko
+        else:
+            self.ko = -1
+    
+    def random_move(self, own, rng=random.random):
+        # swaps rejected points to the end of the empty list so each one
+        # is tested at most once; -1 means pass
+        empty = self.empty
+        empty_pos = self.empty_pos
+        n = len(empty)
+        while n > 0:
+            i = int(rng() * n)
+            idx = empty[i]
+            if self.is_playable(idx, own):
+                return idx
+            n -= 1
+            last = empty[n]
+            empty[i] = last
+            empty[n] = idx
+            empty_pos[last] = i
+            empty_pos[idx] = n
+        return -1
+    
+    def color_plane(self):
+        # (num_rows + 2, num_cols + 2) colors, as dlgo.scoring uses them
+        return np.array(self.color, dtype=np.int8).reshape(
+            self.num_rows + 2,
+            self.stride,
+        )
+    
+    def area_score(self):
+        # stones plus empty regions that touch only one color
+        color = self.color
+        stride = self.stride
+        score = [0, 0, 0, 0]
+        seen = [False] * len(color)
+        for idx in range(len(color)):
+            point_color = color[idx]
+            if point_color == BLACK or point_color == WHITE:
+                score[point_color] += 1
+                continue
+            if point_color != EMPTY or seen[idx]:
+                continue
+            region = 0
+            borders = 0
+            stack = [idx]
+            seen[idx] = True
+            while stack:
+                point = stack.pop()
+                region += 1
+                for neighbor in (
+                        point - stride,
+                        point + stride,
+                        point - 1,
+                        point + 1):
+                    
+                    neighbor_color = color[neighbor]
+                    if neighbor_color == EMPTY:
+                        if not seen[neighbor]:
+                            seen[neighbor] = True
+                            stack.append(neighbor)
+                    elif neighbor_color != BORDER:
+                        borders |= neighbor_color
+            if borders == BLACK or borders == WHITE:
+                score[borders] += region
+        return score[BLACK], score[WHITE]
+
+
+class PlayoutEngine():
+    # Plays uniformly random, non eye filling games on a PlayoutBoard
+    # and scores them by area. A position is converted once and copied
+    # for each playout.
+    def __init__(
+            self,
+            komi=7.5,
+            max_moves_factor=3,
+            seed=None,
+            settle_every=0):
+        
+        self.komi = komi
+        self.max_moves_factor = max_moves_factor
+        # stop a playout once dlgo.scoring.decided_winner settles it,
+        # checking every settle_every moves after as many moves as there
+        # were empty points; 0 plays every playout to the end
+        self.settle_every = settle_every
+        self._random = random.Random(seed).random if seed is not None \
+            else random.random
+    
+    def reseed(self, seed):
+        # a new random stream; the workers of a root parallel search each
+        # get a copy of the engine and would otherwise all play the same
+        # playouts
+        self._random = random.Random(seed).random
+    
+    def next_seed(self):
+        # a seed drawn from the engine's own stream, so that a seeded
+        # engine seeds its workers the same way every run
+        return int(self._random() * 2 ** 32)
+    
+    def playout_board(
+            self,
+            board,
+            next_player,
+            passes=0):
+        
+        # plays the board to the end in place and returns the winner
+        rng = self._random
+        own = next_player.value
+        max_moves = self.max_moves_factor * board.num_rows * board.num_cols
+        settle_every = self.settle_every
+        first_check = max(settle_every, len(board.empty))
+        num_moves = 0
+        while passes < 2 and num_moves < max_moves:
+            idx = board.random_move(own, rng)
+            if idx < 0:
+                passes += 1
+                board.ko = -1
+            else:
+                passes = 0
+                board.play(idx, own)
+            own = 3 - own
+            num_moves += 1
+            if settle_every and num_moves >= first_check and \
+                    num_moves % settle_every == 0:
+                
+                winner = scoring.decided_winner(
+                    board.color_plane(),
+                    self.komi,
+                )
+                if winner is not None:
+                    return winner
+        black, white = board.area_score()
+        if black > white + self.komi:
+            return Player.black
+        return Player.white
+    
+    @staticmethod
+    def _passes(game_state):
+        last_move = game_state.last_move
+        return int(last_move is not None and last_move.is_pass)
+    
+    def playout(self, game_state):
+        if game_state.is_over():
+            return game_state.winner()
+        board = PlayoutBoard.from_game_state(game_state)
+        return self.playout_board(
+            board,
+            game_state.next_player,
+            self._passes(game_state),
+        )
+    
+    def playouts(self, game_state, num_playouts):
+        # winners of num_playouts games from the same position
+        if game_state.is_over():
+            return [game_state.winner()] * num_playouts
+        start = PlayoutBoard.from_game_state(game_state)
+        passes = self._passes(game_state)
+        return [
+            self.playout_board(start.copy(), game_state.next_player, passes)
+            for _ in range(num_playouts)
+        ]
\ No newline at end of file
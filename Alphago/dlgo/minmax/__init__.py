@@ -1,3 +1,4 @@
 from .alphabeta import *
 from .depthprune import *
+from .iterative import *
 from .minmax import *
\ No newline at end of file
@@ -17,33 +17,42 @@ def alpha_beta_result(
         max_depth,
         best_black,
         best_white,
-        eval_fn):
-    
+        eval_fn,
+        mutable_search=False):
+
+    # with mutable_search, candidate moves are pushed onto game_state and
+    # popped again, so the whole search works on a single state
     if game_state.is_over():
         if game_state.winner() == game_state.next_player:
             return MAX_SCORE
         else:
             return MIN_SCORE
-    
+
     if max_depth == 0:
         return eval_fn(game_state)
-    
+
     best_so_far = MIN_SCORE
-    for candidate_move in game_state.leval_moves():
-        next_state = game_state.apply_move(candidate_move)
+    for candidate_move in game_state.legal_moves():
+        if mutable_search:
+            game_state.push(candidate_move)
+            next_state = game_state
+        else:
+            next_state = game_state.apply_move(candidate_move)
         opponent_best_result = alpha_beta_result(
             next_state,
-            max_depth,
-            -1,
+            max_depth - 1,
             best_black,
             best_white,
             eval_fn,
+            mutable_search,
         )
+        if mutable_search:
+            game_state.pop()
         our_result = -1 * opponent_best_result
 
         if our_result > best_so_far:
             best_so_far = our_result
-        
+
         if game_state.next_player == Player.white:
             if best_so_far > best_white:
                 best_white = best_so_far
@@ -56,30 +65,46 @@ def alpha_beta_result(
             outcome_for_white = -1 * best_so_far
             if outcome_for_white < best_white:
                 return best_so_far
-    
+
     return best_so_far
 
 
 class AlphaBetaAgent(Agent):
-    def __init__(self, max_depth, eval_fn):
+    def __init__(
+            self,
+            max_depth,
+            eval_fn,
+            mutable_search=False):
+        
         Agent.__init__(self)
         self.max_depth = max_depth
         self.eval_fn = eval_fn
+        # search on one private state with push / pop instead of
+        # apply_move, needs a board with undo support
+        self.mutable_search = mutable_search
     
     def select_move(self, game_state):
+        search_state = game_state.copy() if self.mutable_search else None
         best_moves = []
         best_score = None
         best_black = MIN_SCORE
         best_white = MIN_SCORE
         for possible_move in game_state.legal_moves():
-            next_state = game_state.apply_move(possible_move)
+            if search_state is None:
+                next_state = game_state.apply_move(possible_move)
+            else:
+                search_state.push(possible_move)
+                next_state = search_state
             opponent_best_outcome = alpha_beta_result(
                 next_state,
                 self.max_depth,
                 best_black,
                 best_white,
                 self.eval_fn,
+                self.mutable_search,
             )
+            if search_state is not None:
+                search_state.pop()
             our_best_outcome = -1 * opponent_best_outcome
             if (not best_moves) or our_best_outcome > best_score:
                 best_moves = [possible_move]
@@ -90,5 +115,5 @@ class AlphaBetaAgent(Agent):
                     best_white = best_score
             elif our_best_outcome == best_score:
                 best_moves.append(possible_move)
-                
+
         return random.choice(best_moves)
\ No newline at end of file
@@ -5,7 +5,7 @@ from dlgo.scoring import GameResult
 
 
 __all__ = [
-    'DepthprunedAgent',
+    'DepthPrunedAgent',
 ]
 
 MAX_SCORE = 999999
@@ -39,8 +39,7 @@ def best_result(
         next_state = game_state.apply_move(candidate_move)
         opponent_best_result = best_result(
             next_state,
-            max_depth,
-            -1,
+            max_depth - 1,
             eval_fn,
         )
         our_result = -1 * opponent_best_result
@@ -0,0 +1,319 @@
+import time
+
+from dlgo.agent import Agent
+
+
+__all__ = [
+    'IterativeDeepeningAgent',
+    'SearchTable',
+]
+
+MAX_SCORE = 999999
+MIN_SCORE = -999999
+# scores beyond these are wins / losses, MAX_SCORE less the number of
+# moves to the end of the game
+WIN_SCORE = MAX_SCORE - 1000
+LOSS_SCORE = MIN_SCORE + 1000
+
+# bound flags of table entries
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def _to_table(score, ply):
+    # win / loss scores count moves from the root; the table stores them
+    # counted from the entry's position, so they stay right wherever the
+    # position comes up again
+    if score > WIN_SCORE:
+        return score + ply
+    if score < LOSS_SCORE:
+        return score - ply
+    return score
+
+
+def _from_table(score, ply):
+    if score > WIN_SCORE:
+        return score - ply
+    if score < LOSS_SCORE:
+        return score + ply
+    return score
+
+
+def position_key(game_state):
+    # Zobrist hash of the board (dlgo.zobrist codes for go, the ttt
+    # codes for tic-tac-toe) and the player to move. After a pass, a
+    # second one ends the game, so that is part of the position too.
+    last_move = game_state.last_move
+    return (
+        game_state.next_player,
+        game_state.board.zobrist_hash(),
+        last_move is not None and getattr(last_move, 'is_pass', False),
+    )
+
+
+class SearchTable():
+    # Fixed size transposition table for alpha-beta search. An entry
+    # holds the depth a position was searched to, its score, whether
+    # that score is exact or only a lower / upper bound, and the best
+    # move found. Each key has one slot, hash % size. A new entry
+    # replaces the one in its slot if it was searched at least as deep,
+    # or if the old one is left over from an earlier search; deep
+    # entries of the current search survive the many shallow ones near
+    # the leaves.
+    def __init__(self, size=1 << 18):
+        self.size = size
+        self._slots = [None] * size
+        self._generation = 0
+        self.hits = 0
+        self.lookups = 0
+        self.stores = 0
+    
+    def new_search(self):
+        self._generation += 1
+    
+    def get(self, key):
+        self.lookups += 1
+        entry = self._slots[hash(key) % self.size]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry
+    
+    def put(
+            self,
+            key,
+            depth,
+            score,
+            flag,
+            move):
+        
+        slot = hash(key) % self.size
+        old = self._slots[slot]
+        if old is not None and old[5] == self._generation and \
+                old[1] > depth:
+
+            return
+        self._slots[slot] = (key, depth, score, flag, move, self._generation)
+        self.stores += 1
+    
+    def __len__(self):
+        return sum(1 for entry in self._slots if entry is not None)
+    
+    def hit_rate(self):
+        if self.lookups == 0:
+            return 0.0
+        return float(self.hits) / self.lookups
+    
+    def clear(self):
+        self._slots = [None] * self.size
+
+
+class IterativeDeepeningAgent(Agent):
+    # Negamax alpha-beta search to depth 1, 2, ... max_depth, stopping
+    # when max_time seconds are up and playing the best move of the
+    # deepest finished search. Each iteration starts from what the last
+    # one stored in a SearchTable: cutoffs from positions already
+    # searched deep enough, and the best move to try first. The other
+    # moves are ordered by killer moves (moves that caused a cutoff at
+    # the same ply) and by a history score of cutoffs anywhere in the
+    # tree.
+    #
+    # eval_fn(game_state) scores positions at the depth limit for the
+    # player to move, as for AlphaBetaAgent; finished games score as
+    # wins, losses or 0 for a draw. Works for any game state with
+    # legal_moves(), is_over(), winner() and a board with
+    # zobrist_hash(): go (goboard_fast, goboard_array) and dlgo.ttt.
+    # States with push() / pop() are searched in place.
+    def __init__(
+            self,
+            max_depth,
+            eval_fn=None,
+            max_time=None,
+            table=None,
+            num_killers=2):
+        
+        Agent.__init__(self)
+        self.max_depth = max_depth
+        self.eval_fn = eval_fn
+        self.max_time = max_time
+        self.table = table if table is not None else SearchTable()
+        self.num_killers = num_killers
+        self._killers = []
+        self._history = {}
+        self._deadline = None
+        self._mutable = False
+        self.nodes = 0
+        self.last_search = {}
+    
+    def select_move(self, game_state):
+        start = time.time()
+        self._deadline = None if self.max_time is None \
+            else start + self.max_time
+        self._mutable = hasattr(game_state, 'push')
+        self.table.new_search()
+        self._killers = [[] for _ in range(self.max_depth + 1)]
+        # old history would drown out this position's cutoffs
+        self._history = {}
+        self.nodes = 0
+        lookups, hits = self.table.lookups, self.table.hits
+
+        best_move, best_score, depth = None, None, 0
+        for iteration_depth in range(1, self.max_depth + 1):
+            search_state = game_state.copy() if self._mutable \
+                else game_state
+            try:
+                move, score = self._search_root(search_state, iteration_depth)
+            except SearchTimeout:
+                break
+            best_move, best_score, depth = move, score, iteration_depth
+            if score > WIN_SCORE or score < LOSS_SCORE:
+                # the game is decided within the horizon
+                break
+        if best_move is None:
+            # not even depth 1 finished in time
+            best_move = self._ordered_moves(game_state, None, 0)[0]
+
+        elapsed = time.time() - start
+        self.last_search = {
+            'depth': depth,
+            'score': best_score,
+            'nodes': self.nodes,
+            'seconds': elapsed,
+            'nodes_per_sec': self.nodes / elapsed if elapsed > 0 else 0.0,
+            'table_hit_rate': (
+                float(self.table.hits - hits) /
+                max(self.table.lookups - lookups, 1)
+            ),
+        }
+        return best_move
+    
+    def diagnostics(self):
+        return dict(self.last_search)
+    
+    def _child(self, game_state, move):
+        if self._mutable:
+            game_state.push(move)
+            return game_state
+        return game_state.apply_move(move)
+    
+    def _search_root(self, game_state, depth):
+        entry = self.table.get(position_key(game_state))
+        table_move = entry[4] if entry is not None else None
+        alpha = MIN_SCORE - 1
+        best_move = None
+        for move in self._ordered_moves(game_state, table_move, 0):
+            child = self._child(game_state, move)
+            score = -self._search(child, depth - 1, MIN_SCORE - 1, -alpha, 1)
+            if self._mutable:
+                game_state.pop()
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self.table.put(
+            position_key(game_state),
+            depth,
+            _to_table(alpha, 0),
+            EXACT,
+            best_move,
+        )
+        return best_move, alpha
+    
+    def _search(
+            self,
+            game_state,
+            depth,
+            alpha,
+            beta,
+            ply):
+        
+        self.nodes += 1
+        if self._deadline is not None and not self.nodes & 255 and \
+                time.time() > self._deadline:
+
+            raise SearchTimeout()
+        if game_state.is_over():
+            winner = game_state.winner()
+            if winner is None:
+                return 0
+            if winner == game_state.next_player:
+                return MAX_SCORE - ply
+            return MIN_SCORE + ply
+        if depth == 0:
+            return self.eval_fn(game_state) if self.eval_fn else 0
+
+        key = position_key(game_state)
+        entry = self.table.get(key)
+        table_move = None
+        if entry is not None:
+            _, entry_depth, entry_score, flag, table_move, _ = entry
+            if entry_depth >= depth:
+                score = _from_table(entry_score, ply)
+                if flag == EXACT:
+                    return score
+                if flag == LOWER and score > alpha:
+                    alpha = score
+                elif flag == UPPER and score < beta:
+                    beta = score
+                if alpha >= beta:
+                    return score
+
+        original_alpha = alpha
+        best_score = MIN_SCORE - 1
+        best_move = None
+        for move in self._ordered_moves(game_state, table_move, ply):
+            child = self._child(game_state, move)
+            score = -self._search(child, depth - 1, -beta, -alpha, ply + 1)
+            if self._mutable:
+                game_state.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self._record_cutoff(move, depth, ply)
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.put(key, depth, _to_table(best_score, ply), flag, best_move)
+        return best_score
+    
+    def _record_cutoff(self, move, depth, ply):
+        killers = self._killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.num_killers:]
+        self._history[move] = self._history.get(move, 0) + depth * depth
+    
+    def _ordered_moves(self, game_state, table_move, ply):
+        # the table's best move, then killers, then by history score.
+        # Resigning never scores better than playing on, so it is only
+        # searched when it is the only move.
+        moves = [
+            move for move in game_state.legal_moves()
+            if not getattr(move, 'is_resign', False)
+        ]
+        if not moves:
+            return game_state.legal_moves()
+        history = self._history
+        killers = self._killers[ply] if ply < len(self._killers) else []
+
+        def priority(move):
+            if table_move is not None and move == table_move:
+                return 3, 0
+            if move in killers:
+                return 2, -killers.index(move)
+            return 1, history.get(move, 0)
+
+        moves.sort(key=priority, reverse=True)
+        return moves
\ No newline at end of file
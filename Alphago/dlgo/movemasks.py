@@ -0,0 +1,191 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from dlgo.goboard_slow import Move
+from dlgo.gotypes import Point
+
+__all__ = [
+    'MASK_CACHE_SIZE',
+    'board_planes',
+    'clear_cache',
+    'eye_mask',
+    'ko_mask',
+    'legal_play_mask',
+    'legal_points',
+    'sensible_play_mask',
+]
+
+# point contents in the padded planes
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+MASK_CACHE_SIZE = 20000
+
+# (rows, cols, player, zobrist hash) -> (playable, capture, eyes),
+# shared by the threads of BotServer and the GTP frontends
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def board_planes(board):
+    # (rows + 2, cols + 2) color plane with a BORDER ring and a bool
+    # plane marking stones whose string has exactly one liberty
+    if hasattr(board, 'padded_planes'):
+        return board.padded_planes()
+    colors = np.full(
+        (board.num_rows + 2, board.num_cols + 2),
+        BORDER,
+        dtype=np.int8,
+    )
+    colors[1:-1, 1:-1] = EMPTY
+    in_atari = np.zeros(colors.shape, dtype=bool)
+    for r in range(1, board.num_rows + 1):
+        for c in range(1, board.num_cols + 1):
+            go_string = board.get_go_string(Point(row=r, col=c))
+            if go_string is None:
+                continue
+            colors[r, c] = go_string.color.value
+            in_atari[r, c] = go_string.num_liberties == 1
+    return colors, in_atari
+
+
+def _neighbors(plane):
+    return (
+        plane[:-2, 1:-1],
+        plane[2:, 1:-1],
+        plane[1:-1, :-2],
+        plane[1:-1, 2:],
+    )
+
+
+def _corners(plane):
+    return (
+        plane[:-2, :-2],
+        plane[:-2, 2:],
+        plane[2:, :-2],
+        plane[2:, 2:],
+    )
+
+
+def _eyes(colors, own):
+    # same rule as agent.helpers.is_point_an_eye, for every point at once
+    eyes = colors[1:-1, 1:-1] == EMPTY
+    for neighbor in _neighbors(colors):
+        eyes &= (neighbor == own) | (neighbor == BORDER)
+    friendly = np.zeros(eyes.shape, dtype=np.int8)
+    off_board = np.zeros(eyes.shape, dtype=np.int8)
+    for corner in _corners(colors):
+        friendly += corner == own
+        off_board += corner == BORDER
+    eyes &= np.where(
+        off_board > 0,
+        off_board + friendly == 4,
+        friendly >= 3,
+    )
+    return eyes
+
+
+def _compute_masks(board, player):
+    colors, in_atari = board_planes(board)
+    own = player.value
+    other = player.other.value
+    empty = colors[1:-1, 1:-1] == EMPTY
+    has_liberty = np.zeros(empty.shape, dtype=bool)
+    capture = np.zeros(empty.shape, dtype=bool)
+    for neighbor, neighbor_atari in zip(
+            _neighbors(colors),
+            _neighbors(in_atari)):
+        
+        # an empty neighbor, or a friendly string with another liberty
+        has_liberty |= neighbor == EMPTY
+        has_liberty |= (neighbor == own) & ~neighbor_atari
+        capture |= (neighbor == other) & neighbor_atari
+    capture &= empty
+    playable = empty & (has_liberty | capture)
+    eyes = _eyes(colors, own)
+    for mask in (playable, capture, eyes):
+        mask.flags.writeable = False
+    return playable, capture, eyes
+
+
+def _masks(game_state):
+    # everything but ko depends only on the position and the player to
+    # move, so it is shared by all states with the same zobrist hash
+    board = game_state.board
+    if not hasattr(board, 'zobrist_hash'):
+        return _compute_masks(board, game_state.next_player)
+    key = (
+        board.num_rows,
+        board.num_cols,
+        game_state.next_player,
+        board.zobrist_hash(),
+    )
+    with _cache_lock:
+        masks = _cache.get(key)
+        if masks is not None:
+            _cache.move_to_end(key)
+            return masks
+    # computed outside the lock; two threads may both compute a mask,
+    # and the second insert replaces an equal one
+    masks = _compute_masks(board, game_state.next_player)
+    with _cache_lock:
+        _cache[key] = masks
+        if len(_cache) > MASK_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return masks
+
+
+def ko_mask(game_state):
+    # points where the player to move would retake a ko. Only capturing
+    # moves can repeat a position, so only those are checked.
+    _, capture, _ = _masks(game_state)
+    ko = np.zeros(capture.shape, dtype=bool)
+    for r, c in zip(*np.nonzero(capture)):
+        r, c = int(r), int(c)
+        move = Move.play(Point(row=r + 1, col=c + 1))
+        if game_state.does_move_violate_ko(game_state.next_player, move):
+            ko[r, c] = True
+    return ko
+
+
+def legal_play_mask(game_state):
+    # bool (rows, cols) mask of the legal stone placements
+    if game_state.is_over():
+        board = game_state.board
+        return np.zeros((board.num_rows, board.num_cols), dtype=bool)
+    playable, capture, _ = _masks(game_state)
+    if not capture.any():
+        return playable
+    return playable & ~ko_mask(game_state)
+
+
+def eye_mask(game_state, color=None):
+    # eyes of color, by default of the player to move
+    if color is None or color == game_state.next_player:
+        return _masks(game_state)[2]
+    colors, _ = board_planes(game_state.board)
+    return _eyes(colors, color.value)
+
+
+def sensible_play_mask(game_state):
+    # legal moves that don't fill one of our own eyes
+    return legal_play_mask(game_state) & ~eye_mask(game_state)
+
+
+def legal_points(game_state, mask=None):
+    if mask is None:
+        mask = legal_play_mask(game_state)
+    rows, cols = np.nonzero(mask)
+    return [
+        Point(row=r + 1, col=c + 1)
+        for r, c in zip(rows.tolist(), cols.tolist())
+    ]
\ No newline at end of file
@@ -8,7 +8,8 @@ class Layer:
         self.previous = None
         self.next = None
 
-        # state for the forward pass
+        # state for the forward pass; data are column vectors,
+        # (dim, 1), or a minibatch of them side by side, (dim, batch_size)
         self.input_data = None
         self.output_data = None
         
@@ -18,7 +19,7 @@ class Layer:
     
     def connect(self, layer):
         self.previous = layer
-        self.next = self
+        layer.next = self
     
     def forward(self):
         raise NotImplementedError
@@ -40,10 +41,13 @@ class Layer:
     
     def clear_deltas(self):
         pass
-
+    
     def update_params(self, learning_rate):
         pass
-
+    
+    def cast(self, dtype):
+        pass
+    
     def describe(self):
         raise NotImplementedError
 
@@ -60,9 +64,11 @@ class ActivationLayer(Layer):
         self.output_data = sigmoid(data)
     
     def backward(self):
+        # sigmoid'(x) = sigmoid(x) * (1 - sigmoid(x)), from the output
+        # of the forward pass
         delta = self.get_backward_input()
-        data = self.get_forward_input()
-        self.output_delta = delta * sigmoid_prime(data)
+        output = self.output_data
+        self.output_delta = delta * output * (1 - output)
     
     def describe(self):
         print("|-- " + self.__class__.__name__)
@@ -93,10 +99,11 @@ class DenseLayer(Layer):
         self.output_data = np.dot(self.weight, data) + self.bias
     
     def backward(self):
+        # with a minibatch, the gradients of its columns add up
         data = self.get_forward_input()
         delta = self.get_backward_input()
 
-        self.detla_b += delta
+        self.detla_b += delta.sum(axis=1, keepdims=True)
         self.delta_w += np.dot(delta, data.transpose())
         self.output_delta = np.dot(self.weight.transpose(), delta)
     
@@ -105,8 +112,14 @@ class DenseLayer(Layer):
         self.bias -= rate * self.detla_b
     
     def clear_deltas(self):
-        self.delta_w = np.zeros(self.weight.shape)
-        self.detla_b = np.zeros(self.bias.shape)
+        self.delta_w = np.zeros(self.weight.shape, dtype=self.weight.dtype)
+        self.detla_b = np.zeros(self.bias.shape, dtype=self.bias.dtype)
+    
+    def cast(self, dtype):
+        self.weight = self.weight.astype(dtype)
+        self.bias = self.bias.astype(dtype)
+        self.params = [self.weight, self.bias]
+        self.clear_deltas()
     
     def describe(self):
         print("|-- " + self.__class__.__name__)
@@ -117,13 +130,16 @@ class DenseLayer(Layer):
 def sigmoid_double(x):
     return 1.0 / (1.0 + np.exp(-x))
 
-# computes sigmoid on vectors
+# computes sigmoid on vectors and matrices, elementwise; exp
+# overflows to inf for very negative z, which still gives 0
 def sigmoid(z):
-    return np.vectorize(sigmoid_double)(z)
+    with np.errstate(over='ignore'):
+        return 1.0 / (1.0 + np.exp(-z))
 
 # derivative of sigmoid function
 def sigmoid_prime_double(x):
     return sigmoid_double(x) * (1 - sigmoid_double(x))
 
 def sigmoid_prime(z):
-    return np.vectorize(sigmoid_prime_double)(z)
\ No newline at end of file
+    s = sigmoid(z)
+    return s * (1 - s)
\ No newline at end of file
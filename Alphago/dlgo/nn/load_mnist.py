@@ -15,7 +15,7 @@ def shape_data(data):
     return list(zip(features, labels))
 
 
-def load_data():
-    with gzip.open('mnist.pkl.gz', 'rb') as f:
+def load_data(path='mnist.pkl.gz'):
+    with gzip.open(path, 'rb') as f:
         train_data, validation_data, test_data = pickle.load(f, encoding='latin-1')
     return shape_data(train_data), shape_data(test_data)
\ No newline at end of file
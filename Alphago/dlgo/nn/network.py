@@ -5,7 +5,7 @@ import numpy as np
 class MSE:
     def __init__(self):
         pass
-
+    
     @staticmethod
     def loss_function(predictions, labels):
         diff = predictions - labels
@@ -17,18 +17,41 @@ class MSE:
     
 
 class SequentialNetwork:
-    def __init__(self, loss=None):
+    # With batched=True (the default) a minibatch goes through the layers
+    # as one (dim, batch_size) matrix, so each layer does one matrix
+    # product per minibatch; batched=False feeds the samples one at a
+    # time. dtype=np.float32 casts the weights and data to single
+    # precision, which halves the memory traffic.
+    def __init__(
+            self,
+            loss=None,
+            batched=True,
+            dtype=None):
+        
         print('Initialize Network...')
         self.layers = []
-        if loss is None:
-            self.loss = MSE()
+        self.loss = loss if loss is not None else MSE()
+        self.batched = batched
+        self.dtype = dtype
     
     def add(self, layer):
+        if self.dtype is not None:
+            layer.cast(self.dtype)
         self.layers.append(layer)
         layer.describe()
         if len(self.layers) > 1:
             self.layers[-1].connect(self.layers[-2])
     
+    def stack(self, data):
+        # list of (x, y) column vectors -> feature and label matrices with
+        # one column per sample
+        features = np.hstack([x for x, _ in data])
+        labels = np.hstack([y for _, y in data])
+        if self.dtype is not None:
+            features = features.astype(self.dtype)
+            labels = labels.astype(self.dtype)
+        return features, labels
+    
     def train(
             self,
             training_data,
@@ -38,14 +61,27 @@ class SequentialNetwork:
             test_data=None):
         
         n = len(training_data)
+        if self.batched:
+            # stack the samples once; each epoch shuffles columns
+            features, labels = self.stack(training_data)
         for epoch in range(epochs):
-            random.shuffle(training_data)
-            mini_batches = [
-                training_data[k:k + mini_batch_size]
-                for k in range(0, n, mini_batch_size)
-            ]
-            for mini_batch in mini_batches:
-                self.train_batch(mini_batch, learning_rate)
+            if self.batched:
+                order = np.random.permutation(n)
+                for k in range(0, n, mini_batch_size):
+                    batch = order[k:k + mini_batch_size]
+                    self.train_matrix(
+                        features[:, batch],
+                        labels[:, batch],
+                        learning_rate,
+                    )
+            else:
+                random.shuffle(training_data)
+                mini_batches = [
+                    training_data[k:k + mini_batch_size]
+                    for k in range(0, n, mini_batch_size)
+                ]
+                for mini_batch in mini_batches:
+                    self.train_batch(mini_batch, learning_rate)
             if test_data:
                 n_test = len(test_data)
                 print(
@@ -66,12 +102,23 @@ class SequentialNetwork:
         self.forward_backward(mini_batch)
         self.update(mini_batch, learning_rate)
     
+    def train_matrix(
+            self,
+            features,
+            labels,
+            learning_rate):
+        
+        self.matrix_forward_backward(features, labels)
+        self.update_params(learning_rate / features.shape[1])
+    
     def update(
             self,
             mini_batch,
             learning_rate):
         
-        learning_rate = learning_rate / len(mini_batch)
+        self.update_params(learning_rate / len(mini_batch))
+    
+    def update_params(self, learning_rate):
         for layer in self.layers:
             layer.update_params(learning_rate)
         for layer in self.layers:
@@ -81,29 +128,53 @@ class SequentialNetwork:
             self,
             mini_batch):
         
+        if self.batched:
+            self.matrix_forward_backward(*self.stack(mini_batch))
+            return
         for x, y in mini_batch:
-            self.layers[0].input_data = x
-            for layer in self.layers:
-                layer.forward()
-            self.layers[-1].input_delta = self.loss.loss_derivative(
-                self.layers[-1].output_data, y
-            )
-            for layer in reversed(self.layers):
-                layer.backward()
+            self.matrix_forward_backward(x, y)
+    
+    def matrix_forward_backward(
+            self,
+            features,
+            labels):
+        
+        self.single_forward(features)
+        self.layers[-1].input_delta = self.loss.loss_derivative(
+            self.layers[-1].output_data, labels
+        )
+        for layer in reversed(self.layers):
+            layer.backward()
     
     def single_forward(self, x):
+        # x may also be a (dim, batch_size) matrix of samples
+        if self.dtype is not None:
+            x = x.astype(self.dtype, copy=False)
         self.layers[0].input_data = x
         for layer in self.layers:
             layer.forward()
         return self.layers[-1].output_data
     
-    def evaluate(self, test_data):
-        test_results = [
-            (
-                np.argmax(self.single_forward(x)),
-                np.argmax(y),
-            )
-            for (x, y) in test_data
-        ]
+    def evaluate(
+            self,
+            test_data,
+            batch_size=1000):
         
-        return sum(int(x == y) for (x, y) in test_results)
\ No newline at end of file
+        if not self.batched:
+            test_results = [
+                (
+                    np.argmax(self.single_forward(x)),
+                    np.argmax(y),
+                )
+                for (x, y) in test_data
+            ]
+            return sum(int(x == y) for (x, y) in test_results)
+
+        correct = 0
+        for k in range(0, len(test_data), batch_size):
+            features, labels = self.stack(test_data[k:k + batch_size])
+            predictions = self.single_forward(features)
+            correct += int(np.sum(
+                np.argmax(predictions, axis=0) == np.argmax(labels, axis=0)
+            ))
+        return correct
\ No newline at end of file
@@ -2,10 +2,10 @@ import numpy as np
 from keras import optimizers    # SGD
 
 from dlgo.agent.base import Agent
-from dlgo.agent.helpers import is_point_an_eye
 from dlgo import encoders
 from dlgo import goboard
 from dlgo import kerasutil
+from dlgo import movemasks
 
 
 class ACAgent(Agent):
@@ -38,16 +38,10 @@ class ACAgent(Agent):
             replace=False,
             p=move_probs,
         )
+        sensible = movemasks.sensible_play_mask(game_state)
         for point_idx in ranked_moves:
             point = self._encoder.decode_point_index(point_idx)
-            move = goboard.Move.play(point)
-            move_is_valid = game_state.is_valid_move(move)
-            fills_own_eye = is_point_an_eye(
-                game_state.board,
-                point,
-                game_state.next_player,
-            )
-            if move_is_valid and (not fills_own_eye):
+            if sensible[point.row - 1, point.col - 1]:
                 if self._collector is not None:
                     self._collector.record_decision(
                         state=board_tensor,
@@ -69,18 +63,18 @@ class ACAgent(Agent):
             loss=['categorical_crossentropy', 'mse'],
             loss_weights=[1.0, 0.5],
         )
-        n = experience.states.shape[0]
         num_moves = self._encoder.num_points()
-        policy_target = np.zeros((n, num_moves))
-        value_target = np.zeros((n,))
-        for i in range(n):
-            action = experience.actions[i]
-            policy_target[i][action] = experience.advantages[i]
-            reward = experience.rewards[i]
-            value_target[i] = reward
+        if hasattr(experience, 'batches'):
+            # an ExperienceReader: one pass over minibatches read from disk
+            for batch in experience.batches(batch_size):
+                self._model.train_on_batch(
+                    batch.states,
+                    _training_targets(batch, num_moves),
+                )
+            return
         self._model.fit(
             experience.states,
-            [policy_target, value_target],
+            _training_targets(experience, num_moves),
             batch_size=batch_size,
             epochs=1,
         )
@@ -96,6 +90,18 @@ class ACAgent(Agent):
         )
     
 
+def _training_targets(experience, num_moves):
+    n = experience.states.shape[0]
+    policy_target = np.zeros((n, num_moves))
+    value_target = np.zeros((n,))
+    for i in range(n):
+        action = experience.actions[i]
+        policy_target[i][action] = experience.advantages[i]
+        reward = experience.rewards[i]
+        value_target[i] = reward
+    return [policy_target, value_target]
+
+
 def load_ac_agent(h5file):
     model = kerasutil.load_model_from_hdf5_group(h5file['model'])
     encoder_name = h5file['encoder'].attrs['name']
@@ -1,5 +1,12 @@
+import h5py
 import numpy as np
 
+try:
+    import fcntl
+except ImportError:
+    # no file locking on Windows
+    fcntl = None
+
 
 class ExperienceCollector:
     def __init__(self):
@@ -64,12 +71,170 @@ class ExperienceBuffer:
         self.advantages = advantages
     
     def serialize(self, h5file):
-        h5file.create_group('experience')
-        h5file['experience'].create_dataset('states', data=self.states)
-        h5file['experience'].create_dataset('actions', data=self.actions)
-        h5file['experience'].create_dataset('rewards', data=self.rewards)
-        h5file['experience'].create_dataset('advantages', data=self.advantages)
+        ExperienceWriter(h5file).append(self)
+    
+
+class ExperienceWriter:
+    # Appends experience to h5file in the layout load_experience reads,
+    # one combined batch at a time, so a long self-play run never holds
+    # all of its experience in memory. The datasets are created on the
+    # first append, grow along their first axis and are stored in gzip
+    # compressed chunks of about chunk_bytes of states, with the same
+    # number of rows in the chunks of every dataset.
+    #
+    # States are stored as uint8 when the first batch holds nothing but
+    # whole numbers from 0 to 255, as the planes of all encoders do;
+    # load_experience and ExperienceReader then return uint8 states.
+    names = ('states', 'actions', 'rewards', 'advantages')
+    
+    def __init__(
+            self,
+            h5file,
+            compression='gzip',
+            chunk_bytes=1 << 20):
+        
+        self._group = h5file.require_group('experience')
+        self._compression = compression
+        self._chunk_bytes = chunk_bytes
+        self.num_rows = 0
+        if self.names[0] in self._group:
+            # appending to an existing file
+            self.num_rows = len(self._group[self.names[0]])
+    
+    def _create_datasets(self, arrays):
+        states = arrays[0]
+        if states.dtype != np.uint8 and states.size and \
+                states.min() >= 0 and states.max() <= 255 and \
+                np.array_equal(states, np.round(states)):
+            
+            arrays[0] = states.astype(np.uint8)
+        row_bytes = max(1, arrays[0][0].nbytes)
+        chunk_rows = max(1, self._chunk_bytes // row_bytes)
+        for name, array in zip(self.names, arrays):
+            self._group.create_dataset(
+                name,
+                shape=(0,) + array.shape[1:],
+                maxshape=(None,) + array.shape[1:],
+                dtype=array.dtype,
+                chunks=(chunk_rows,) + array.shape[1:],
+                compression=self._compression,
+            )
+    
+    def append(self, buffer):
+        arrays = [np.asarray(getattr(buffer, name)) for name in self.names]
+        num_rows = len(arrays[0])
+        if num_rows == 0:
+            return
+        if self.names[0] not in self._group:
+            self._create_datasets(arrays)
+        states = self._group[self.names[0]]
+        if states.dtype == np.uint8 and arrays[0].dtype != np.uint8:
+            planes = arrays[0].astype(np.uint8)
+            if not np.array_equal(planes, arrays[0]):
+                raise ValueError('states do not fit in uint8 planes')
+            arrays[0] = planes
+        for name, array in zip(self.names, arrays):
+            dataset = self._group[name]
+            dataset.resize(self.num_rows + num_rows, axis=0)
+            dataset[self.num_rows:] = array
+        self.num_rows += num_rows
+        self._group.file.flush()
+
+
+def append_experience(
+        path,
+        buffer,
+        writer_class=None):
     
+    # Appends buffer to the experience file at path, creating it if
+    # needed. An exclusive lock on path + '.lock' lets any number of
+    # processes, self-play runs on other machines sharing the file system
+    # included, append to the same file one after another. HDF5 itself
+    # does not allow two processes to write one file at once.
+    if writer_class is None:
+        writer_class = ExperienceWriter
+    with open(path + '.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with h5py.File(path, 'a') as h5file:
+                writer = writer_class(h5file)
+                writer.append(buffer)
+                return writer.num_rows
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ExperienceReader:
+    # Shuffled minibatches read straight from one or more experience
+    # files, for experience that does not fit in memory. Each epoch
+    # visits windows of window_size consecutive rows in a random order,
+    # reads a window at a time and shuffles within it, so memory holds
+    # about one window. Rows left over at the end of a window are
+    # carried into the next one, so all batches but the last are full.
+    # Windows start at multiples of window_size; a multiple of the
+    # writer's chunk rows decompresses every chunk once.
+    #
+    # Agents' train() methods accept a reader in place of an
+    # ExperienceBuffer.
+    names = ('states', 'actions', 'rewards', 'advantages')
+    buffer_class = ExperienceBuffer
+    
+    def __init__(
+            self,
+            h5files,
+            window_size=65536,
+            seed=None):
+        
+        if not isinstance(h5files, (list, tuple)):
+            h5files = [h5files]
+        self._groups = [h5file['experience'] for h5file in h5files]
+        self.window_size = window_size
+        self._rng = np.random.RandomState(seed)
+        self.num_rows = sum(
+            len(group[self.names[0]]) for group in self._groups
+        )
+    
+    def __len__(self):
+        return self.num_rows
+    
+    def windows(self):
+        windows = []
+        for group in self._groups:
+            num_rows = len(group[self.names[0]])
+            for start in range(0, num_rows, self.window_size):
+                end = min(start + self.window_size, num_rows)
+                windows.append((group, start, end))
+        order = self._rng.permutation(len(windows))
+        return [windows[i] for i in order]
+    
+    def batches(self, batch_size):
+        # one epoch of buffer_class minibatches
+        leftover = None
+        for group, start, end in self.windows():
+            arrays = [group[name][start:end] for name in self.names]
+            if leftover is not None:
+                arrays = [
+                    np.concatenate([rest, array])
+                    for rest, array in zip(leftover, arrays)
+                ]
+                leftover = None
+            num_rows = len(arrays[0])
+            order = self._rng.permutation(num_rows)
+            num_full = num_rows - num_rows % batch_size
+            for i in range(0, num_full, batch_size):
+                yield self._buffer(arrays, order[i:i + batch_size])
+            if num_full < num_rows:
+                leftover = [array[order[num_full:]] for array in arrays]
+        if leftover is not None:
+            yield self._buffer(leftover, np.arange(len(leftover[0])))
+    
+    def _buffer(self, arrays, rows):
+        return self.buffer_class(**dict(
+            (name, array[rows]) for name, array in zip(self.names, arrays)
+        ))
+
 
 def combine_experience(collectors):
     combined_states = np.concatenate(
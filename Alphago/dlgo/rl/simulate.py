@@ -1,18 +1,42 @@
+import functools
+import math
+import multiprocessing
+import os
+import random
+import time
 from collections import namedtuple
 
+import h5py
+import numpy as np
+
 from dlgo import rl
 from dlgo import scoring
 from dlgo import goboard_fast as goboard
 from dlgo.gotypes import Player
 
+__all__ = [
+    'GameRecord',
+    'SimulationResult',
+    'agent_loader',
+    'experience_simulation',
+    'simulate_game',
+    'simulate_games',
+    'win_rate_interval',
+]
+
 
 class GameRecord(namedtuple('GameRecord', 'moves winner')):
     pass
 
 
-def simulate_game(black_player, white_player):
+def simulate_game(
+        black_player,
+        white_player,
+        board_size=19,
+        verbose=True):
+    
     moves = []
-    game = goboard.GameState.new_game(19)
+    game = goboard.GameState.new_game(board_size)
     agents = {
         Player.black: black_player,
         Player.white: white_player,
@@ -21,17 +45,27 @@ def simulate_game(black_player, white_player):
         next_move = agents[game.next_player].select_move(game)
         moves.append(next_move)
         game = game.apply_move(next_move)
-    
-    game_result = scoring.compute_game_result(game)
-    print(game_result)
+
+    if game.last_move.is_resign:
+        winner = game.next_player
+    else:
+        game_result = scoring.compute_game_result(game)
+        winner = game_result.winner
+        if verbose:
+            print(game_result)
 
     return GameRecord(
         moves=moves,
-        winner=game_result.winner,
+        winner=winner,
     )
 
 
-def experience_simulation(num_games, agent1, agent2):
+def experience_simulation(
+        num_games,
+        agent1,
+        agent2,
+        board_size=19):
+    
     collector1 = rl.ExperienceCollector()
     collector2 = rl.ExperienceCollector()
 
@@ -45,9 +79,9 @@ def experience_simulation(num_games, agent1, agent2):
         if color1 == Player.black:
             black_player, white_player = agent1, agent2
         else:
-            white_player, black_player = agent2, agent1
+            white_player, black_player = agent1, agent2
 
-        game_record = simulate_game(black_player, white_player)
+        game_record = simulate_game(black_player, white_player, board_size)
         if game_record.winner == color1:
             collector1.complete_episode(reward=1)
             collector2.complete_episode(reward=-1)
@@ -55,5 +89,203 @@ def experience_simulation(num_games, agent1, agent2):
             collector2.complete_episode(reward=1)
             collector1.complete_episode(reward=-1)
         color1 = color1.other
+
+    return rl.combine_experience([collector1, collector2])
+
+
+def win_rate_interval(wins, num_games, z=1.96):
+    # Wilson score interval of the win rate; z=1.96 for 95%. Unlike
+    # p +- z * sqrt(p(1-p)/n) it stays inside [0, 1] and is usable for
+    # the small and lopsided samples of a quick evaluation.
+    if num_games == 0:
+        return 0.0, 1.0
+    p = float(wins) / num_games
+    denominator = 1 + z * z / num_games
+    center = (p + z * z / (2 * num_games)) / denominator
+    margin = z * math.sqrt(
+        p * (1 - p) / num_games + z * z / (4 * num_games * num_games)
+    ) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class SimulationResult(
+        namedtuple('SimulationResult', 'num_games wins num_moves elapsed')):
+    # wins are agent1's
+    def win_rate(self):
+        if self.num_games == 0:
+            return 0.0
+        return float(self.wins) / self.num_games
+    
+    def interval(self, z=1.96):
+        return win_rate_interval(self.wins, self.num_games, z)
+    
+    def games_per_sec(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.num_games / self.elapsed
+    
+    def report(self):
+        low, high = self.interval()
+        return (
+            'agent1 won %d/%d (%.1f%%, 95%% CI %.1f-%.1f%%), '
+            '%.2f games/sec, %.1f moves/game' % (
+                self.wins,
+                self.num_games,
+                100 * self.win_rate(),
+                100 * low,
+                100 * high,
+                self.games_per_sec(),
+                float(self.num_moves) / max(self.num_games, 1),
+            )
+        )
+
+
+def _load_agent_file(load_agent, filename, kwargs):
+    with h5py.File(filename, 'r') as h5file:
+        return load_agent(h5file, **kwargs)
+
+
+def agent_loader(load_agent, filename, **kwargs):
+    # A picklable function that reads an agent from an HDF5 file, e.g.
+    # agent_loader(dlgo.agent.load_policy_agent, 'bot.h5'), for the
+    # worker processes of simulate_games
+    return functools.partial(_load_agent_file, load_agent, filename, kwargs)
+
+
+# agents of a simulate_games worker, created once per process
+_worker_agents = None
+
+
+def _init_worker(make_agent1, make_agent2):
+    global _worker_agents
+    # forked workers start with the parent's random state, and would all
+    # play the same games
+    seed = int.from_bytes(os.urandom(4), 'little')
+    random.seed(seed)
+    np.random.seed(seed)
+    if make_agent2 is None:
+        # self-play: two copies, so each keeps its own collector
+        make_agent2 = make_agent1
+    _worker_agents = (make_agent1(), make_agent2())
+
+
+def _play_game(task):
+    game_index, agent1_black, board_size, collector_class, combine = task
+    agent1, agent2 = _worker_agents
+    if agent1_black:
+        black_player, white_player = agent1, agent2
+    else:
+        black_player, white_player = agent2, agent1
+    collectors = []
+    if collector_class is not None:
+        collectors = [collector_class(), collector_class()]
+        for player, collector in zip((agent1, agent2), collectors):
+            collector.begin_episode()
+            player.set_collector(collector)
+
+    game_record = simulate_game(
+        black_player,
+        white_player,
+        board_size,
+        verbose=False,
+    )
+    agent1_color = Player.black if agent1_black else Player.white
+    agent1_won = game_record.winner == agent1_color
+
+    experience = None
+    if collectors:
+        collectors[0].complete_episode(reward=1 if agent1_won else -1)
+        collectors[1].complete_episode(reward=-1 if agent1_won else 1)
+        # send back a few arrays rather than lists of per-move arrays
+        collectors = [c for c in collectors if len(c.states) > 0]
+        if collectors:
+            experience = combine(collectors)
+    return game_index, agent1_won, len(game_record.moves), experience
+
+
+def simulate_games(
+        num_games,
+        make_agent1,
+        make_agent2=None,
+        board_size=19,
+        num_workers=None,
+        collector_class=None,
+        combine=rl.combine_experience,
+        writer=None,
+        flush_every=16,
+        report_every=10):
     
-    return rl.combine_experience([collector1, collector2])
\ No newline at end of file
+    # Plays num_games games of agent1 against agent2 on a process pool,
+    # agent1 taking black in the even games. make_agent1 / make_agent2
+    # are picklable functions returning an agent (see agent_loader);
+    # each worker calls them once and plays all its games with those
+    # agents. Without make_agent2, agent1 plays a copy of itself.
+    #
+    # With a collector_class (rl.ExperienceCollector,
+    # zero.ZeroExperienceCollector) both agents record their decisions,
+    # rewarded +1 / -1 by the result. Workers return each game's
+    # experience as one buffer built by combine; the parent merges those
+    # with combine as well and appends them to writer (an
+    # rl.ExperienceWriter) every flush_every games, so memory holds no
+    # more than that many games of experience. Nothing is collected
+    # without a writer.
+    #
+    # num_workers=0 plays in this process. Returns a SimulationResult.
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    if writer is None:
+        collector_class = None
+    tasks = [
+        (i, i % 2 == 0, board_size, collector_class, combine)
+        for i in range(num_games)
+    ]
+
+    start = time.time()
+    pool = None
+    if num_workers > 0:
+        pool = multiprocessing.Pool(
+            num_workers,
+            initializer=_init_worker,
+            initargs=(make_agent1, make_agent2),
+        )
+        results = pool.imap_unordered(_play_game, tasks)
+    else:
+        _init_worker(make_agent1, make_agent2)
+        results = (_play_game(task) for task in tasks)
+
+    wins = 0
+    num_moves = 0
+    num_played = 0
+    pending = []
+    try:
+        for _, agent1_won, game_moves, experience in results:
+            num_played += 1
+            wins += agent1_won
+            num_moves += game_moves
+            if experience is not None:
+                pending.append(experience)
+            if pending and (
+                    len(pending) >= flush_every or num_played == num_games):
+                
+                writer.append(combine(pending))
+                pending = []
+            if report_every and (
+                    num_played % report_every == 0 or num_played == num_games):
+                
+                progress = SimulationResult(
+                    num_played,
+                    wins,
+                    num_moves,
+                    time.time() - start,
+                )
+                print('%d/%d games: %s' % (
+                    num_played,
+                    num_games,
+                    progress.report(),
+                ))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return SimulationResult(num_played, wins, num_moves, time.time() - start)
\ No newline at end of file
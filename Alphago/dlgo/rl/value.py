@@ -34,6 +34,11 @@ class ValueAgent(Agent):
             raise ValueError(policy)
         self._policy = policy
     
+    def predict(self, game_state):
+        encoded_state = self._encoder.encode(game_state)
+        input_tensor = np.array([encoded_state])
+        return self._model.predict(input_tensor)[0][0]
+    
     def select_move(self, game_state):
         moves = []
         board_tensors = []
@@ -1,17 +1,38 @@
 from __future__ import absolute_import
 from collections import namedtuple
 
+import numpy as np
+
 from dlgo.gotypes import Player, Point
 
+__all__ = [
+    'GameResult',
+    'Territory',
+    'color_plane',
+    'compute_game_result',
+    'decided_winner',
+    'evaluate_territory',
+    'label_regions',
+    'pass_alive',
+]
+
+# point contents in the padded color planes, as in dlgo.movemasks
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
 
 class Territory(object):
-    def __init__(self, territory_map):
+    def __init__(self, territory_map=None):
         self.num_black_territory = 0
         self.num_white_territory = 0
         self.num_black_stones = 0
         self.num_white_stones = 0
         self.num_dame = 0
         self.dame_points = []
+        if territory_map is None:
+            return
         for point, status in territory_map.items():
             if status == Player.black:
                 self.num_black_stones += 1
@@ -45,64 +66,265 @@ class GameResult(namedtuple('gameResult', 'b w komi')):
         return 'W+%.1f' % (w - self.b,)
 
 
-def _collect_region(
-        start_pos,
-        board,
-        visited=None):
-    
-    if visited is None:
-        visited = {}
-    if start_pos in visited:
-        return [], set()
-    all_points = [start_pos]
-    all_borders = set()
-    visited[start_pos] = True
-    here = board.get(start_pos)
-    deltas = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    for delta_r, delta_c in deltas:
-        next_p = Point(
-            row=start_pos.row + delta_r,
-            col=start_pos.col + delta_c
-        )
-        if not board.is_on_grid(next_p):
-            continue
-        neighbor = board.get(next_p)
-        if neighbor == here:
-            points, borders = _collect_region(next_p, board, visited)
-            all_points += points
-            all_borders |= borders
-        else:
-            all_borders.add(neighbor)
-    return all_points, all_borders
-
-
-def evaluate_territory(board):
-    status = {}
+def color_plane(board):
+    # (rows + 2, cols + 2) int8 plane of EMPTY / BLACK / WHITE with a
+    # BORDER ring
+    if hasattr(board, 'color_plane'):
+        return board.color_plane()
+    if hasattr(board, 'padded_planes'):
+        return board.padded_planes()[0]
+    colors = np.full(
+        (board.num_rows + 2, board.num_cols + 2),
+        BORDER,
+        dtype=np.int8,
+    )
+    colors[1:-1, 1:-1] = EMPTY
     for r in range(1, board.num_rows + 1):
         for c in range(1, board.num_cols + 1):
-            p = Point(row=r, col=c)
-            if p in status:
-                continue
-            stone = board.get(p)
+            stone = board.get(Point(row=r, col=c))
             if stone is not None:
-                status[p] = board.get(p)
-            else:
-                group, neighbors = _collect_region(p, board)
-                if len(neighbors) == 1:
-                    neighbors_stone = neighbors.pop()
-                    stone_str = 'b' if neighbors_stone == Player.black else 'w'
-                    fill_with = 'terrtory_' + stone_str
-                else:
-                    fill_with = 'dame'
-                for pos in group:
-                    status[pos] = fill_with
-    return Territory(status)
-
-
-def compute_game_result(game_state):
-    territory = evaluate_territory(game_state.board)
+                colors[r, c] = stone.value
+    return colors
+
+
+def _neighbors(plane):
+    return (
+        plane[:-2, 1:-1],
+        plane[2:, 1:-1],
+        plane[1:-1, :-2],
+        plane[1:-1, 2:],
+    )
+
+
+_ndimage = None
+
+
+def _scipy_label(mask):
+    global _ndimage
+    if _ndimage is None:
+        try:
+            from scipy import ndimage
+        except ImportError:
+            ndimage = False
+        _ndimage = ndimage
+    if not _ndimage:
+        return None
+    # the default structure connects the 4 neighbors of a point
+    return _ndimage.label(mask)
+
+
+def _union_find_label(mask):
+    # one raster scan joining every point to its left and upper
+    # neighbor, with path halving; no recursion, however large the region
+    rows, cols = mask.shape
+    inside = mask.ravel().tolist()
+    parent = list(range(rows * cols))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(rows * cols):
+        if not inside[i]:
+            continue
+        if i % cols and inside[i - 1]:
+            parent[find(i)] = find(i - 1)
+        if i >= cols and inside[i - cols]:
+            root, other = find(i), find(i - cols)
+            if root != other:
+                parent[root] = other
+    points = np.flatnonzero(mask)
+    labels = np.zeros(rows * cols, dtype=np.int32)
+    if len(points) == 0:
+        return labels.reshape(mask.shape), 0
+    roots = np.array([find(i) for i in points.tolist()])
+    _, region = np.unique(roots, return_inverse=True)
+    labels[points] = region.ravel() + 1
+    return labels.reshape(mask.shape), int(region.max()) + 1
+
+
+def label_regions(mask, use_scipy=True):
+    # 4-connected components of a bool plane: (labels, num_labels) with
+    # labels 1 .. num_labels inside the mask and 0 outside, like
+    # scipy.ndimage.label, which is used when it is installed
+    if use_scipy:
+        labelled = _scipy_label(mask)
+        if labelled is not None:
+            return labelled
+    return _union_find_label(mask)
+
+
+def _region_owners(colors):
+    # label the empty regions of a padded color plane, and find the
+    # regions that touch only black / only white stones
+    empty = colors[1:-1, 1:-1] == EMPTY
+    labels, num_labels = label_regions(empty)
+    touches = np.zeros((3, num_labels + 1), dtype=bool)
+    for neighbor in _neighbors(colors):
+        for color in (BLACK, WHITE):
+            touches[color][labels[neighbor == color]] = True
+    # label 0 is not a region, just every stone next to a stone
+    touches[:, 0] = False
+    black = (touches[BLACK] & ~touches[WHITE])[labels]
+    white = (touches[WHITE] & ~touches[BLACK])[labels]
+    return empty, black, white
+
+
+def _pass_alive(colors, color):
+    # Benson's algorithm for one color of a padded color plane. Blocks
+    # are the strings of that color, regions the connected sets of the
+    # other points. A region is vital to a block when all of its empty
+    # points are liberties of the block. Blocks with fewer than two
+    # vital regions are dropped, along with the regions around them,
+    # until nothing changes; the blocks that remain can never be
+    # captured, even if their owner passes every turn.
+    inner = colors[1:-1, 1:-1]
+    blocks, num_blocks = label_regions(inner == color)
+    regions, num_regions = label_regions(inner != color)
+    if num_blocks == 0:
+        nothing = np.zeros(inner.shape, dtype=bool)
+        return nothing, nothing
+    padded_blocks = np.pad(blocks, 1, mode='constant')
+    empty = inner == EMPTY
+    region_points = np.bincount(
+        regions[empty],
+        minlength=num_regions + 1,
+    )
+
+    # (region, block) pairs of every region point next to a block, and
+    # (empty point, block) pairs of the liberties of every block
+    borders = set()
+    liberties = set()
+    point_index = np.arange(inner.size).reshape(inner.shape)
+    for neighbor in _neighbors(padded_blocks):
+        touching = (neighbor > 0) & (regions > 0)
+        borders.update(zip(
+            regions[touching].tolist(),
+            neighbor[touching].tolist(),
+        ))
+        touching &= empty
+        liberties.update(zip(
+            point_index[touching].tolist(),
+            neighbor[touching].tolist(),
+        ))
+    flat_regions = regions.ravel()
+    liberty_count = {}
+    for point, block in liberties:
+        key = (int(flat_regions[point]), block)
+        liberty_count[key] = liberty_count.get(key, 0) + 1
+    vital = set(
+        key for key, count in liberty_count.items()
+        if count == region_points[key[0]]
+    )
+    region_blocks = {}
+    for region, block in borders:
+        region_blocks.setdefault(region, set()).add(block)
+
+    alive = set(range(1, num_blocks + 1))
+    while True:
+        healthy = set(
+            region for region, around in region_blocks.items()
+            if around <= alive
+        )
+        num_vital = dict((block, 0) for block in alive)
+        for region, block in vital:
+            if region in healthy and block in alive:
+                num_vital[block] += 1
+        dead = set(block for block, count in num_vital.items() if count < 2)
+        if not dead:
+            break
+        alive -= dead
+
+    alive_stones = np.isin(blocks, sorted(alive))
+    # regions vital to a block that survived, and bordered only by such
+    # blocks: the opponent can never make an eye there, and any stones
+    # the opponent has there can be captured
+    territory_regions = set(
+        region for region, block in vital
+        if block in alive and region_blocks[region] <= alive
+    )
+    territory = np.isin(regions, sorted(territory_regions))
+    return alive_stones, territory
+
+
+def pass_alive(board, color=None):
+    # (alive_stones, territory) bool planes of board.num_rows x
+    # board.num_cols for color, a Player: its unconditionally alive
+    # stones and the regions they secure. color=None returns a dict with
+    # the planes of both players.
+    colors = color_plane(board)
+    if color is None:
+        return dict(
+            (player, _pass_alive(colors, player.value))
+            for player in (Player.black, Player.white)
+        )
+    return _pass_alive(colors, color.value)
+
+
+def _settle(colors):
+    # removes the stones inside either player's pass-alive territory,
+    # which can always be captured; returns the new plane and the
+    # number of points each player can no longer lose
+    colors = colors.copy()
+    inner = colors[1:-1, 1:-1]
+    settled = {}
+    planes = [_pass_alive(colors, player.value) for player in Player]
+    for player, (alive_stones, territory) in zip(Player, planes):
+        inner[territory] = EMPTY
+        settled[player] = int(alive_stones.sum() + territory.sum())
+    return colors, settled
+
+
+def evaluate_territory(board, pass_alive=False):
+    # Stones plus the empty regions that touch stones of one color
+    # only; every region is labelled in one pass over the board. With
+    # pass_alive=True, stones inside the other player's pass-alive
+    # territory are dead and their points count for that player.
+    colors = color_plane(board)
+    if pass_alive:
+        colors, _ = _settle(colors)
+    empty, black, white = _region_owners(colors)
+    inner = colors[1:-1, 1:-1]
+    territory = Territory()
+    territory.num_black_stones = int(np.count_nonzero(inner == BLACK))
+    territory.num_white_stones = int(np.count_nonzero(inner == WHITE))
+    territory.num_black_territory = int(np.count_nonzero(empty & black))
+    territory.num_white_territory = int(np.count_nonzero(empty & white))
+    dame = empty & ~black & ~white
+    territory.num_dame = int(np.count_nonzero(dame))
+    territory.dame_points = [
+        Point(row=r + 1, col=c + 1)
+        for r, c in zip(*np.nonzero(dame))
+    ]
+    return territory
+
+
+def compute_game_result(game_state, pass_alive=False):
+    territory = evaluate_territory(game_state.board, pass_alive)
     return GameResult(
         territory.num_black_territory + territory.num_black_stones,
         territory.num_white_territory + territory.num_white_stones,
         komi=7.5,
-    )
\ No newline at end of file
+    )
+
+
+def decided_winner(board, komi=7.5):
+    # The player certain to win by area with pass-alive territory, or
+    # None; board may also be a padded color plane. Pass-alive stones
+    # and territory only change hands if their owner fills its own eyes,
+    # so once one player's settled points beat
+    # everything the other could still get, further play cannot change
+    # the result and the game can be scored now.
+    if not isinstance(board, np.ndarray):
+        board = color_plane(board)
+    _, settled = _settle(board)
+    num_points = (board.shape[0] - 2) * (board.shape[1] - 2)
+    black_settled = settled[Player.black]
+    white_settled = settled[Player.white]
+    if black_settled > num_points - black_settled + komi:
+        return Player.black
+    if num_points - white_settled <= white_settled + komi:
+        return Player.white
+    return None
\ No newline at end of file
@@ -0,0 +1,312 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.agent.base import Agent
+from dlgo.utils import coords_from_point, point_from_coords
+
+__all__ = [
+    'BotServer',
+    'LatencyStats',
+    'ModelBatcher',
+    'SessionCache',
+    'decode_move',
+    'encode_move',
+]
+
+
+def decode_move(text, goboard=goboard_fast):
+    # 'pass', 'resign' or coordinates like 'D4', as the frontends send them
+    if text == 'pass':
+        return goboard.Move.pass_turn()
+    if text == 'resign':
+        return goboard.Move.resign()
+    return goboard.Move.play(point_from_coords(text))
+
+
+def encode_move(move):
+    if move.is_pass:
+        return 'pass'
+    if move.is_resign:
+        return 'resign'
+    return coords_from_point(move.point)
+
+
+class ModelBatcher():
+    # Stands in for a model shared by agents that run on many threads.
+    # predict() queues its input and waits; one worker thread stacks the
+    # inputs that arrive within max_wait seconds of the first one, up to
+    # max_batch_size rows, into a single model.predict call and hands
+    # every caller its rows of the result. The model is only ever called
+    # from that thread.
+    def __init__(
+            self,
+            model,
+            max_batch_size=64,
+            max_wait=0.005):
+        
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.num_predict_calls = 0
+        self.num_evaluated = 0
+        self._requests = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def predict_async(self, model_input):
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        self._requests.put((np.asarray(model_input), future))
+        return future
+    
+    def predict(self, model_input):
+        return self.predict_async(model_input).result()
+    
+    def _next_batch(self):
+        batch = [self._requests.get()]
+        num_rows = len(batch[0][0])
+        deadline = time.time() + self.max_wait
+        while num_rows < self.max_batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(request)
+            num_rows += len(request[0])
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                outputs = self.model.predict(
+                    np.concatenate([model_input for model_input, _ in batch])
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.num_predict_calls += 1
+            start = 0
+            for model_input, future in batch:
+                end = start + len(model_input)
+                # models with several heads return a list of arrays
+                if isinstance(outputs, (list, tuple)):
+                    future.set_result([output[start:end] for output in outputs])
+                else:
+                    future.set_result(outputs[start:end])
+                start = end
+            self.num_evaluated += start
+    
+    def mean_batch_size(self):
+        if self.num_predict_calls == 0:
+            return 0.0
+        return float(self.num_evaluated) / self.num_predict_calls
+
+
+class SessionCache():
+    # GameStates of running games by game id, so a request that adds a
+    # move or two to a game only plays those instead of the whole game.
+    # Each entry holds the moves the state was built from; a request whose
+    # moves extend them, or take some of them back, starts from the
+    # cached state. The least recently used game is dropped once
+    # max_sessions games are cached.
+    def __init__(
+            self,
+            max_sessions=1024,
+            goboard=goboard_fast):
+        
+        self.max_sessions = max_sessions
+        self.goboard = goboard
+        self.hits = 0
+        self.lookups = 0
+        self.moves_applied = 0
+        self._sessions = collections.OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._sessions)
+    
+    def game_state(
+            self,
+            game_id,
+            board_size,
+            moves):
+        
+        moves = list(moves)
+        with self._lock:
+            self.lookups += 1
+            entry = self._sessions.get(game_id)
+            if entry is not None:
+                self._sessions.move_to_end(game_id)
+        game_state = None
+        num_known = 0
+        if entry is not None and entry[0] == board_size:
+            _, known_moves, known_state = entry
+            common = len(known_moves)
+            if len(moves) < common:
+                common = len(moves)
+            if known_moves[:common] == moves[:common]:
+                # walk back over moves the client took back
+                game_state = known_state
+                for _ in range(len(known_moves) - common):
+                    game_state = game_state.previous_state
+                num_known = common
+        if game_state is None:
+            game_state = self.goboard.GameState.new_game(board_size)
+        else:
+            with self._lock:
+                self.hits += 1
+        for move in moves[num_known:]:
+            game_state = game_state.apply_move(
+                decode_move(move, self.goboard)
+            )
+        with self._lock:
+            self.moves_applied += len(moves) - num_known
+        if game_id is not None:
+            self.put(game_id, board_size, moves, game_state)
+        return game_state
+    
+    def put(
+            self,
+            game_id,
+            board_size,
+            moves,
+            game_state):
+        
+        with self._lock:
+            self._sessions[game_id] = (board_size, list(moves), game_state)
+            self._sessions.move_to_end(game_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+    
+    def hit_rate(self):
+        if self.lookups == 0:
+            return 0.0
+        return float(self.hits) / self.lookups
+
+
+class LatencyStats():
+    # Latencies of the last window requests, thread safe
+    def __init__(self, window=10000):
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+    
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.count += 1
+    
+    def percentiles(self, qs=(50, 90, 99)):
+        # milliseconds, keyed 'p50' etc.
+        with self._lock:
+            latencies = np.array(self._latencies)
+        report = {'count': self.count}
+        for q in qs:
+            report['p%d' % q] = (
+                1000 * float(np.percentile(latencies, q))
+                if len(latencies) else None
+            )
+        return report
+
+
+class BotServer():
+    # Serves the moves of the bots in bot_map to many games at once.
+    # bot_map values are Agents, which are shared by all request threads,
+    # or functions returning a new Agent, which are called once per
+    # thread for agents that keep search state between calls. Agents whose
+    # models are wrapped in one ModelBatcher have the network evaluations
+    # of concurrent requests batched together.
+    def __init__(
+            self,
+            bot_map,
+            max_sessions=1024,
+            max_workers=16,
+            goboard=goboard_fast):
+        
+        self.bot_map = bot_map
+        self.sessions = SessionCache(max_sessions, goboard)
+        self.latencies = dict(
+            (bot_name, LatencyStats()) for bot_name in bot_map
+        )
+        self.max_workers = max_workers
+        self._executor = None
+        self._local = threading.local()
+    
+    def agent(self, bot_name):
+        bot = self.bot_map[bot_name]
+        if isinstance(bot, Agent):
+            return bot
+        agents = self._local.__dict__.setdefault('agents', {})
+        if bot_name not in agents:
+            agents[bot_name] = bot()
+        return agents[bot_name]
+    
+    def select_move(
+            self,
+            bot_name,
+            board_size,
+            moves,
+            game_id=None):
+        
+        # returns the bot's move and its diagnostics
+        start = time.time()
+        game_state = self.sessions.game_state(game_id, board_size, moves)
+        bot_agent = self.agent(bot_name)
+        bot_move = bot_agent.select_move(game_state)
+        if game_id is not None:
+            # the next request will most likely be this plus one move
+            self.sessions.put(
+                game_id,
+                board_size,
+                list(moves) + [encode_move(bot_move)],
+                game_state.apply_move(bot_move),
+            )
+        self.latencies[bot_name].record(time.time() - start)
+        return bot_move, bot_agent.diagnostics()
+    
+    def select_move_async(
+            self,
+            bot_name,
+            board_size,
+            moves,
+            game_id=None):
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor.submit(
+            self.select_move,
+            bot_name,
+            board_size,
+            moves,
+            game_id,
+        )
+    
+    def stats(self):
+        return {
+            'latency_ms': dict(
+                (bot_name, stats.percentiles())
+                for bot_name, stats in self.latencies.items()
+            ),
+            'sessions': len(self.sessions),
+            'session_hit_rate': self.sessions.hit_rate(),
+        }
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
\ No newline at end of file
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+__all__ = [
+    'TranspositionTable',
+    'follow_moves',
+    'situation_key',
+]
+
+
+def situation_key(game_state):
+    # The stones and the player to move, plus what else decides the
+    # moves from here: whether the last move was a pass (a second one
+    # ends the game), whether the game is over, and the situations
+    # played before, which superko forbids repeating. Positions reached
+    # by different move orders only share a key when they went through
+    # the same situations. Needs a board with a zobrist hash
+    # (goboard_fast or goboard_array).
+    board = game_state.board
+    last_move = game_state.last_move
+    history = game_state.previous_states
+    return (
+        board.num_rows,
+        board.num_cols,
+        game_state.next_player,
+        board.zobrist_hash(),
+        last_move is not None and last_move.is_pass,
+        game_state.is_over(),
+        history.key if hasattr(history, 'key') else hash(history),
+    )
+
+
+def follow_moves(
+        node,
+        node_key,
+        game_state,
+        max_moves=2):
+
+    # the node under a search tree root (node, with situation node_key)
+    # for game_state, walking the moves played since, e.g. our move and
+    # the opponent's reply. None if game_state doesn't continue from the
+    # root within max_moves or the tree never got that far.
+    moves = []
+    state = game_state
+    while state is not None and len(moves) <= max_moves:
+        if situation_key(state) == node_key:
+            for move in reversed(moves):
+                if not node.has_child(move):
+                    return None
+                node = node.get_child(move)
+            return node
+        moves.append(state.last_move)
+        state = state.previous_state
+    return None
+
+
+class TranspositionTable():
+    # LRU bounded map from situation keys to search tree nodes (or any
+    # other per situation entry), so that searches can share what they
+    # found for a situation however they got there.
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.lookups = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        self.lookups += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+    
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def items(self):
+        # (key, entry) pairs, least recently used first
+        return list(self._entries.items())
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def hit_rate(self):
+        if self.lookups == 0:
+            return 0.0
+        return float(self.hits) / self.lookups
\ No newline at end of file
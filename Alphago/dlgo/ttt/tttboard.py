@@ -1,4 +1,5 @@
 import copy
+import random
 
 from dlgo.ttt.ttttypes import Player, Point
 
@@ -20,15 +21,34 @@ COLS = tuple(range(1, BOARD_SIZE + 1))
 DIAG_1 = (Point(1, 1), Point(2, 2), Point(3, 3))
 DIAG_2 = (Point(1, 3), Point(2, 2), Point(3, 1))
 
+# zobrist codes, as dlgo.zobrist has them for go; a fixed seed keeps
+# hashes the same from run to run
+_zobrist_random = random.Random(3)
+HASH_CODE = dict(
+    ((Point(row, col), player), _zobrist_random.randint(0, 2 ** 63 - 1))
+    for row in ROWS
+    for col in COLS
+    for player in (Player.x, Player.o)
+)
+
 
 class Board:
     def __init__(self):
         self._grid = {}
+        self._hash = 0
     
     def place(self, player, point):
         assert self.is_on_grid(point)
         assert self._grid.get(point) is None
         self._grid[point] = player
+        self._hash ^= HASH_CODE[point, player]
+    
+    def remove(self, point):
+        player = self._grid.pop(point)
+        self._hash ^= HASH_CODE[point, player]
+    
+    def zobrist_hash(self):
+        return self._hash
     
     @staticmethod
     def is_on_grid(point):
@@ -43,6 +63,12 @@ class Move:
     def __init__(self, point):
         self.point = point
     
+    def __hash__(self):
+        return hash(self.point)
+    
+    def __eq__(self, other):
+        return isinstance(other, Move) and self.point == other.point
+    
 
 class GameState:
     def __init__(
@@ -54,6 +80,7 @@ class GameState:
         self.board = board
         self.next_player = next_player
         self.last_move = move
+        self._undo_stack = []
     
     def _has_3_in_a_row(self, player):
         for col in COLS:
@@ -87,6 +114,32 @@ class GameState:
             move,
         )
     
+    def copy(self):
+        # same position with a private board, to push / pop moves on
+        return GameState(
+            copy.deepcopy(self.board),
+            self.next_player,
+            self.last_move,
+        )
+    
+    def push(self, move):
+        # play move on this state in place; pop() takes it back
+        self.board.place(self.next_player, move.point)
+        self._undo_stack.append(self.last_move)
+        self.next_player = self.next_player.other
+        self.last_move = move
+    
+    def pop(self):
+        move = self.last_move
+        self.board.remove(move.point)
+        self.last_move = self._undo_stack.pop()
+        self.next_player = self.next_player.other
+        return move
+    
+    @property
+    def depth(self):
+        return len(self._undo_stack)
+    
     @classmethod
     def new_game(cls):
         board = Board()
@@ -95,7 +148,7 @@ class GameState:
     def is_valid_move(self, move):
         return (
             self.board.get(move.point) is None and
-            not self.is_ober()
+            not self.is_over()
         )
     
     def legal_moves(self):
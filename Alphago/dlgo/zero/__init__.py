@@ -1,3 +1,5 @@
 from .experience import *
 from .encoder import *
-from .agent import *
\ No newline at end of file
+from .agent import *
+from .arraytree import *
+from .batcher import *
\ No newline at end of file
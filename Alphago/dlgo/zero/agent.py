@@ -1,7 +1,12 @@
 import numpy as np
 from keras import optimizers    # SGD
 
+from dlgo import kerasutil
+from dlgo import movemasks
+from dlgo.transposition import follow_moves, situation_key
 from ..agent import Agent
+from .arraytree import ArrayTree
+from .encoder import ZeroEncoder
 
 
 class Branch:
@@ -25,26 +30,44 @@ class ZeroTreeNode:
         self.parent = parent
         self.last_move = last_move
         self.total_visit_count = 1
+        # priors only hold the moves that are legal in state
         self.branches = {}
         for move, p in priors.items():
-            if state.is_valid_move(move):
-                self.branches[move] = Branch(p)
+            self.branches[move] = Branch(p)
         self.children = {}
     
     def moves(self):
         return self.branches.keys()
     
+    def is_terminal(self):
+        return not self.branches
+    
     def add_child(self, move, child_node):
         self.children[move] = child_node
     
     def has_child(self, move):
         return move in self.children
     
+    def get_child(self, move):
+        return self.children[move]
+    
     def record_visit(self, move, value):
         self.total_visit_count += 1
         self.branches[move].visit_count += 1
         self.branches[move].total_value += value
     
+    def add_virtual_loss(self, move, virtual_loss):
+        # counts a pending visit as a loss, so that other leaves gathered
+        # for the same batch are steered away from this branch
+        self.total_visit_count += 1
+        self.branches[move].visit_count += 1
+        self.branches[move].total_value -= virtual_loss
+    
+    def remove_virtual_loss(self, move, virtual_loss):
+        self.total_visit_count -= 1
+        self.branches[move].visit_count -= 1
+        self.branches[move].total_value += virtual_loss
+    
     def expected_value(self, move):
         branch = self.branches[move]
         if branch.visit_count == 0:
@@ -57,7 +80,7 @@ class ZeroTreeNode:
     def visit_count(self, move):
         if move in self.branches:
             return self.branches[move].visit_count
-        
+
         return 0
 
 
@@ -67,33 +90,108 @@ class ZeroAgent(Agent):
             model,
             encoder,
             rounds_per_move=1600,
-            c=2.0):
+            c=2.0,
+            mutable_search=False,
+            leaf_batch_size=1,
+            virtual_loss=1.0,
+            batcher=None,
+            reuse_tree=False,
+            transposition_table=None,
+            array_tree=False):
         
         self._model = model
         self._encoder = encoder
         self._collector = None
         self._num_rounds = rounds_per_move
         self._c = c
+        # walk the tree by pushing / popping moves on one private game
+        # state; tree nodes then hold no state of their own. Needs a
+        # board with undo support (goboard_fast or goboard_array).
+        self._mutable_search = mutable_search
+        # leaf parallel search: gather up to leaf_batch_size leaves under
+        # virtual loss and evaluate them with a single predict call
+        self._leaf_batch_size = leaf_batch_size
+        self._virtual_loss = virtual_loss
+        # a shared InferenceBatcher evaluates the leaves instead of
+        # calling the model directly
+        self._batcher = batcher
+        # keep the last search tree and start the next search from its
+        # node for the new position, after our move and the reply
+        self._reuse_tree = reuse_tree
+        self._last_root = None
+        self._last_root_key = None
+        # a TranspositionTable shares one node between all the ways a
+        # situation (see situation_key) is reached, within a search and
+        # across moves
+        self._transpositions = transposition_table
+        self.reuse_lookups = 0
+        self.reuse_hits = 0
+        # keep the tree in an ArrayTree instead of ZeroTreeNode objects
+        self._array_tree = array_tree
+        self._tree = None
+        self._all_moves = None
+    
+    def set_collector(self, collector):
+        self._collector = collector
+    
+    def reuse_hit_rate(self):
+        # share of searches that started from an existing root node
+        if self.reuse_lookups == 0:
+            return 0.0
+        return float(self.reuse_hits) / self.reuse_lookups
     
     def select_move(self, game_state):
-        root = self.create_node(game_state)
-        for i in range(self._num_rounds):
-            node = root
-            next_move = self.select_branch(node)
-            while node.has_child(next_move):
-                node = node.get_child(next_move)
-                next_move = self.select_branch(next_move)
-            new_state = node.state.apply_move(next_move)
-            child_node = self.create_node(new_state, parent=node)
-            move = next_move
-            value = -1 * child_node.value
-            while node is not None:
-                node.record_visit(move, value)
-                move = node.last_move
-                node = node.parent
-                value -1 * value
+        search = self.search(game_state)
+        if self._batcher is not None:
+            return self._batcher.run([search])[0]
+        try:
+            request = next(search)
+            while True:
+                priors, values = self._model.predict(np.array(request))
+                request = search.send((priors, values))
+        except StopIteration as stop:
+            return stop.value
+    
+    def search(self, game_state):
+        # generator running one move's search. It yields the list of state
+        # tensors it needs evaluated, expects (priors, values) for them
+        # back through send(), and returns the selected move. This lets an
+        # InferenceBatcher step many searches at once.
+        state_tensor = None
+        root = self.reuse_root(game_state)
+        if root is None:
+            state_tensor, valid_moves = self.leaf_input(game_state)
+            priors, values = yield [state_tensor]
+            root = self.add_node(
+                game_state,
+                valid_moves,
+                priors[0],
+                values[0][0],
+                None,
+                None,
+            )
+            if self._transpositions is not None:
+                self._transpositions.put(situation_key(game_state), root)
+        search_state = None
+        if self._mutable_search:
+            search_state = game_state.copy()
+        num_rounds = 0
+        while num_rounds < self._num_rounds:
+            leaves, num_finished = self.select_leaves(
+                root,
+                search_state,
+                min(self._leaf_batch_size, self._num_rounds - num_rounds),
+            )
+            if leaves:
+                priors, values = yield [leaf[2] for leaf in leaves]
+                self.expand_leaves(leaves, priors, values)
+            num_rounds += len(leaves) + num_finished
+        if self._reuse_tree:
+            self._last_root = root
+            self._last_root_key = situation_key(game_state)
         if self._collector is not None:
-            root_state_tensor = self._encoder.encode(game_state)
+            if state_tensor is None:
+                state_tensor = self._encoder.encode(game_state)
             visit_counts = np.array(
                 [
                     root.visit_count(
@@ -103,13 +201,56 @@ class ZeroAgent(Agent):
                 ]
             )
             self._collector.record_decision(
-                root_state_tensor,
+                state_tensor,
                 visit_counts,
             )
-        
+
         return max(root.moves(), key=root.visit_count)
     
+    def reuse_root(self, game_state):
+        # the node already searched for game_state, from the last tree or
+        # the transposition table. Its Dirichlet noise is the one it got
+        # when it was first expanded (none if it wasn't a root then).
+        if not self._reuse_tree and self._transpositions is None:
+            return None
+        self.reuse_lookups += 1
+        root = None
+        if self._last_root is not None:
+            root = follow_moves(
+                self._last_root,
+                self._last_root_key,
+                game_state,
+            )
+            self._last_root = None
+        if root is None and self._transpositions is not None:
+            root = self._transpositions.get(situation_key(game_state))
+        if root is None or root.is_terminal():
+            return None
+        self.reuse_hits += 1
+        if self._array_tree:
+            root = self.compact_tree(root)
+        root.parent = None
+        root.last_move = None
+        if not self._mutable_search:
+            root.state = game_state
+        return root
+    
+    def compact_tree(self, root):
+        # moves the part of the tree under the new root into a fresh
+        # ArrayTree, so that the arrays don't keep every earlier search
+        old_tree = root.tree
+        self._tree, mapping = old_tree.subtree(root.index)
+        if self._transpositions is not None:
+            entries = self._transpositions.items()
+            self._transpositions.clear()
+            for key, node in entries:
+                if node.tree is old_tree and node.index in mapping:
+                    self._transpositions.put(key, mapping[node.index])
+        return mapping[root.index]
+    
     def select_branch(self, node):
+        if self._array_tree:
+            return node.select_branch(self._c)
         total_n = node.total_visit_count
 
         def score_branch(move):
@@ -117,29 +258,205 @@ class ZeroAgent(Agent):
             p = node.prior(move)
             n = node.visit_count(move)
             return q + self._c * p * np.sqrt(total_n) / (n + 1)
-        
+
         return max(node.moves(), key=score_branch)
     
+    def select_leaves(
+            self,
+            root,
+            search_state,
+            batch_size):
+        
+        # returns up to batch_size (path, state, tensor, valid_moves, key)
+        # leaves, path being the (node, move) pairs from the root and key
+        # the leaf's transposition key. Every path carries a virtual loss
+        # until expand_leaves backs it up. Walks that end in a finished
+        # game or in a position the transposition table already has are
+        # backed up right away and only counted.
+        leaves = []
+        pending = set()
+        num_finished = 0
+        while len(leaves) + num_finished < batch_size:
+            node = root
+            path = []
+            cycle = False
+            next_move = self.select_branch(node)
+            while node.has_child(next_move):
+                path.append((node, next_move))
+                node = node.get_child(next_move)
+                if search_state is not None:
+                    search_state.push(next_move)
+                if node.is_terminal():
+                    break
+                if self._transpositions is not None and \
+                        any(path_node is node for path_node, _ in path):
+                    # shared nodes led the walk back to a position it
+                    # already went through
+                    cycle = True
+                    break
+                next_move = self.select_branch(node)
+            if cycle or node.is_terminal():
+                # no legal moves left, the game is over at this node
+                if search_state is not None:
+                    while search_state.depth > 0:
+                        search_state.pop()
+                value = 0.0 if cycle else -1 * node.value
+                for path_node, path_move in reversed(path):
+                    path_node.record_visit(path_move, value)
+                    value = -1 * value
+                num_finished += 1
+                continue
+            path.append((node, next_move))
+            key = (id(node), next_move)
+            if key in pending:
+                # this leaf is already waiting for its evaluation
+                if search_state is not None:
+                    while search_state.depth > 0:
+                        search_state.pop()
+                break
+            if search_state is None:
+                leaf_state = node.state.apply_move(next_move)
+                position = leaf_state
+            else:
+                search_state.push(next_move)
+                leaf_state = None
+                position = search_state
+            leaf_key = None
+            child_node = None
+            if self._transpositions is not None:
+                leaf_key = situation_key(position)
+                child_node = self._transpositions.get(leaf_key)
+                if self._array_tree and child_node is not None and \
+                        child_node.tree is not self._tree:
+                    # array nodes can only link within one tree
+                    child_node = None
+            if child_node is None:
+                state_tensor, valid_moves = self.leaf_input(position)
+            if search_state is not None:
+                while search_state.depth > 0:
+                    search_state.pop()
+            if child_node is not None:
+                # reached before by another order of moves
+                node.add_child(next_move, child_node)
+                value = -1 * child_node.value
+                for path_node, path_move in reversed(path):
+                    path_node.record_visit(path_move, value)
+                    value = -1 * value
+                num_finished += 1
+                continue
+            pending.add(key)
+            for path_node, path_move in path:
+                path_node.add_virtual_loss(path_move, self._virtual_loss)
+            leaves.append(
+                (path, leaf_state, state_tensor, valid_moves, leaf_key)
+            )
+        return leaves, num_finished
+    
+    def expand_leaves(
+            self,
+            leaves,
+            priors,
+            values):
+        
+        for i, leaf in enumerate(leaves):
+            path, leaf_state, _, valid_moves, leaf_key = leaf
+            for node, move in path:
+                node.remove_virtual_loss(move, self._virtual_loss)
+            parent, move = path[-1]
+            child_node = self.add_node(
+                leaf_state,
+                valid_moves,
+                priors[i],
+                values[i][0],
+                move,
+                parent,
+            )
+            if self._transpositions is not None:
+                self._transpositions.put(leaf_key, child_node)
+            value = -1 * child_node.value
+            for node, move in reversed(path):
+                node.record_visit(move, value)
+                value = -1 * value
+    
+    def leaf_input(self, game_state):
+        # encoded tensor and legal move flags of a position, taken while
+        # it is on the board
+        if self._all_moves is None:
+            self._all_moves = [
+                self._encoder.decode_move_index(idx)
+                for idx in range(self._encoder.num_moves())
+            ]
+        legal = movemasks.legal_play_mask(game_state)
+        valid_moves = [
+            legal[move.point.row - 1, move.point.col - 1] if move.is_play
+            else game_state.is_valid_move(move)
+            for move in self._all_moves
+        ]
+        return self._encoder.encode(game_state), valid_moves
+    
     def create_node(
             self,
             game_state,
             move=None,
-            parent=None):
+            parent=None,
+            keep_state=True):
         
-        state_tensor = self._encoder.encode(game_state)
+        state_tensor, valid_moves = self.leaf_input(game_state)
         model_input = np.array([state_tensor])
         priors, values = self._model.predict(model_input)
-        priors = priors[0]
+        return self.add_node(
+            game_state if keep_state else None,
+            valid_moves,
+            priors[0],
+            values[0][0],
+            move,
+            parent,
+        )
+    
+    def add_node(
+            self,
+            game_state,
+            valid_moves,
+            priors,
+            value,
+            move,
+            parent):
+        
         # add Dirichlet noise to the root node
         if parent is None:
             noise = np.random.dirichlet(
                 0.03 * np.ones_like(priors)
             )
             priors = 0.75 * priors + 0.25 * noise
-        value = values[0][0]
+        if self._array_tree:
+            if parent is None:
+                # a root that wasn't reused starts a new tree. Array
+                # nodes can only link within one tree, so transpositions
+                # into the old one are dropped with it.
+                old_tree = self._tree
+                self._tree = ArrayTree(self._all_moves)
+                if self._transpositions is not None and \
+                        old_tree is not None:
+                    entries = self._transpositions.items()
+                    self._transpositions.clear()
+                    for key, node in entries:
+                        if node.tree is not old_tree:
+                            self._transpositions.put(key, node)
+            new_node = self._tree.add_node(
+                priors,
+                valid_moves,
+                value,
+                game_state,
+                parent,
+                move,
+            )
+            if parent is not None:
+                parent.add_child(move, new_node)
+            return new_node
         move_priors = {
-            self._encoder.decode_move_index(idx): p
+            self._all_moves[idx]: p
             for idx, p in enumerate(priors)
+            if valid_moves[idx]
         }
         new_node = ZeroTreeNode(
             game_state,
@@ -152,28 +469,55 @@ class ZeroAgent(Agent):
             parent.add_child(move, new_node)
         return new_node
     
+    def serialize(self, h5file):
+        h5file.create_group('encoder')
+        h5file['encoder'].attrs['board_size'] = self._encoder.board_size
+        h5file.create_group('model')
+        kerasutil.save_model_to_hdf5_group(
+            self._model,
+            h5file['model'],
+        )
+    
     def train(
             self,
             experience,
             learning_rate,
             batch_size):
         
-        num_examples = experience.states.shape[0]
-        model_input = experience.states
-        visit_sums = np.sum(
-            experience.visit_counts,
-            axis=1,
-        ).reshape((num_examples, 1))
-
-        action_target = experience.visit_counts / visit_sums
-        value_target = experience.rewards
-
         self._model.compile(
             optimizers.SGD(lr=learning_rate),
             loss=['categorical_crossentropy', 'mse'],
         )
+        if hasattr(experience, 'batches'):
+            # a ZeroExperienceReader: one pass over minibatches read from
+            # disk
+            for batch in experience.batches(batch_size):
+                self._model.train_on_batch(
+                    batch.states,
+                    _training_targets(batch),
+                )
+            return
         self._model.fit(
-            model_input,
-            [action_target, value_target],
+            experience.states,
+            _training_targets(experience),
             batch_size=batch_size,
-        )
\ No newline at end of file
+        )
+
+
+def _training_targets(experience):
+    num_examples = experience.states.shape[0]
+    visit_sums = np.sum(
+        experience.visit_counts,
+        axis=1,
+    ).reshape((num_examples, 1))
+
+    action_target = experience.visit_counts / visit_sums
+    value_target = experience.rewards
+    return [action_target, value_target]
+
+
+def load_zero_agent(h5file, **kwargs):
+    # kwargs are the search settings, which are not stored
+    model = kerasutil.load_model_from_hdf5_group(h5file['model'])
+    board_size = int(h5file['encoder'].attrs['board_size'])
+    return ZeroAgent(model, ZeroEncoder(board_size), **kwargs)
\ No newline at end of file
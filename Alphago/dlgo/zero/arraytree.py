@@ -0,0 +1,242 @@
+import numpy as np
+
+__all__ = [
+    'ArrayTree',
+    'ArrayTreeNode',
+]
+
+
+class ArrayTree():
+    # Structure of arrays search tree. Node n's statistics for the move
+    # with index i sit at [n, i] of preallocated arrays that grow by
+    # doubling, so a node costs a few bytes per move instead of a dict of
+    # Branch objects, and all of its children are scored at once.
+    def __init__(
+            self,
+            moves,
+            capacity=1024,
+            dtype=np.float32):
+        
+        self.moves = moves
+        self.move_index = {move: idx for idx, move in enumerate(moves)}
+        self.num_moves = len(moves)
+        self.num_nodes = 0
+        self.capacity = capacity
+        self.dtype = dtype
+        shape = (capacity, self.num_moves)
+        self.priors = np.zeros(shape, dtype=dtype)
+        self.legal = np.zeros(shape, dtype=bool)
+        self.visit_counts = np.zeros(shape, dtype=np.int32)
+        self.total_values = np.zeros(shape, dtype=dtype)
+        self.children = np.full(shape, -1, dtype=np.int32)
+        self.node_values = np.zeros(capacity, dtype=dtype)
+        self.total_visit_counts = np.zeros(capacity, dtype=np.int32)
+        self.nodes = []
+    
+    def _grow(self):
+        capacity = 2 * self.capacity
+        for name in (
+                'priors',
+                'legal',
+                'visit_counts',
+                'total_values',
+                'children',
+                'node_values',
+                'total_visit_counts'):
+            
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.capacity] = old
+            new[self.capacity:] = -1 if name == 'children' else 0
+            setattr(self, name, new)
+        self.capacity = capacity
+    
+    def add_node(
+            self,
+            priors,
+            legal,
+            value,
+            state=None,
+            parent=None,
+            last_move=None):
+        
+        if self.num_nodes == self.capacity:
+            self._grow()
+        index = self.num_nodes
+        self.num_nodes += 1
+        self.priors[index] = priors
+        self.legal[index] = legal
+        self.node_values[index] = value
+        self.total_visit_counts[index] = 1
+        node = ArrayTreeNode(self, index, state, parent, last_move)
+        self.nodes.append(node)
+        return node
+    
+    def select(self, index, c):
+        # PUCT over every child slot of the node at once; illegal slots
+        # never win
+        visits = self.visit_counts[index]
+        q = np.divide(
+            self.total_values[index],
+            visits,
+            out=np.zeros(self.num_moves, dtype=self.dtype),
+            where=visits > 0,
+        )
+        scores = np.where(
+            self.legal[index],
+            q + c * self.priors[index] *
+            np.sqrt(self.total_visit_counts[index]) / (visits + 1),
+            -np.inf,
+        )
+        return int(np.argmax(scores))
+    
+    def subtree(self, index):
+        # copy of the nodes reachable from index into a new tree, with
+        # index as node 0. Returns the new tree and a map from old node
+        # indices to the new nodes.
+        order = [index]
+        new_index = {index: 0}
+        for old in order:
+            for child in self.children[old][self.children[old] >= 0]:
+                child = int(child)
+                if child not in new_index:
+                    new_index[child] = len(order)
+                    order.append(child)
+        tree = ArrayTree(
+            self.moves,
+            capacity=max(len(order), 1024),
+            dtype=self.dtype,
+        )
+        rows = np.array(order)
+        count = len(order)
+        tree.priors[:count] = self.priors[rows]
+        tree.legal[:count] = self.legal[rows]
+        tree.visit_counts[:count] = self.visit_counts[rows]
+        tree.total_values[:count] = self.total_values[rows]
+        tree.node_values[:count] = self.node_values[rows]
+        tree.total_visit_counts[:count] = self.total_visit_counts[rows]
+        remap = np.full(self.num_nodes + 1, -1, dtype=np.int32)
+        remap[rows] = np.arange(count, dtype=np.int32)
+        # -1 children index the last entry of remap, which stays -1
+        tree.children[:count] = remap[self.children[rows]]
+        tree.num_nodes = count
+        mapping = {}
+        for old in order:
+            node = self.nodes[old]
+            new_node = ArrayTreeNode(
+                tree,
+                new_index[old],
+                node.state,
+                None,
+                node.last_move,
+            )
+            tree.nodes.append(new_node)
+            mapping[old] = new_node
+        return tree, mapping
+    
+    def nbytes(self):
+        # bytes held by the arrays, for the nodes in use
+        per_node = sum(
+            array.itemsize * int(np.prod(array.shape[1:]))
+            for array in (
+                self.priors,
+                self.legal,
+                self.visit_counts,
+                self.total_values,
+                self.children,
+                self.node_values,
+                self.total_visit_counts,
+            )
+        )
+        return per_node * self.num_nodes
+
+
+class ArrayTreeNode():
+    # Handle on one node of an ArrayTree, with the same methods as
+    # ZeroTreeNode so that ZeroAgent can walk either kind of tree.
+    __slots__ = ('tree', 'index', 'state', 'parent', 'last_move')
+
+    def __init__(
+            self,
+            tree,
+            index,
+            state,
+            parent,
+            last_move):
+        
+        self.tree = tree
+        self.index = index
+        self.state = state
+        self.parent = parent
+        self.last_move = last_move
+    
+    @property
+    def value(self):
+        return float(self.tree.node_values[self.index])
+    
+    @property
+    def total_visit_count(self):
+        return int(self.tree.total_visit_counts[self.index])
+    
+    def moves(self):
+        tree = self.tree
+        legal = np.flatnonzero(tree.legal[self.index])
+        return [tree.moves[idx] for idx in legal]
+    
+    def is_terminal(self):
+        return not self.tree.legal[self.index].any()
+    
+    def add_child(self, move, child_node):
+        tree = self.tree
+        if child_node.tree is not tree:
+            raise ValueError('child node belongs to another tree')
+        tree.children[self.index, tree.move_index[move]] = child_node.index
+    
+    def has_child(self, move):
+        tree = self.tree
+        idx = tree.move_index.get(move)
+        return idx is not None and tree.children[self.index, idx] >= 0
+    
+    def get_child(self, move):
+        tree = self.tree
+        return tree.nodes[tree.children[self.index, tree.move_index[move]]]
+    
+    def record_visit(self, move, value):
+        tree = self.tree
+        idx = tree.move_index[move]
+        tree.total_visit_counts[self.index] += 1
+        tree.visit_counts[self.index, idx] += 1
+        tree.total_values[self.index, idx] += value
+    
+    def add_virtual_loss(self, move, virtual_loss):
+        self.record_visit(move, -virtual_loss)
+    
+    def remove_virtual_loss(self, move, virtual_loss):
+        tree = self.tree
+        idx = tree.move_index[move]
+        tree.total_visit_counts[self.index] -= 1
+        tree.visit_counts[self.index, idx] -= 1
+        tree.total_values[self.index, idx] += virtual_loss
+    
+    def expected_value(self, move):
+        tree = self.tree
+        idx = tree.move_index[move]
+        visits = tree.visit_counts[self.index, idx]
+        if visits == 0:
+            return 0.0
+        return float(tree.total_values[self.index, idx]) / visits
+    
+    def prior(self, move):
+        tree = self.tree
+        return float(tree.priors[self.index, tree.move_index[move]])
+    
+    def visit_count(self, move):
+        tree = self.tree
+        idx = tree.move_index.get(move)
+        if idx is None or not tree.legal[self.index, idx]:
+            return 0
+        return int(tree.visit_counts[self.index, idx])
+    
+    def select_branch(self, c):
+        tree = self.tree
+        return tree.moves[tree.select(self.index, c)]
\ No newline at end of file
@@ -0,0 +1,66 @@
+import numpy as np
+
+__all__ = [
+    'InferenceBatcher',
+]
+
+
+class InferenceBatcher:
+    # Evaluates the positions requested by ZeroAgent searches in as few
+    # model.predict calls as possible. One batcher can be shared by many
+    # agents and games in a process; run() steps their searches together
+    # so the leaves of all of them go out in the same batches.
+    def __init__(self, model, max_batch_size=256):
+        self._model = model
+        self.max_batch_size = max_batch_size
+        self.num_predict_calls = 0
+        self.num_evaluated = 0
+    
+    def predict(self, state_tensors):
+        priors = []
+        values = []
+        for start in range(0, len(state_tensors), self.max_batch_size):
+            model_input = np.array(
+                state_tensors[start:start + self.max_batch_size]
+            )
+            batch_priors, batch_values = self._model.predict(model_input)
+            priors.append(batch_priors)
+            values.append(batch_values)
+            self.num_predict_calls += 1
+        self.num_evaluated += len(state_tensors)
+        return np.concatenate(priors), np.concatenate(values)
+    
+    def run(self, searches):
+        # searches are ZeroAgent.search() generators. Returns what each
+        # of them returns, in the same order.
+        results = [None] * len(searches)
+        requests = {}
+        for i, search in enumerate(searches):
+            try:
+                requests[i] = next(search)
+            except StopIteration as stop:
+                results[i] = stop.value
+        while requests:
+            order = list(requests)
+            state_tensors = []
+            for i in order:
+                state_tensors += requests[i]
+            priors, values = self.predict(state_tensors)
+            next_requests = {}
+            start = 0
+            for i in order:
+                end = start + len(requests[i])
+                try:
+                    next_requests[i] = searches[i].send(
+                        (priors[start:end], values[start:end])
+                    )
+                except StopIteration as stop:
+                    results[i] = stop.value
+                start = end
+            requests = next_requests
+        return results
+    
+    def mean_batch_size(self):
+        if self.num_predict_calls == 0:
+            return 0.0
+        return float(self.num_evaluated) / self.num_predict_calls
\ No newline at end of file
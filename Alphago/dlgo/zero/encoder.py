@@ -1,5 +1,6 @@
 import numpy as np
 
+from dlgo import movemasks
 from dlgo.goboard_fast import Move
 from dlgo.gotypes import Player, Point
 from dlgo.encoders import Encoder
@@ -21,18 +22,13 @@ class ZeroEncoder(Encoder):
             for c in range(self.board_size):
                 p = Point(row=r + 1, col=c + 1)
                 go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    if game_state.does_move_violate_ko(
-                        next_player,
-                        Move.play(p),
-                    ):
-                        board_tensor[10][r][c] = 1
-                else:
+                if go_string is not None:
                     liberty_plane = min(4, go_string.num_liberties) - 1
                     if go_string.color != next_player:
                         liberty_plane += 4
                     board_tensor[liberty_plane][r][c] = 1
-
+        # points the player to move may not play because of ko
+        board_tensor[10][movemasks.ko_mask(game_state)] = 1
         return board_tensor
     
     def encode_move(self, move):
@@ -46,7 +42,7 @@ class ZeroEncoder(Encoder):
             'Cannot encode resign move'
         )
     
-    def decode_point_index(self, index):
+    def decode_move_index(self, index):
         if index == self.board_size * self.board_size:
             return Move.pass_turn()
         row = index // self.board_size
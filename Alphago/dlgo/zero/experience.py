@@ -1,5 +1,7 @@
 import numpy as np
 
+from dlgo.rl.experience import ExperienceReader, ExperienceWriter
+
 
 class ZeroExperienceCollector:
     def __init__(self):
@@ -16,7 +18,7 @@ class ZeroExperienceCollector:
     def record_decision(self, state, visit_counts):
         self._current_episode_states.append(state)
         self._current_episode_visit_counts.append(visit_counts)
-
+    
     def complete_episode(self, reward):
         num_states = len(self._current_episode_states)
         self.states += self._current_episode_states
@@ -24,4 +26,60 @@ class ZeroExperienceCollector:
         self.rewards += [reward for _ in range(num_states)]
 
         self._current_episode_states = []
-        self._current_episode_visit_counts = []
\ No newline at end of file
+        self._current_episode_visit_counts = []
+
+
+class ZeroExperienceBuffer:
+    def __init__(
+            self,
+            states,
+            visit_counts,
+            rewards):
+        
+        self.states = states
+        self.visit_counts = visit_counts
+        self.rewards = rewards
+    
+    def serialize(self, h5file):
+        ZeroExperienceWriter(h5file).append(self)
+
+
+class ZeroExperienceWriter(ExperienceWriter):
+    names = ('states', 'visit_counts', 'rewards')
+
+
+class ZeroExperienceReader(ExperienceReader):
+    names = ('states', 'visit_counts', 'rewards')
+    buffer_class = ZeroExperienceBuffer
+
+
+def combine_experience(collectors):
+    combined_states = np.concatenate(
+        [
+            np.array(c.states) for c in collectors
+        ]
+    )
+    combined_visit_counts = np.concatenate(
+        [
+            np.array(c.visit_counts) for c in collectors
+        ]
+    )
+    combined_rewards = np.concatenate(
+        [
+            np.array(c.rewards) for c in collectors
+        ]
+    )
+
+    return ZeroExperienceBuffer(
+        combined_states,
+        combined_visit_counts,
+        combined_rewards,
+    )
+
+
+def load_experience(h5file):
+    return ZeroExperienceBuffer(
+        states=np.array(h5file['experience']['states']),
+        visit_counts=np.array(h5file['experience']['visit_counts']),
+        rewards=np.array(h5file['experience']['rewards']),
+    )
\ No newline at end of file
@@ -1,36 +1,7 @@
 import argparse
-import h5py
-from collections import namedtuple
 
 from dlgo import agent
-from dlgo import scoring
-from dlgo.goboard_fast import GameState, Player
-
-
-BOARD_SIZE = 19
-
-
-class GameRecord(namedtuple('GameRecord', 'moves winner')):
-    pass
-
-
-def simulate_game(black_player, white_player):
-    moves = []
-    game = GameState.new_game(BOARD_SIZE)
-    agents = {
-        Player.black: black_player,
-        Player.white: white_player,
-    }
-    while not game.is_over():
-        next_move = agents[game.next_player].select_move(game)
-        moves.append(next_move)
-        game = game.apply_move(next_move)
-    game_result = scoring.compute_game_result(game)
-    print(game_result)
-    return GameRecord(
-        moves=moves,
-        winner=game_result.winner,
-    )
+from dlgo.rl.simulate import agent_loader, simulate_games
 
 
 def main():
@@ -44,30 +15,24 @@ def main():
     parser.add_argument(
         '--num-games', '-n', type=int, default=10
     )
+    parser.add_argument(
+        '--board-size', type=int, default=19
+    )
+    parser.add_argument(
+        '--num-workers', '-w', type=int, default=None,
+        help='Processes playing games; 0 plays them in this one.'
+    )
 
     args = parser.parse_args()
-    agent1 = agent.load_policy_agent(h5py.File(args.agent1))
-    agent2 = agent.load_policy_agent(h5py.File(args.agent2))
-    num_games = args.num_games
-
-    wins = 0
-    losses = 0
-    color1 = Player.black
-    for i in range(num_games):
-        print('Simulating game %d%d...' % (i + 1, num_games))
-        if color1 == Player.black:
-            black_player, white_player = agent1, agent2
-        else:
-            white_player, black_player = agent1, agent2
-        game_record = simulate_game(
-            black_player, white_player
-        )
-        if game_record.winner == color1:
-            wins += 1
-        else:
-            losses += 1
-        color1 = color1.other
-    print('Agent1 record: %d%d' % (wins, wins + losses))
+    result = simulate_games(
+        args.num_games,
+        agent_loader(agent.load_policy_agent, args.agent1),
+        agent_loader(agent.load_policy_agent, args.agent2),
+        board_size=args.board_size,
+        num_workers=args.num_workers,
+    )
+    print('Agent 1 record: %d/%d' % (result.wins, result.num_games))
+    print(result.report())
 
 
 if __name__ == '__main__':
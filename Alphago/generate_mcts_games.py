@@ -2,7 +2,7 @@ import argparse
 import numpy as np
 
 from dlgo.encoders import get_encoder_by_name
-from dlgo import goboard_fast as goboard
+from dlgo.goboards import GOBOARD_NAMES, get_goboard_by_name
 from dlgo import mcts
 from dlgo.utils import print_board, print_move
 
@@ -11,10 +11,12 @@ def generate_game(
         board_size,
         rounds,
         max_moves,
-        temperature):
+        temperature,
+        goboard_name='fast'):
     
     boards, moves = []
     encoder = get_encoder_by_name('simple', board_size)
+    goboard = get_goboard_by_name(goboard_name)
     game = goboard.GameState.new_game(board_size)
     bot = mcts.MCTSAgent(rounds, temperature)
 
@@ -55,6 +57,10 @@ def main():
     parser.add_argument(
         '--num-games', '-n', type=int, default=10
     )
+    parser.add_argument(
+        '--goboard', default='fast', choices=GOBOARD_NAMES,
+        help='board backend used for the games.'
+    )
     parser.add_argument('--board-out')
     parser.add_argument('--move-out')
 
@@ -71,6 +77,7 @@ def main():
             args.rounds,
             args.max_moves, 
             args.temperature,
+            args.goboard,
         )
         xs.append(x)
         ys.append(y)
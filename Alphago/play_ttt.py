@@ -1,3 +1,5 @@
+import argparse
+
 from dlgo import minmax
 from dlgo import ttt
 
@@ -31,11 +33,34 @@ def point_from_coords(text):
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--iterative', action='store_true',
+        help='Play with IterativeDeepeningAgent, which searches the '
+             'game tree with transpositions and cutoffs.'
+    )
+    parser.add_argument(
+        '--depth', type=int, default=9,
+        help='Deepest search with --iterative, in moves.'
+    )
+    parser.add_argument(
+        '--max-time', type=float, default=0,
+        help='Seconds per bot move with --iterative; 0 searches to '
+             '--depth every move.'
+    )
+
+    args = parser.parse_args()
     game = ttt.GameState.new_game()
 
     human_player = ttt.Player.x
 
-    bot = minmax.MinmaxAgent()
+    if args.iterative:
+        bot = minmax.IterativeDeepeningAgent(
+            args.depth,
+            max_time=args.max_time or None,
+        )
+    else:
+        bot = minmax.MinmaxAgent()
 
     while not game.is_over():
         print_board(game.board)
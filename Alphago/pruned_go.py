@@ -1,7 +1,10 @@
+import argparse
+
 from six.moves import input
 
 from dlgo import goboard_fast as goboard
 from dlgo import gotypes
+from dlgo import minmax
 from dlgo.minmax import depthprune
 from dlgo.utils import print_board, print_move, point_from_coords
 
@@ -28,8 +31,31 @@ def capture_diff(game_state):
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--depth', type=int, default=3,
+        help='Deepest search, in moves.'
+    )
+    parser.add_argument(
+        '--iterative', action='store_true',
+        help='Play with IterativeDeepeningAgent.'
+    )
+    parser.add_argument(
+        '--max-time', type=float, default=5.0,
+        help='Seconds per bot move with --iterative; 0 searches to '
+             '--depth every move.'
+    )
+
+    args = parser.parse_args()
     game = goboard.GameState.new_game(BOARD_SIZE)
-    bot = depthprune.DepthPrunedAgent(3, capture_diff)
+    if args.iterative:
+        bot = minmax.IterativeDeepeningAgent(
+            args.depth,
+            capture_diff,
+            max_time=args.max_time or None,
+        )
+    else:
+        bot = depthprune.DepthPrunedAgent(args.depth, capture_diff)
 
     while not game.is_over():
         print_board(game.board)
@@ -39,6 +65,13 @@ def main():
             move = goboard.Move.play(point)
         else:
             move = bot.select_move(game)
+            if args.iterative:
+                print(
+                    'depth %(depth)d, score %(score)s, %(nodes)d nodes, '
+                    '%(nodes_per_sec).0f nodes/sec, '
+                    'table hit rate %(table_hit_rate).2f'
+                    % bot.diagnostics()
+                )
         print_move(game.next_player, move)
         game = game.apply_move(move)
 
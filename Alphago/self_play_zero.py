@@ -1,15 +1,21 @@
+import argparse
+import os
+import tempfile
+
+import h5py
 from keras import layers    # Conv2D, BatchNormalization, Dense, Flatten, Input
 from keras import models    # Model
 from dlgo.goboard_fast import GameState, Player
 from dlgo import scoring 
 from dlgo import zero
+from dlgo.rl.simulate import agent_loader, simulate_games
 
 
 def simulate_game(
         board_size,
         black_agent, black_collector,
         white_agent, white_collector):
-    
+
     print('Starting the game!')
     game = GameState.new_game(board_size)
     agents = {
@@ -22,7 +28,7 @@ def simulate_game(
     while not game.is_over():
         next_move = agents[game.next_player].select_move(game)
         game = game.apply_move(next_move)
-    
+
     game_result = scoring.compute_game_result(game)
     print(game_result)
     if game_result.winner == Player.black:
@@ -31,10 +37,100 @@ def simulate_game(
     else:
         black_collector.complete_episode(-1)
         white_collector.complete_episode(1)
+
+
+def simulate_games(
+        board_size,
+        games,
+        batcher):
+
+    # games holds (black_agent, black_collector, white_agent,
+    # white_collector) tuples. All games are played at once, so the
+    # searches of every running game share the batcher's predict calls.
+    print('Starting %d games!' % len(games))
+    states = [GameState.new_game(board_size) for _ in games]
+    for _, black_collector, _, white_collector in games:
+        black_collector.begin_episode()
+        white_collector.begin_episode()
+    while True:
+        running = [i for i, game in enumerate(states) if not game.is_over()]
+        if not running:
+            break
+        searches = []
+        for i in running:
+            black_agent, _, white_agent, _ = games[i]
+            if states[i].next_player == Player.black:
+                searches.append(black_agent.search(states[i]))
+            else:
+                searches.append(white_agent.search(states[i]))
+        moves = batcher.run(searches)
+        for i, next_move in zip(running, moves):
+            states[i] = states[i].apply_move(next_move)
+
+    for game, (_, black_collector, _, white_collector) in zip(states, games):
+        game_result = scoring.compute_game_result(game)
+        print(game_result)
+        if game_result.winner == Player.black:
+            black_collector.complete_episode(1)
+            white_collector.complete_episode(-1)
+        else:
+            black_collector.complete_episode(-1)
+            white_collector.complete_episode(1)
+    print('%.1f positions per predict call' % batcher.mean_batch_size())
+
+
+def simulate_games_on_workers(
+        board_size,
+        model,
+        encoder,
+        num_games,
+        num_workers):
     
+    # each worker loads its own copy of the model and plays whole games
+    # with it; experience comes back through a temporary HDF5 file
+    tempfd, agent_filename = tempfile.mkstemp(prefix='tmp-zeroagent')
+    os.close(tempfd)
+    tempfd, experience_filename = tempfile.mkstemp(prefix='tmp-zeroexp')
+    os.close(tempfd)
+    try:
+        with h5py.File(agent_filename, 'w') as agent_outf:
+            zero.ZeroAgent(model, encoder).serialize(agent_outf)
+        with h5py.File(experience_filename, 'w') as experience_outf:
+            result = simulate_games(
+                num_games,
+                agent_loader(
+                    zero.load_zero_agent,
+                    agent_filename,
+                    rounds_per_move=10,
+                    c=2.0,
+                    leaf_batch_size=4,
+                ),
+                board_size=board_size,
+                num_workers=num_workers,
+                collector_class=zero.ZeroExperienceCollector,
+                combine=zero.combine_experience,
+                writer=zero.ZeroExperienceWriter(experience_outf),
+            )
+        print(result.report())
+        with h5py.File(experience_filename, 'r') as experience_inf:
+            return zero.load_experience(experience_inf)
+    finally:
+        os.unlink(agent_filename)
+        os.unlink(experience_filename)
+
 
 def main():
-    board_size = 9
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', type=int, default=9)
+    parser.add_argument('--num-games', '-n', type=int, default=5)
+    parser.add_argument(
+        '--num-workers', '-w', type=int, default=0,
+        help='Play the games on this many processes instead of all at '
+        'once through one batcher in this one.'
+    )
+
+    args = parser.parse_args()
+    board_size = args.board_size
     encoder = zero.ZeroEncoder(board_size)
 
     board_input = layers.Input(
@@ -49,7 +145,7 @@ def main():
             activation='relu')(pb)
         pb = layers.BatchNormalization(axis=1)(pb)
         pb = layers.Activation('relu')(pb)
-    
+
     policy_conv = layers.Conv2D(
         2, (1, 1),
         data_format='channels_first',
@@ -59,7 +155,7 @@ def main():
     policy_output = layers.Dense(
         encoder.num_moves(),
         activation='softmax')(policy_flat)
-    
+
     value_conv = layers.Conv2D(
         1, (1, 1),
         data_format='channels_first',
@@ -70,25 +166,45 @@ def main():
         256, activation='relu')(value_flat)
     value_output = layers.Dense(
         1, activation='tanh')(value_hidden)
-    
+
     model = models.Model(
         inputs=[board_input], outputs=[policy_output, value_output]
     )
-    black_agent = zero.ZeroAgent(
-        model, encoder, rounds_per_move=10, c=2.0
-    )
-    white_agent = zero.ZeroAgent(
-        model, encoder, rounds_per_move=10, c=2.0
-    )
-    c1 = zero.ZeroExperienceCollector()
-    c2 = zero.ZeroExperienceCollector()
-    black_agent.set_collector(c1)
-    white_agent.set_collector(c2)
+    if args.num_workers > 0:
+        exp = simulate_games_on_workers(
+            board_size,
+            model,
+            encoder,
+            args.num_games,
+            args.num_workers,
+        )
+        zero.ZeroAgent(model, encoder).train(exp, 0.01, 2048)
+        return
 
-    for i in range(5):
-        simulate_game(board_size, black_agent, c1, white_agent, c2)
-    
-    exp = zero.combine_experience([c1, c2])
+    # one pair of agents and collectors per concurrent game, all of them
+    # evaluating through the same batcher
+    batcher = zero.InferenceBatcher(model, max_batch_size=256)
+    games = []
+    collectors = []
+    for i in range(args.num_games):
+        black_agent = zero.ZeroAgent(
+            model, encoder, rounds_per_move=10, c=2.0,
+            leaf_batch_size=4, batcher=batcher,
+        )
+        white_agent = zero.ZeroAgent(
+            model, encoder, rounds_per_move=10, c=2.0,
+            leaf_batch_size=4, batcher=batcher,
+        )
+        c1 = zero.ZeroExperienceCollector()
+        c2 = zero.ZeroExperienceCollector()
+        black_agent.set_collector(c1)
+        white_agent.set_collector(c2)
+        games.append((black_agent, c1, white_agent, c2))
+        collectors += [c1, c2]
+
+    simulate_games(board_size, games, batcher)
+
+    exp = zero.combine_experience(collectors)
     black_agent.train(exp, 0.01, 2048)
 
 
@@ -19,6 +19,10 @@ def main():
     parser.add_argument(
         '--bs', type=int, default=512
     )
+    parser.add_argument(
+        '--window', type=int, default=65536,
+        help='Experience rows read from disk and shuffled at a time.'
+    )
     parser.add_argument(
         'experience', nargs='+'
     )
@@ -31,13 +35,16 @@ def main():
     batch_size = args.bs
 
     learning_agent = rl.load_ac_agent(h5py.File(learning_agent_filename))
-    for exp_filename in experience_files:
-        exp_buffer = rl.load_experience(h5py.File(exp_filename))
-        learning_agent.train(
-            exp_buffer,
-            lr=learning_rate,
-            batch_size=batch_size,
-        )
+    # one shuffled pass over all the files, read a window at a time
+    exp_files = [h5py.File(f, 'r') for f in experience_files]
+    experience = rl.ExperienceReader(exp_files, window_size=args.window)
+    learning_agent.train(
+        experience,
+        lr=learning_rate,
+        batch_size=batch_size,
+    )
+    for exp_file in exp_files:
+        exp_file.close()
     
     with h5py.File(updated_agent_filename, 'w') as updated_agent_outf:
         learning_agent.serialize(updated_agent_outf)
@@ -15,8 +15,12 @@ encoder = SimpleEncoder((go_board_rows, go_board_cols))
 
 processor = GoDataProcessor(encoder=encoder.name())
 
-generator = processor.load_go_data('train', num_games, use_generator=True)
-test_generator = processor.load_go_data('test', num_games, use_generator=True)
+generator = processor.load_go_data(
+    'train', num_games, use_generator=True, prefetch=True
+)
+test_generator = processor.load_go_data(
+    'test', num_games, use_generator=True, prefetch=True
+)
 
 input_shape = (encoder.num_planes, go_board_rows, go_board_cols)
 network_layers = small.layers(input_shape)
@@ -27,7 +31,7 @@ model.add(layers.Dense(
     num_classes, activation='softmax'
 ))
 model.compile(
-    loss='categorical_crossentropy',
+    loss='sparse_categorical_crossentropy',  # integer labels
     optimizer='sgd',
     metrics=['accuracy'],
 )
@@ -37,9 +41,9 @@ batch_size = 128
 model.fit_generator(
     generator=generator.generate(batch_size, num_classes),
     epochs=epochs,
-    steps_per_epoch=generator.get_num_samples() / batch_size,
+    steps_per_epoch=generator.get_num_samples() // batch_size,
     validation_data=test_generator.generate(batch_size, num_classes),
-    validation_steps=test_generator.get_num_samples() / batch_size,
+    validation_steps=test_generator.get_num_samples() // batch_size,
     callbacks=[
         callbacks.ModelCheckpoint(
             './checkpoints/small_model_epoch_{epoch}.h5'
@@ -49,5 +53,7 @@ model.fit_generator(
 
 model.evaluate_generator(
     generator=test_generator.generate(batch_size, num_classes),
-    steps=test_generator.get_num_samples() / batch_size,
-)
\ No newline at end of file
+    steps=test_generator.get_num_samples() // batch_size,
+)
+generator.close()
+test_generator.close()
\ No newline at end of file